@@ -14,6 +14,13 @@ DEFAULT_VALUE_KEY = "Default"
 LOCATION_KEY = "Location"
 COMPONENT_INDEX_KEY = "ComponentIndex"
 PARAM_INDEX_KEY = "ParamIndex"
+MEAN_KEY = "Mean"
+MEDIAN_KEY = "Median"
+MODE_KEY = "Mode"
+VARIANCE_KEY = "Variance"
+STANDARD_DEVIATION_KEY = "StandardDeviation"
+SKEWNESS_KEY = "Skewness"
+KURTOSIS_KEY = "Kurtosis"
 
 
 @unique
@@ -23,6 +30,22 @@ class DistributionType(Enum):
     GeneralWeibull = 2
 
 
+@unique
+class GlobalOptimizer(Enum):
+    BasinHopping = 0
+    # the local minimizer from several Latin-hypercube starting points
+    MultiStart = 1
+    DifferentialEvolution = 2
+
+
+@unique
+class LocalMinimizer(Enum):
+    # with the bounds and the constraint of fractions
+    SLSQP = 0
+    # L-BFGS-B in the unconstrained parameterization, see `QGrain.reparameterization`
+    LBFGSB = 1
+
+
 def check_component_number(component_number: int):
     # Check the validity of `component_number`
     if type(component_number) != int:
@@ -118,7 +141,12 @@ def get_constrains(component_number: int) -> Tuple[Dict]:
     if component_number == 1:
         return ()
     elif component_number > 1:
-        return ({'type': 'ineq', 'fun': lambda args:  1 - np.sum(args[1-component_number:]) + INFINITESIMAL})
+        def constrain_jac(args):
+            jac = np.zeros_like(args, dtype=np.float64)
+            jac[1-component_number:] = -1.0
+            return jac
+        return ({'type': 'ineq', 'fun': lambda args:  1 - np.sum(args[1-component_number:]) + INFINITESIMAL,
+                 'jac': constrain_jac})
     else:
         raise ValueError(component_number)
 
@@ -320,6 +348,60 @@ def gen_weibull_kurtosis(mu, beta, eta):
     return weibull_kurtosis(beta, eta)
 
 
+# the batched versions of statistic functions
+# params can be arrays with any shape (e.g. results × components)
+# the values will be NaN while the params are invalid, like the scalar versions
+def normal_statistics_batch(mu: np.ndarray, sigma: np.ndarray) -> Dict[str, np.ndarray]:
+    mu, sigma = np.broadcast_arrays(np.asarray(mu, dtype=np.float64), np.asarray(sigma, dtype=np.float64))
+    valid = np.greater(sigma, 0.0)
+    location = np.where(valid, mu, np.nan)
+    zeros = np.where(valid, 0.0, np.nan)
+    sigma = np.where(valid, sigma, np.nan)
+    return {MEAN_KEY: location, MEDIAN_KEY: location.copy(), MODE_KEY: location.copy(),
+            VARIANCE_KEY: sigma**2, STANDARD_DEVIATION_KEY: sigma,
+            SKEWNESS_KEY: zeros, KURTOSIS_KEY: zeros.copy()}
+
+def weibull_statistics_batch(beta: np.ndarray, eta: np.ndarray) -> Dict[str, np.ndarray]:
+    beta, eta = np.broadcast_arrays(np.asarray(beta, dtype=np.float64), np.asarray(eta, dtype=np.float64))
+    valid = np.logical_and(np.greater(beta, 0.0), np.greater(eta, 0.0))
+    beta = np.where(valid, beta, 1.0)
+    eta = np.where(valid, eta, 1.0)
+    # calculate the gamma terms only once
+    gamma_1 = gamma(1/beta+1)
+    gamma_2 = gamma(2/beta+1)
+    gamma_3 = gamma(3/beta+1)
+    gamma_4 = gamma(4/beta+1)
+    with np.errstate(over="ignore", invalid="ignore"):
+        gamma_diff = gamma_2-gamma_1**2
+        mean = eta*gamma_1
+        median = eta*(np.log(2)**(1/beta))
+        mode = np.where(np.greater(beta, 1.0), eta*np.abs(1-1/beta)**(1/beta), 0.0)
+        variance = (eta**2)*gamma_diff
+        standard_deviation = eta*np.sqrt(gamma_diff)
+        skewness = (2*gamma_1**3 - 3*gamma_2*gamma_1 + gamma_3) / gamma_diff**(3/2)
+        kurtosis = (-3*gamma_1**4 + 6*gamma_2*gamma_1**2 - 4*gamma_3*gamma_1 + gamma_4) / gamma_diff**2
+    statistics = {MEAN_KEY: mean, MEDIAN_KEY: median, MODE_KEY: mode,
+                  VARIANCE_KEY: variance, STANDARD_DEVIATION_KEY: standard_deviation,
+                  SKEWNESS_KEY: skewness, KURTOSIS_KEY: kurtosis}
+    return {key: np.where(valid, value, np.nan) for key, value in statistics.items()}
+
+def gen_weibull_statistics_batch(mu: np.ndarray, beta: np.ndarray, eta: np.ndarray) -> Dict[str, np.ndarray]:
+    statistics = weibull_statistics_batch(beta, eta)
+    for key in (MEAN_KEY, MEDIAN_KEY, MODE_KEY):
+        statistics[key] = statistics[key] + mu
+    return statistics
+
+def get_statistics_batch_func(distribution_type: DistributionType) -> Callable:
+    if distribution_type == DistributionType.Normal:
+        return normal_statistics_batch
+    elif distribution_type == DistributionType.Weibull:
+        return weibull_statistics_batch
+    elif distribution_type == DistributionType.GeneralWeibull:
+        return gen_weibull_statistics_batch
+    else:
+        raise NotImplementedError(distribution_type)
+
+
 def get_single_func(distribution_type: DistributionType) -> Callable:
     if distribution_type == DistributionType.Normal:
         return normal
@@ -330,6 +412,109 @@ def get_single_func(distribution_type: DistributionType) -> Callable:
     else:
         raise NotImplementedError(distribution_type)
 
+# the batched versions of pdf functions
+# `x` and params will be broadcasted, e.g. x with shape (M,) and params with shape (N, C, 1)
+# will produce the values of N*C components at M points in one pass
+def normal_batch(x: np.ndarray, mu: np.ndarray, sigma: np.ndarray) -> np.ndarray:
+    valid = np.greater(sigma, 0.0)
+    if np.all(valid):
+        return 1/(sigma*np.sqrt(2*np.pi))*np.exp(-np.square(x-mu)/(2*np.square(sigma)))
+    sigma = np.where(valid, sigma, 1.0)
+    results = 1/(sigma*np.sqrt(2*np.pi))*np.exp(-np.square(x-mu)/(2*np.square(sigma)))
+    return np.where(valid, results, 0.0)
+
+def weibull_batch(x: np.ndarray, beta: np.ndarray, eta: np.ndarray) -> np.ndarray:
+    valid = np.logical_and(np.greater(beta, 0.0), np.greater(eta, 0.0))
+    non_zero = np.greater(x, 0.0)
+    if np.all(valid) and np.all(non_zero):
+        return (beta/eta) * (x/eta)**(beta-1) * np.exp(-(x/eta)**beta)
+    beta = np.where(valid, beta, 1.0)
+    eta = np.where(valid, eta, 1.0)
+    # replace the invalid x values to avoid the warnings of invalid power operation
+    x = np.where(non_zero, x, 1.0)
+    results = (beta/eta) * (x/eta)**(beta-1) * np.exp(-(x/eta)**beta)
+    return np.where(np.logical_and(valid, non_zero), results, 0.0)
+
+def gen_weibull_batch(x: np.ndarray, mu: np.ndarray, beta: np.ndarray, eta: np.ndarray) -> np.ndarray:
+    return weibull_batch(x-mu, beta, eta)
+
+# the partial derivatives of pdf functions
+# return the values of pdf and the derivatives with respect to each param (in the order of `get_param_names`)
+def normal_gradient_batch(x: np.ndarray, mu: np.ndarray, sigma: np.ndarray) -> Tuple[np.ndarray, Tuple[np.ndarray]]:
+    values = normal_batch(x, mu, sigma)
+    sigma = np.where(np.greater(sigma, 0.0), sigma, 1.0)
+    with np.errstate(over="ignore", invalid="ignore"):
+        d_mu = values * (x-mu) / np.square(sigma)
+        d_sigma = values / sigma * (np.square(x-mu)/np.square(sigma) - 1)
+    # the values may underflow to 0 while the params are extreme
+    has_value = np.greater(values, 0.0)
+    return values, (np.where(has_value, d_mu, 0.0), np.where(has_value, d_sigma, 0.0))
+
+def weibull_gradient_batch(x: np.ndarray, beta: np.ndarray, eta: np.ndarray) -> Tuple[np.ndarray, Tuple[np.ndarray]]:
+    values = weibull_batch(x, beta, eta)
+    valid = np.logical_and(np.greater(beta, 0.0), np.greater(eta, 0.0))
+    beta = np.where(valid, beta, 1.0)
+    eta = np.where(valid, eta, 1.0)
+    x = np.where(np.greater(x, 0.0), x, 1.0)
+    with np.errstate(over="ignore", invalid="ignore"):
+        log_z = np.log(x/eta)
+        t = (x/eta)**beta
+        d_beta = values * (1/beta + log_z*(1-t))
+        d_eta = values * beta * (t-1) / eta
+    has_value = np.greater(values, 0.0)
+    return values, (np.where(has_value, d_beta, 0.0), np.where(has_value, d_eta, 0.0))
+
+def gen_weibull_gradient_batch(x: np.ndarray, mu: np.ndarray, beta: np.ndarray, eta: np.ndarray) -> Tuple[np.ndarray, Tuple[np.ndarray]]:
+    shifted_x = x - mu
+    values, (d_beta, d_eta) = weibull_gradient_batch(shifted_x, beta, eta)
+    valid = np.logical_and(np.greater(beta, 0.0), np.greater(eta, 0.0))
+    beta = np.where(valid, beta, 1.0)
+    eta = np.where(valid, eta, 1.0)
+    shifted_x = np.where(np.greater(shifted_x, 0.0), shifted_x, 1.0)
+    with np.errstate(over="ignore", invalid="ignore"):
+        # d(pdf)/d(mu) = -d(pdf)/d(x)
+        d_mu = values * (1 - beta + beta*(shifted_x/eta)**beta) / shifted_x
+    has_value = np.greater(values, 0.0)
+    return values, (np.where(has_value, d_mu, 0.0), d_beta, d_eta)
+
+def get_batch_func(distribution_type: DistributionType) -> Callable:
+    if distribution_type == DistributionType.Normal:
+        return normal_batch
+    elif distribution_type == DistributionType.Weibull:
+        return weibull_batch
+    elif distribution_type == DistributionType.GeneralWeibull:
+        return gen_weibull_batch
+    else:
+        raise NotImplementedError(distribution_type)
+
+def get_gradient_batch_func(distribution_type: DistributionType) -> Callable:
+    if distribution_type == DistributionType.Normal:
+        return normal_gradient_batch
+    elif distribution_type == DistributionType.Weibull:
+        return weibull_gradient_batch
+    elif distribution_type == DistributionType.GeneralWeibull:
+        return gen_weibull_gradient_batch
+    else:
+        raise NotImplementedError(distribution_type)
+
+# split the raw params matrix (N, (P+1)*C-1) to the params of components (N, C, P) and the fractions (N, C)
+def unpack_params_batch(distribution_type: DistributionType, component_number: int, params_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    check_component_number(component_number)
+    param_count = get_param_count(distribution_type)
+    params_matrix = np.asarray(params_matrix, dtype=np.float64)
+    assert params_matrix.ndim == 2
+    assert params_matrix.shape[1] == (param_count+1) * component_number - 1
+    sample_number = params_matrix.shape[0]
+    component_params = params_matrix[:, :component_number*param_count].reshape(sample_number, component_number, param_count)
+    fractions = np.empty((sample_number, component_number), dtype=np.float64)
+    fractions[:, :-1] = params_matrix[:, component_number*param_count:]
+    # subtract one by one to keep the same rounding as `1-f1-...-fn`
+    last_fraction = np.ones(sample_number, dtype=np.float64)
+    for i in range(component_number-1):
+        last_fraction = last_fraction - fractions[:, i]
+    fractions[:, -1] = last_fraction
+    return component_params, fractions
+
 def get_param_by_mean(distribution_type: DistributionType, component_number: int, mean_values: Iterable):
     assert len(mean_values) == component_number
     param_count = get_param_count(distribution_type)
@@ -355,6 +540,46 @@ def get_param_by_mean(distribution_type: DistributionType, component_number: int
     return tuple(param_values)
 
 
+class MixedFunction:
+    """
+    The function to calculate the mixed distribution of several components.
+
+    It has the same signature as the lambda generated by `get_lambda_str`, i.e. `mixed_func(x, *params)`,
+    but all components are calculated as one (components × classes) array and then mixed by the fractions.
+    It does not need to generate and compile any source code, and it can be pickled.
+    """
+    def __init__(self, distribution_type: DistributionType, component_number: int):
+        check_component_number(component_number)
+        self.__distribution_type = distribution_type
+        self.__component_number = component_number
+        self.__param_count = get_param_count(distribution_type)
+        self.__single_func = get_single_func(distribution_type)
+        self.__batch_func = get_batch_func(distribution_type)
+
+    @property
+    def distribution_type(self) -> DistributionType:
+        return self.__distribution_type
+
+    @property
+    def component_number(self) -> int:
+        return self.__component_number
+
+    def __call__(self, x: np.ndarray, *args: float) -> np.ndarray:
+        if self.__component_number == 1:
+            return self.__single_func(x, *args)
+        param_count = self.__param_count
+        component_param_count = self.__component_number * param_count
+        assert len(args) == component_param_count + self.__component_number - 1
+        component_params = np.array(args[:component_param_count], dtype=np.float64).reshape(self.__component_number, param_count, 1)
+        fractions = list(args[component_param_count:])
+        last_fraction = 1.0
+        for fraction in fractions:
+            last_fraction = last_fraction - fraction
+        fractions.append(last_fraction)
+        components = self.__batch_func(x, *[component_params[:, i] for i in range(param_count)])
+        return np.dot(fractions, components)
+
+
 class AlgorithmData:
     __cache = weakref.WeakValueDictionary()
     __cache_lock = Lock()
@@ -366,20 +591,16 @@ class AlgorithmData:
         self.__param_count = get_param_count(self.distribution_type)
         self.__param_names = get_param_names(self.distribution_type)
         self.__single_func = get_single_func(distribution_type)
-        self.__lambda_str = get_lambda_str(distribution_type, component_number)
-        self.__mixed_func = self.__get_func_by_lambda_str(self.__lambda_str)
+        self.__batch_func = get_batch_func(distribution_type)
+        self.__gradient_batch_func = get_gradient_batch_func(distribution_type)
+        self.__statistics_batch_func = get_statistics_batch_func(distribution_type)
+        self.__mixed_func = MixedFunction(distribution_type, component_number)
         self.__func_params = get_params(distribution_type, component_number)
         self.__bounds = get_bounds(self.__func_params)
         self.__defaults = get_defaults(self.__func_params)
         self.__constrains = get_constrains(component_number)
         self.__get_statistic_func()
 
-    def __get_func_by_lambda_str(self, lambda_str: str) -> Callable:
-        local_params = {"__tempMixedFunc": None}
-        exec("__tempMixedFunc=" + lambda_str, None, local_params)
-        mixed_func = local_params["__tempMixedFunc"]
-        return mixed_func
-
     def __get_statistic_func(self):
         if self.distribution_type == DistributionType.Normal:
             self.__mean = normal_mean
@@ -428,6 +649,10 @@ class AlgorithmData:
     def single_func(self) -> Callable:
         return self.__single_func
 
+    @property
+    def batch_func(self) -> Callable:
+        return self.__batch_func
+
     @property
     def mixed_func(self) -> Callable:
         return self.__mixed_func
@@ -485,17 +710,100 @@ class AlgorithmData:
         cls.__cache_lock.release()
         return data
 
-    def process_params(self, fitted_params: Iterable, x_offset: float) -> Tuple[Tuple[Tuple, float]]:
-        params_copy = np.array(fitted_params)
+    def shift_params(self, fitted_params: Iterable, x_offset: float) -> np.ndarray:
+        """
+        Move the location params of components along the x axis by `x_offset`, and return a copy.
+        """
+        params_copy = np.array(fitted_params, dtype=np.float64)
         param_count = get_param_count(self.distribution_type)
         if self.distribution_type == DistributionType.Normal or self.distribution_type == DistributionType.GeneralWeibull:
             for i in range(self.component_number):
                 params_copy[i*param_count] += x_offset
+        return params_copy
+
+    def process_params(self, fitted_params: Iterable, x_offset: float) -> Tuple[Tuple[Tuple, float]]:
+        params_copy = self.shift_params(fitted_params, x_offset)
         return process_params(self.distribution_type, self.component_number, params_copy)
 
     def get_param_by_mean(self, mean_values: Iterable):
         return get_param_by_mean(self.distribution_type, self.component_number, mean_values)
 
+    def unpack_params_batch(self, params_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return unpack_params_batch(self.distribution_type, self.component_number, params_matrix)
+
+    def evaluate_components_batch(self, x: np.ndarray, params_matrix: np.ndarray) -> np.ndarray:
+        """
+        Evaluate the weighted values of all components for N groups of params.
+
+        Args:
+            x: The x values with shape (M,), or (N, M) if each group uses its own x.
+            params_matrix: The raw params with shape (N, (P+1)*C-1), each row is a group of params
+                which can be passed to `mixed_func`.
+
+        Returns:
+            The `numpy.ndarray` with shape (N, C, M).
+        """
+        component_params, fractions = self.unpack_params_batch(params_matrix)
+        x = np.expand_dims(np.asarray(x, dtype=np.float64), -2)
+        components = self.__batch_func(x, *[component_params[:, :, i, np.newaxis] for i in range(self.param_count)])
+        return fractions[:, :, np.newaxis] * components
+
+    def evaluate_batch(self, x: np.ndarray, params_matrix: np.ndarray) -> np.ndarray:
+        """
+        Evaluate the mixed function for N groups of params in one pass.
+
+        The results are the same as calling `mixed_func(x, *params)` for each row of `params_matrix`.
+
+        Returns:
+            The `numpy.ndarray` with shape (N, M).
+        """
+        return np.sum(self.evaluate_components_batch(x, params_matrix), axis=1)
+
+    def evaluate_jacobian_batch(self, x: np.ndarray, params_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Evaluate the mixed function and its partial derivatives for N groups of params.
+
+        Returns:
+            The values with shape (N, M) and the jacobian matrices with shape (N, (P+1)*C-1, M).
+            The rows of each jacobian matrix have the same order as the raw params.
+        """
+        component_params, fractions = self.unpack_params_batch(params_matrix)
+        x = np.expand_dims(np.asarray(x, dtype=np.float64), -2)
+        components, derivatives = self.__gradient_batch_func(
+            x, *[component_params[:, :, i, np.newaxis] for i in range(self.param_count)])
+        sample_number, component_number, _ = components.shape
+        weights = fractions[:, :, np.newaxis]
+        values = np.sum(weights * components, axis=1)
+        jacobian = np.empty((sample_number, (self.param_count+1)*component_number-1, components.shape[-1]))
+        for i, derivative in enumerate(derivatives):
+            jacobian[:, i:component_number*self.param_count:self.param_count, :] = weights * derivative
+        # d(y)/d(f_i) = y_i - y_n, because f_n = 1-f_1-...-f_n-1
+        jacobian[:, component_number*self.param_count:, :] = components[:, :-1, :] - components[:, -1:, :]
+        return values, jacobian
+
+    def get_statistics_batch(self, component_params: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Calculate the statistic values (mean, median, mode, variance, standard deviation, skewness and kurtosis)
+        of many components in one call.
+
+        Args:
+            component_params: The params of components with shape (..., P), e.g. (results, components, P).
+
+        Returns:
+            A `dict` which uses the statistic keys (e.g. `MEAN_KEY`) and the values are arrays with shape (...).
+        """
+        component_params = np.asarray(component_params, dtype=np.float64)
+        assert component_params.shape[-1] == self.param_count
+        return self.__statistics_batch_func(*[component_params[..., i] for i in range(self.param_count)])
+
+    def get_squared_sum_of_residual_errors_gradient(self, x: np.ndarray, target_y: np.ndarray, params: Iterable[float]) -> np.ndarray:
+        """
+        The gradient of the sum of squared residual errors (i.e. `sum((mixed_func(x, *params) - target_y)^2)`)
+        with respect to the raw params.
+        """
+        values, jacobian = self.evaluate_jacobian_batch(x, np.asarray(params, dtype=np.float64)[np.newaxis, :])
+        return 2 * jacobian[0] @ (values[0] - target_y)
+
 
 if __name__ == "__main__":
     # test the generating speed of algorithm data
@@ -518,3 +826,57 @@ if __name__ == "__main__":
             data_list_cached.append(data)
     end_cached = time.time()
     print("Cached time spent:", end_cached-start_cached, "s")
+
+    # compare with the old way which compiles the lambda str by `exec`
+    def get_func_by_lambda_str(lambda_str: str) -> Callable:
+        local_params = {"__tempMixedFunc": None}
+        exec("__tempMixedFunc=" + lambda_str, None, local_params)
+        return local_params["__tempMixedFunc"]
+
+    start_compiled = time.time()
+    compiled_funcs = []
+    for i in range(10000):
+        for component_number in range(3, 11):
+            compiled_funcs.append(get_func_by_lambda_str(get_lambda_str(DistributionType.GeneralWeibull, component_number)))
+    end_compiled = time.time()
+    print("Compiling time spent of lambda funcs:", end_compiled-start_compiled, "s")
+
+    start_generic = time.time()
+    generic_funcs = []
+    for i in range(10000):
+        for component_number in range(3, 11):
+            generic_funcs.append(MixedFunction(DistributionType.GeneralWeibull, component_number))
+    end_generic = time.time()
+    print("Constructing time spent of mixed funcs:", end_generic-start_generic, "s")
+
+    # test the evaluating speed of mixed funcs
+    x = np.linspace(1, 101, 101)
+    for component_number in range(3, 11):
+        data = AlgorithmData.get_algorithm_data(DistributionType.GeneralWeibull, component_number)
+        compiled_func = get_func_by_lambda_str(get_lambda_str(DistributionType.GeneralWeibull, component_number))
+        params = get_param_by_mean(DistributionType.GeneralWeibull, component_number, np.linspace(10, 90, component_number))
+        start_compiled = time.time()
+        for i in range(10000):
+            compiled_func(x, *params)
+        end_compiled = time.time()
+        start_generic = time.time()
+        for i in range(10000):
+            data.mixed_func(x, *params)
+        end_generic = time.time()
+        print("Evaluating time spent of {0} components, lambda func: {1:.4f} s, mixed func: {2:.4f} s".format(
+            component_number, end_compiled-start_compiled, end_generic-start_generic))
+
+    # test the calculating speed of the statistic values of 100k fitting results
+    data = AlgorithmData.get_algorithm_data(DistributionType.GeneralWeibull, 4)
+    component_params = np.random.uniform(1.0, 20.0, (100000, 4, 3))
+    start_batch = time.time()
+    data.get_statistics_batch(component_params)
+    end_batch = time.time()
+    print("Batched statistic time spent of 100k results:", end_batch-start_batch, "s")
+    start_scalar = time.time()
+    for params in component_params[:1000].reshape(-1, 3):
+        for func in (data.mean, data.median, data.mode, data.variance,
+                     data.standard_deviation, data.skewness, data.kurtosis):
+            func(*params)
+    end_scalar = time.time()
+    print("Scalar statistic time spent of 1k results:", end_scalar-start_scalar, "s")
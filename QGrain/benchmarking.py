@@ -0,0 +1,80 @@
+__all__ = ["get_random_samples", "get_ordered_samples", "compare_settings"]
+
+import time
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from QGrain.algorithms import AlgorithmData, DistributionType
+from QGrain.models.AlgorithmSettings import AlgorithmSettings
+from QGrain.models.SampleData import SampleData
+from QGrain.resolvers.HeadlessResolver import FittingTask, HeadlessResolver
+
+
+def get_random_samples(distribution_type: DistributionType, component_number: int, sample_number: int,
+                       noise: float = 1e-4, random_state: np.random.RandomState = None) -> List[SampleData]:
+    """
+    Get the samples whose components have random mean values (between the 15th and 85th bins) and random fractions.
+    """
+    if random_state is None:
+        random_state = np.random.RandomState(42)
+    data = AlgorithmData.get_algorithm_data(distribution_type, component_number)
+    classes = np.logspace(0, 3, 101)
+    bin_numbers = np.linspace(1, 101, 101)
+    samples = []
+    for i in range(sample_number):
+        mean_values = np.sort(random_state.uniform(15, 85, component_number))
+        params = np.array(data.get_param_by_mean(mean_values))
+        if component_number > 1:
+            params[1-component_number:] = random_state.dirichlet(np.ones(component_number)*5)[:-1]
+        distribution = np.clip(data.mixed_func(bin_numbers, *params) +
+                               random_state.normal(0, noise, len(bin_numbers)), 0.0, None)
+        samples.append(SampleData("Sample_{0}".format(i), classes, distribution))
+    return samples
+
+
+def get_ordered_samples(distribution_type: DistributionType, component_number: int, sample_number: int,
+                        noise: float = 0.0, random_state: np.random.RandomState = None) -> List[SampleData]:
+    """
+    Get the samples whose params change slowly along the samples, like a core.
+    """
+    if random_state is None:
+        random_state = np.random.RandomState(42)
+    data = AlgorithmData.get_algorithm_data(distribution_type, component_number)
+    classes = np.logspace(0, 3, 101)
+    bin_numbers = np.linspace(1, 101, 101)
+    samples = []
+    for i in range(sample_number):
+        mean_values = np.linspace(25, 75, component_number) + np.sin(i / 5) * 3
+        params = data.get_param_by_mean(mean_values)
+        distribution = data.mixed_func(bin_numbers, *params)
+        if noise > 0.0:
+            distribution = np.clip(distribution + random_state.normal(0, noise, len(distribution)), 0.0, None)
+        samples.append(SampleData("Sample_{0}".format(i), classes, distribution))
+    return samples
+
+
+def compare_settings(named_settings: Dict[str, AlgorithmSettings],
+                     distribution_types: Iterable[DistributionType] = (DistributionType.Normal, DistributionType.GeneralWeibull),
+                     component_numbers: Iterable[int] = (2, 3, 4),
+                     sample_number: int = 20, noise: float = 1e-4):
+    """
+    Fit the same random samples by each settings, and print the wall time, the mean count of evaluations,
+    the median error and the success rate (i.e. the error reaches the level of noise).
+    """
+    for distribution_type in distribution_types:
+        for component_number in component_numbers:
+            samples = get_random_samples(distribution_type, component_number, sample_number, noise=noise)
+            for name, settings in named_settings.items():
+                resolver = HeadlessResolver()
+                start = time.time()
+                evaluation_numbers, errors = [], []
+                for sample in samples:
+                    flag, _, result = resolver.execute_task(FittingTask(sample, distribution_type, component_number, settings))
+                    evaluation_numbers.append(resolver.problem.evaluation_number)
+                    if flag:
+                        errors.append(result.mean_squared_error)
+                succeeded_number = sum(error < 2 * noise**2 for error in errors)
+                print("{0}, {1} components, {2}: {3:.2f} s, mean evaluations: {4:.0f}, median MSE: {5:.3e}, success rate: {6:.0%}".format(
+                    distribution_type.name, component_number, name, time.time()-start,
+                    np.mean(evaluation_numbers), np.median(errors), succeeded_number / len(samples)))
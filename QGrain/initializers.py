@@ -0,0 +1,95 @@
+__all__ = ["InitialGuessMethod", "get_peak_indexes", "get_peak_initial_guesses"]
+
+from enum import Enum, unique
+from typing import Tuple
+
+import numpy as np
+
+from QGrain.algorithms import AlgorithmData
+
+
+@unique
+class InitialGuessMethod(Enum):
+    # the fixed default params of `AlgorithmData`
+    Defaults = 0
+    # the params converted from the peaks and shoulders of distributions
+    Peaks = 1
+
+
+def get_peak_indexes(target_y: np.ndarray, component_number: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the positions which are most likely to be the modes of components.
+
+    The modes of components are the local minima of the second derivative (i.e. the strongest
+    downward curvature), even if the component is a shoulder of another one and has no peak.
+    If there are not enough candidates, the quantiles of the distribution will be used.
+
+    Args:
+        target_y: The distributions with shape (K, M).
+        component_number: The number of positions to find of each distribution.
+
+    Returns:
+        The sorted indexes with shape (K, C), and the heights of the smoothed distributions at these indexes.
+    """
+    target_y = np.asarray(target_y, dtype=np.float64)
+    sample_number, class_number = target_y.shape
+    # smooth the distributions to restrain the noise
+    smoothed = target_y.copy()
+    smoothed[:, 1:-1] = (target_y[:, :-2] + 2*target_y[:, 1:-1] + target_y[:, 2:]) / 4
+    second_derivative = np.zeros_like(smoothed)
+    second_derivative[:, 1:-1] = smoothed[:, :-2] - 2*smoothed[:, 1:-1] + smoothed[:, 2:]
+    is_candidate = np.zeros_like(smoothed, dtype=bool)
+    is_candidate[:, 2:-2] = (second_derivative[:, 2:-2] < second_derivative[:, 1:-3]) & \
+        (second_derivative[:, 2:-2] <= second_derivative[:, 3:-1]) & \
+        (second_derivative[:, 2:-2] < 0.0) & \
+        (smoothed[:, 2:-2] > np.max(smoothed, axis=1, keepdims=True)*1e-2)
+    scores = np.where(is_candidate, -second_derivative, -np.inf)
+    indexes = np.argsort(-scores, axis=1, kind="stable")[:, :component_number]
+    found = np.isfinite(np.take_along_axis(scores, indexes, axis=1))
+    # use the quantiles if the candidates are not enough
+    cumulative = np.cumsum(smoothed, axis=1)
+    cumulative /= np.maximum(cumulative[:, -1:], 1e-300)
+    quantiles = (np.arange(component_number) + 0.5) / component_number
+    quantile_indexes = np.array([np.searchsorted(row, quantiles) for row in cumulative])
+    quantile_indexes = np.clip(quantile_indexes, 0, class_number-1)
+    indexes = np.sort(np.where(found, indexes, quantile_indexes), axis=1)
+    heights = np.take_along_axis(smoothed, indexes, axis=1)
+    return indexes, heights
+
+
+def get_peak_initial_guesses(algorithm_data: AlgorithmData, x: np.ndarray, target_y: np.ndarray) -> np.ndarray:
+    """
+    Get the initial guesses of a batch of distributions by their peaks.
+
+    The x values of peaks are converted to params by `AlgorithmData.get_param_by_mean`,
+    and the fractions are proportional to the heights of peaks.
+
+    Args:
+        algorithm_data: The `AlgorithmData` of the distribution type and component number.
+        x: The x values in the fitting space, shape (M,) or (K, M).
+        target_y: The distributions with shape (K, M).
+
+    Returns:
+        The initial guesses with shape (K, (P+1)*C-1).
+    """
+    component_number = algorithm_data.component_number
+    target_y = np.asarray(target_y, dtype=np.float64)
+    x = np.broadcast_to(np.asarray(x, dtype=np.float64), target_y.shape)
+    indexes, heights = get_peak_indexes(target_y, component_number)
+    mean_values = np.take_along_axis(x, indexes, axis=1)
+    initial_guesses = np.array([algorithm_data.get_param_by_mean(values) for values in mean_values], dtype=np.float64)
+    if component_number > 1:
+        # avoid the zero fraction, it will make the component useless
+        heights = np.maximum(heights, np.max(heights, axis=1, keepdims=True)*1e-2) + 1e-300
+        fractions = heights / np.sum(heights, axis=1, keepdims=True)
+        initial_guesses[:, 1-component_number:] = fractions[:, :-1]
+    return initial_guesses
+
+
+if __name__ == "__main__":
+    # compare the cost of fitting with the default initial guess and the peak-based initial guess
+    from QGrain.benchmarking import compare_settings
+    from QGrain.initializers import InitialGuessMethod
+    from QGrain.models.AlgorithmSettings import AlgorithmSettings
+
+    compare_settings({method.name: AlgorithmSettings(initial_guess_method=method) for method in InitialGuessMethod})
@@ -0,0 +1,359 @@
+__all__ = ["KernelBackend", "HAS_NUMBA", "KERNEL_BACKEND_ENVIRONMENT_KEY",
+           "get_kernel_backend", "create_workspace",
+           "KernelWorkspace", "NumbaKernelWorkspace"]
+
+import logging
+import math
+import os
+from enum import Enum, unique
+from typing import Iterable
+
+import numpy as np
+
+from QGrain.algorithms import DistributionType, check_component_number, get_param_count
+
+try:
+    import numba
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+SQRT_2PI = np.sqrt(2*np.pi)
+KERNEL_BACKEND_ENVIRONMENT_KEY = "QGRAIN_KERNEL_BACKEND"
+logger = logging.getLogger(name="root.kernels")
+
+
+@unique
+class KernelBackend(Enum):
+    NumPy = 0
+    Numba = 1
+
+
+def get_kernel_backend(preferred: KernelBackend = None) -> KernelBackend:
+    """
+    Get the backend which is actually used.
+
+    If `preferred` is `None`, the environment variable `QGRAIN_KERNEL_BACKEND` (`numpy` or `numba`) will be checked,
+    and NumPy is the default. It will fall back to NumPy if Numba is not installed.
+    """
+    if preferred is None:
+        value = os.environ.get(KERNEL_BACKEND_ENVIRONMENT_KEY, "").strip().lower()
+        preferred = KernelBackend.NumPy
+        for backend in KernelBackend:
+            if backend.name.lower() == value:
+                preferred = backend
+                break
+        else:
+            if value != "":
+                logger.warning("The kernel backend [%s] is unknown, use NumPy instead.", value)
+    if preferred == KernelBackend.Numba and not HAS_NUMBA:
+        logger.warning("Numba is not installed, the kernel backend falls back to NumPy.")
+        return KernelBackend.NumPy
+    return preferred
+
+
+def create_workspace(distribution_type: DistributionType, component_number: int,
+                     x: np.ndarray, target_y: np.ndarray,
+                     backend: KernelBackend = None):
+    backend = get_kernel_backend(backend)
+    if backend == KernelBackend.NumPy:
+        return KernelWorkspace(distribution_type, component_number, x, target_y)
+    elif backend == KernelBackend.Numba:
+        return NumbaKernelWorkspace(distribution_type, component_number, x, target_y)
+    else:
+        raise NotImplementedError(backend)
+
+
+class KernelWorkspace:
+    """
+    The preallocated buffers to evaluate the objective function of one sample.
+
+    All kernels write into these buffers in place (by the `out` and `where` arguments of ufuncs),
+    so evaluating the objective function does not allocate any new array, including the params
+    which are out of the domain. Only the values are evaluated here, the gradient of the objective
+    is still calculated by the allocating `AlgorithmData.get_squared_sum_of_residual_errors_gradient`.
+
+    Note: Create a new workspace if the distribution type, component number or valid data range changed.
+
+    Attributes:
+        x: The x values (i.e. trimmed fitting space x minus x offset) with shape (M,).
+        target_y: The trimmed target distribution with shape (M,).
+    """
+    def __init__(self, distribution_type: DistributionType, component_number: int,
+                 x: np.ndarray, target_y: np.ndarray):
+        check_component_number(component_number)
+        assert len(x) == len(target_y)
+        self.__distribution_type = distribution_type
+        self.__component_number = component_number
+        self.__param_count = get_param_count(distribution_type)
+        self.__x = np.array(x, dtype=np.float64)
+        self.__target_y = np.array(target_y, dtype=np.float64)
+        shape = (component_number, len(self.__x))
+        # the buffers of params, the views of each kind of param are created only once
+        self.__component_params = np.zeros((component_number, self.__param_count), dtype=np.float64)
+        self.__param_views = [self.__component_params[:, i:i+1] for i in range(self.__param_count)]
+        self.__fractions = np.ones(component_number, dtype=np.float64)
+        self.__coefficients = np.zeros((component_number, 1), dtype=np.float64)
+        self.__exponents = np.zeros((component_number, 1), dtype=np.float64)
+        # the shape params (e.g. sigma, beta and eta) must be positive
+        if distribution_type == DistributionType.Normal:
+            self.__shape_param_slice = slice(1, None)
+        elif distribution_type == DistributionType.Weibull:
+            self.__shape_param_slice = slice(0, None)
+        elif distribution_type == DistributionType.GeneralWeibull:
+            self.__shape_param_slice = slice(1, None)
+        else:
+            raise NotImplementedError(distribution_type)
+        self.__shape_params = self.__component_params[:, self.__shape_param_slice]
+        self.__invalid = np.zeros(self.__shape_params.shape, dtype=bool)
+        self.__invalid_components = np.zeros((component_number, 1), dtype=bool)
+        # the buffers of values
+        self.__components = np.zeros(shape, dtype=np.float64)
+        self.__temp = np.zeros(shape, dtype=np.float64)
+        self.__non_zero = np.zeros(shape, dtype=bool)
+        self.__values = np.zeros(len(self.__x), dtype=np.float64)
+
+    @property
+    def distribution_type(self) -> DistributionType:
+        return self.__distribution_type
+
+    @property
+    def component_number(self) -> int:
+        return self.__component_number
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.__x
+
+    @property
+    def target_y(self) -> np.ndarray:
+        return self.__target_y
+
+    def __load_params(self, args: Iterable[float]):
+        component_param_count = self.__component_number * self.__param_count
+        self.__component_params.flat[:] = args[:component_param_count]
+        if self.__component_number > 1:
+            fractions = args[component_param_count:]
+            self.__fractions[:-1] = fractions
+            last_fraction = 1.0
+            for fraction in fractions:
+                last_fraction = last_fraction - fraction
+            self.__fractions[-1] = last_fraction
+
+    def __normal(self, mu: np.ndarray, sigma: np.ndarray):
+        components, coefficients, exponents = self.__components, self.__coefficients, self.__exponents
+        # 1/(sigma*sqrt(2*pi))*exp(-(x-mu)^2/(2*sigma^2))
+        np.subtract(self.__x, mu, out=components)
+        np.square(components, out=components)
+        np.square(sigma, out=exponents)
+        np.multiply(exponents, -2, out=exponents)
+        np.divide(components, exponents, out=components)
+        np.exp(components, out=components)
+        np.multiply(sigma, SQRT_2PI, out=coefficients)
+        np.reciprocal(coefficients, out=coefficients)
+        np.multiply(coefficients, components, out=components)
+
+    def __weibull(self, x: np.ndarray, beta: np.ndarray, eta: np.ndarray):
+        components, temp, non_zero = self.__components, self.__temp, self.__non_zero
+        coefficients, exponents = self.__coefficients, self.__exponents
+        # (beta/eta) * (x/eta)^(beta-1) * exp(-(x/eta)^beta) while x > 0, otherwise 0
+        np.greater(x, 0.0, out=non_zero)
+        components.fill(0.0)
+        np.divide(x, eta, out=temp)
+        np.subtract(beta, 1, out=exponents)
+        np.power(temp, exponents, out=components, where=non_zero)
+        np.power(temp, beta, out=temp, where=non_zero)
+        np.negative(temp, out=temp, where=non_zero)
+        np.exp(temp, out=temp, where=non_zero)
+        np.divide(beta, eta, out=coefficients)
+        np.multiply(components, coefficients, out=components, where=non_zero)
+        np.multiply(components, temp, out=components, where=non_zero)
+
+    def __evaluate_components(self):
+        mu_or_beta, *other_params = self.__param_views
+        if self.__distribution_type == DistributionType.Normal:
+            self.__normal(mu_or_beta, other_params[0])
+        elif self.__distribution_type == DistributionType.Weibull:
+            self.__weibull(self.__x, mu_or_beta, other_params[0])
+        elif self.__distribution_type == DistributionType.GeneralWeibull:
+            # use `temp` to store x-mu, `__weibull` reads it before overwriting
+            np.subtract(self.__x, mu_or_beta, out=self.__temp)
+            self.__weibull(self.__temp, other_params[0], other_params[1])
+        else:
+            raise NotImplementedError(self.__distribution_type)
+
+    def __has_invalid_params(self) -> bool:
+        np.less_equal(self.__shape_params, 0.0, out=self.__invalid)
+        return self.__invalid.any()
+
+    def evaluate(self, args: Iterable[float]) -> np.ndarray:
+        """
+        Evaluate the mixed function at `x`.
+
+        Note: The returned array is a buffer of this workspace, it will be overwritten by the next call.
+        """
+        self.__load_params(args)
+        if self.__has_invalid_params():
+            # the components with invalid params are zeros, like `weibull` and `normal`
+            with np.errstate(all="ignore"):
+                self.__evaluate_components()
+            np.any(self.__invalid, axis=1, keepdims=True, out=self.__invalid_components)
+            np.copyto(self.__components, 0.0, where=self.__invalid_components)
+        else:
+            self.__evaluate_components()
+        np.dot(self.__fractions, self.__components, out=self.__values)
+        return self.__values
+
+    def get_squared_sum_of_residual_errors(self, args: Iterable[float]) -> float:
+        values = self.evaluate(args)
+        np.subtract(values, self.__target_y, out=values)
+        return np.dot(values, values)
+
+
+if HAS_NUMBA:
+    @numba.njit(cache=True)
+    def _fused_pdf(distribution_code: int, x: float, params: np.ndarray) -> float:
+        # the codes are the values of `DistributionType`
+        if distribution_code == 0:
+            mu, sigma = params[0], params[1]
+            if sigma <= 0.0:
+                return 0.0
+            return 1/(sigma*math.sqrt(2*math.pi))*math.exp(-(x-mu)**2/(2*sigma**2))
+        if distribution_code == 1:
+            beta, eta = params[0], params[1]
+        else:
+            x = x - params[0]
+            beta, eta = params[1], params[2]
+        if beta <= 0.0 or eta <= 0.0 or x <= 0.0:
+            return 0.0
+        return (beta/eta) * (x/eta)**(beta-1) * math.exp(-(x/eta)**beta)
+
+    @numba.njit(cache=True)
+    def _fused_evaluate(distribution_code: int, x: np.ndarray, component_params: np.ndarray,
+                        fractions: np.ndarray, values: np.ndarray):
+        for j in range(x.shape[0]):
+            value = 0.0
+            for i in range(component_params.shape[0]):
+                value += fractions[i] * _fused_pdf(distribution_code, x[j], component_params[i])
+            values[j] = value
+
+    @numba.njit(cache=True)
+    def _fused_squared_sum_of_residual_errors(distribution_code: int, x: np.ndarray, target_y: np.ndarray,
+                                              component_params: np.ndarray, fractions: np.ndarray) -> float:
+        # fuse the pdf evaluation, the fraction mixing and the residual into one loop
+        error = 0.0
+        for j in range(x.shape[0]):
+            value = 0.0
+            for i in range(component_params.shape[0]):
+                value += fractions[i] * _fused_pdf(distribution_code, x[j], component_params[i])
+            error += (value - target_y[j])**2
+        return error
+
+
+class NumbaKernelWorkspace:
+    """
+    The workspace which uses the Numba-compiled kernels.
+
+    It has the same interface as `KernelWorkspace`, but the objective function is a fused loop
+    without any temporary array of components. Only available while Numba is installed.
+    """
+    def __init__(self, distribution_type: DistributionType, component_number: int,
+                 x: np.ndarray, target_y: np.ndarray):
+        assert HAS_NUMBA
+        check_component_number(component_number)
+        assert len(x) == len(target_y)
+        self.__distribution_type = distribution_type
+        self.__distribution_code = distribution_type.value
+        self.__component_number = component_number
+        self.__param_count = get_param_count(distribution_type)
+        self.__x = np.array(x, dtype=np.float64)
+        self.__target_y = np.array(target_y, dtype=np.float64)
+        self.__component_params = np.zeros((component_number, self.__param_count), dtype=np.float64)
+        self.__fractions = np.ones(component_number, dtype=np.float64)
+        self.__values = np.zeros(len(self.__x), dtype=np.float64)
+
+    @property
+    def distribution_type(self) -> DistributionType:
+        return self.__distribution_type
+
+    @property
+    def component_number(self) -> int:
+        return self.__component_number
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.__x
+
+    @property
+    def target_y(self) -> np.ndarray:
+        return self.__target_y
+
+    def __load_params(self, args: Iterable[float]):
+        component_param_count = self.__component_number * self.__param_count
+        self.__component_params.flat[:] = args[:component_param_count]
+        if self.__component_number > 1:
+            fractions = args[component_param_count:]
+            self.__fractions[:-1] = fractions
+            last_fraction = 1.0
+            for fraction in fractions:
+                last_fraction = last_fraction - fraction
+            self.__fractions[-1] = last_fraction
+
+    def evaluate(self, args: Iterable[float]) -> np.ndarray:
+        self.__load_params(args)
+        _fused_evaluate(self.__distribution_code, self.__x, self.__component_params, self.__fractions, self.__values)
+        return self.__values
+
+    def get_squared_sum_of_residual_errors(self, args: Iterable[float]) -> float:
+        self.__load_params(args)
+        return _fused_squared_sum_of_residual_errors(
+            self.__distribution_code, self.__x, self.__target_y,
+            self.__component_params, self.__fractions)
+
+
+if __name__ == "__main__":
+    # compare the evaluating speed with the way which allocates new arrays
+    import time
+    import tracemalloc
+
+    from QGrain.algorithms import AlgorithmData, get_param_by_mean
+
+    x = np.linspace(1, 101, 101)
+    for distribution_type in (DistributionType.Normal, DistributionType.Weibull, DistributionType.GeneralWeibull):
+        for component_number in (1, 3, 5):
+            data = AlgorithmData.get_algorithm_data(distribution_type, component_number)
+            params = get_param_by_mean(distribution_type, component_number, np.linspace(20, 80, component_number))
+            target_y = data.mixed_func(x, *params)
+            workspace = KernelWorkspace(distribution_type, component_number, x, target_y)
+            evaluation_number = 20000
+
+            def allocating():
+                return np.sum(np.square(data.mixed_func(x, *params) - target_y))
+            def in_place():
+                return workspace.get_squared_sum_of_residual_errors(params)
+
+            speeds = []
+            for func in (allocating, in_place):
+                func()
+                start = time.time()
+                for i in range(evaluation_number):
+                    func()
+                speeds.append(evaluation_number / (time.time()-start))
+            allocations = []
+            for func in (allocating, in_place):
+                tracemalloc.start()
+                for i in range(1000):
+                    func()
+                allocations.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            print("{0}, {1} components, evaluations per second: {2:.0f} -> {3:.0f}, peak traced memory: {4} -> {5} bytes".format(
+                distribution_type.name, component_number, speeds[0], speeds[1], allocations[0], allocations[1]))
+
+            if HAS_NUMBA:
+                numba_workspace = NumbaKernelWorkspace(distribution_type, component_number, x, target_y)
+                numba_workspace.get_squared_sum_of_residual_errors(params)
+                start = time.time()
+                for i in range(evaluation_number):
+                    numba_workspace.get_squared_sum_of_residual_errors(params)
+                print("{0}, {1} components, evaluations per second of Numba backend: {2:.0f}".format(
+                    distribution_type.name, component_number, evaluation_number / (time.time()-start)))
@@ -1,5 +1,9 @@
 import typing
 
+from QGrain.algorithms import GlobalOptimizer, LocalMinimizer
+from QGrain.initializers import InitialGuessMethod
+from QGrain.kernels import KernelBackend
+
 
 class AlgorithmSettings:
     def __init__(self, global_optimization_maximum_iteration: int = 100,
@@ -8,7 +12,19 @@ class AlgorithmSettings:
                  global_optimization_minimizer_tolerance_level: typing.Union[int, float] = 8,
                  global_optimization_minimizer_maximum_iteration: int = 500,
                  final_optimization_minimizer_tolerance_level=100,
-                 final_optimization_minimizer_maximum_iteration=1000):
+                 final_optimization_minimizer_maximum_iteration=1000,
+                 kernel_backend: KernelBackend = None,
+                 initial_guess_method: InitialGuessMethod = InitialGuessMethod.Defaults,
+                 time_budget: typing.Union[int, float] = None,
+                 target_objective: typing.Union[int, float] = None,
+                 plateau_iteration: int = None,
+                 plateau_tolerance: typing.Union[int, float] = 1e-4,
+                 global_optimizer: GlobalOptimizer = GlobalOptimizer.BasinHopping,
+                 start_number: int = 8,
+                 population_size: int = 32,
+                 maximum_generation: int = 1000,
+                 local_minimizer: LocalMinimizer = LocalMinimizer.SLSQP,
+                 history_capacity: int = 256):
 
         # validation
         assert isinstance(global_optimization_maximum_iteration, int)
@@ -20,6 +36,27 @@ class AlgorithmSettings:
         assert isinstance(
             final_optimization_minimizer_tolerance_level, (int, float))
         assert isinstance(final_optimization_minimizer_maximum_iteration, int)
+        # `None` means to use the environment variable `QGRAIN_KERNEL_BACKEND`
+        assert kernel_backend is None or isinstance(kernel_backend, KernelBackend)
+        assert isinstance(initial_guess_method, InitialGuessMethod)
+        # the early-stop conditions, `None` means disabled
+        assert time_budget is None or (isinstance(time_budget, (int, float)) and time_budget > 0.0)
+        assert target_objective is None or (isinstance(target_objective, (int, float)) and target_objective >= 0.0)
+        assert plateau_iteration is None or (isinstance(plateau_iteration, int) and plateau_iteration > 0)
+        assert isinstance(plateau_tolerance, (int, float))
+        assert plateau_tolerance >= 0.0
+        # the number of starting points of multi-start, and the population size of differential evolution
+        assert isinstance(global_optimizer, GlobalOptimizer)
+        assert isinstance(start_number, int)
+        assert isinstance(population_size, int)
+        assert start_number > 0
+        assert population_size >= 4
+        assert isinstance(maximum_generation, int)
+        assert maximum_generation > 0
+        assert isinstance(local_minimizer, LocalMinimizer)
+        # the maximum count of iterations to record, 0 means disabled, see `FittingHistory`
+        assert isinstance(history_capacity, int)
+        assert history_capacity == 0 or history_capacity >= 2
         assert global_optimization_maximum_iteration > 0
         assert global_optimization_success_iteration > 0
         assert global_optimization_step_size > 0.0
@@ -35,6 +72,18 @@ class AlgorithmSettings:
         self.__global_optimization_minimizer_maximum_iteration = global_optimization_minimizer_maximum_iteration
         self.__final_optimization_minimizer_tolerance_level = final_optimization_minimizer_tolerance_level
         self.__final_optimization_minimizer_maximum_iteration = final_optimization_minimizer_maximum_iteration
+        self.__kernel_backend = kernel_backend
+        self.__initial_guess_method = initial_guess_method
+        self.__time_budget = time_budget
+        self.__target_objective = target_objective
+        self.__plateau_iteration = plateau_iteration
+        self.__plateau_tolerance = plateau_tolerance
+        self.__global_optimizer = global_optimizer
+        self.__start_number = start_number
+        self.__population_size = population_size
+        self.__maximum_generation = maximum_generation
+        self.__local_minimizer = local_minimizer
+        self.__history_capacity = history_capacity
 
     @property
     def global_optimization_maximum_iteration(self):
@@ -63,3 +112,60 @@ class AlgorithmSettings:
     @property
     def final_optimization_minimizer_maximum_iteration(self):
         return self.__final_optimization_minimizer_maximum_iteration
+
+    @property
+    def kernel_backend(self):
+        return self.__kernel_backend
+
+    @property
+    def initial_guess_method(self):
+        return self.__initial_guess_method
+
+    @property
+    def time_budget(self):
+        return self.__time_budget
+
+    @property
+    def target_objective(self):
+        return self.__target_objective
+
+    @property
+    def plateau_iteration(self):
+        return self.__plateau_iteration
+
+    @property
+    def plateau_tolerance(self):
+        return self.__plateau_tolerance
+
+    @property
+    def global_optimizer(self):
+        return self.__global_optimizer
+
+    @property
+    def start_number(self):
+        return self.__start_number
+
+    @property
+    def population_size(self):
+        return self.__population_size
+
+    @property
+    def maximum_generation(self):
+        return self.__maximum_generation
+
+    @property
+    def local_minimizer(self):
+        return self.__local_minimizer
+
+    @property
+    def history_capacity(self):
+        return self.__history_capacity
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        # all fields with their public names, e.g. to build the key of cache
+        prefix = "_{0}__".format(AlgorithmSettings.__name__)
+        return {name[len(prefix):]: value for name, value in vars(self).items() if name.startswith(prefix)}
+
+    def replace(self, **changes) -> "AlgorithmSettings":
+        # the public names of fields are the same as the arguments of `__init__`
+        return AlgorithmSettings(**{**self.to_dict(), **changes})
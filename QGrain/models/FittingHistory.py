@@ -0,0 +1,97 @@
+__all__ = ["FittingHistory"]
+
+from typing import Iterable, Iterator
+
+import numpy as np
+
+
+class FittingHistory:
+    """
+    The class to record the iterations of fitting with a fixed capacity.
+
+    The params are stored in a preallocated 2-D array. When it is full, every other row
+    is dropped (the first one is always kept) and the stride of recording is doubled,
+    i.e. every k-th iteration is kept. The last iteration is always kept too.
+    Hence at most `capacity` rows are stored, no matter how many iterations there are.
+
+    Attributes:
+        param_count: The count of params of each iteration.
+        capacity: The maximum count of stored iterations, must be not less than 2.
+    """
+    def __init__(self, param_count: int, capacity: int = 256):
+        assert isinstance(param_count, int)
+        assert isinstance(capacity, int)
+        assert param_count > 0
+        assert capacity >= 2
+        # one row is reserved for the last iteration
+        self.__buffer = np.empty((capacity-1, param_count), dtype=np.float64)
+        self.__size = 0
+        self.__stride = 1
+        self.__iteration_number = 0
+        self.__last_params = None # type: np.ndarray
+
+    @property
+    def capacity(self) -> int:
+        return len(self.__buffer) + 1
+
+    @property
+    def stride(self) -> int:
+        return self.__stride
+
+    @property
+    def iteration_number(self) -> int:
+        return self.__iteration_number
+
+    @property
+    def params(self) -> np.ndarray:
+        """
+        The compact copy of the stored iterations with shape (N, param_count).
+        """
+        stored = self.__buffer[:self.__size]
+        if self.__iteration_number > 0 and (self.__iteration_number-1) % self.__stride != 0:
+            return np.concatenate([stored, self.__last_params[np.newaxis, :]], axis=0)
+        else:
+            return stored.copy()
+
+    def __len__(self) -> int:
+        return len(self.params)
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        return iter(self.params)
+
+    def decimate(self):
+        kept = self.__buffer[:self.__size:2]
+        size = len(kept)
+        self.__buffer[:size] = kept
+        self.__size = size
+        self.__stride *= 2
+
+    def append(self, params: Iterable[float]):
+        index = self.__iteration_number
+        self.__iteration_number += 1
+        self.__last_params = np.array(params, dtype=np.float64)
+        if index % self.__stride != 0:
+            return
+        if self.__size == len(self.__buffer):
+            self.decimate()
+            if index % self.__stride != 0:
+                return
+        self.__buffer[self.__size] = self.__last_params
+        self.__size += 1
+
+
+if __name__ == "__main__":
+    # compare the pickled size of the list of arrays and the capped history
+    import pickle
+    import time
+
+    param_count = 11
+    iterations = [np.random.random(param_count) for i in range(5000)]
+    start = time.perf_counter()
+    history = FittingHistory(param_count)
+    for params in iterations:
+        history.append(params)
+    print("Appending {0} iterations took {1:.2f} ms, stride: {2}".format(
+        len(iterations), (time.perf_counter()-start)*1000, history.stride))
+    print("Pickled size of the list: {0} bytes".format(len(pickle.dumps(iterations))))
+    print("Pickled size of the history params: {0} bytes".format(len(pickle.dumps(history.params))))
@@ -1,6 +1,7 @@
-__all__ = ["ComponentFittingResult", "FittingResult"]
+__all__ = ["StopReason", "ComponentFittingResult", "FittingResult"]
 
 import copy
+from enum import Enum, unique
 from typing import Callable, Dict, Iterable, List, Tuple
 from uuid import UUID, uuid4
 
@@ -8,7 +9,19 @@ import numpy as np
 from scipy.interpolate import interp1d
 from scipy.stats import kendalltau, pearsonr, spearmanr
 
-from QGrain.algorithms import AlgorithmData, DistributionType
+from QGrain.algorithms import (KURTOSIS_KEY, MEAN_KEY, MEDIAN_KEY, MODE_KEY,
+                               SKEWNESS_KEY, STANDARD_DEVIATION_KEY,
+                               VARIANCE_KEY, AlgorithmData, DistributionType)
+
+
+@unique
+class StopReason(Enum):
+    # the optimizers finished by their own termination conditions
+    Completed = 0
+    # stopped early and the best solution so far was returned
+    TimeBudget = 1
+    TargetObjective = 2
+    Plateau = 3
 
 
 class ComponentFittingResult:
@@ -54,22 +67,24 @@ class ComponentFittingResult:
         self.__fraction = fraction
         self.__component_y = algorithm_data.single_func(self.__fitting_space_x, *params) * fraction
         x_to_real = interp1d(self.__fitting_space_x, self.__real_x)
+        # calculate all statistic values in one call to reuse the intermediate values
+        statistics = algorithm_data.get_statistics_batch(params)
         try:
-            self.__mean = x_to_real(algorithm_data.mean(*params)).max()
+            self.__mean = x_to_real(statistics[MEAN_KEY]).max()
         except ValueError:
             self.__mean = np.nan
         try:
-            self.__median = x_to_real(algorithm_data.median(*params)).max()
+            self.__median = x_to_real(statistics[MEDIAN_KEY]).max()
         except ValueError:
             self.__median = np.nan
         try:
-            self.__mode = x_to_real(algorithm_data.mode(*params)).max()
+            self.__mode = x_to_real(statistics[MODE_KEY]).max()
         except ValueError:
             self.__mode = np.nan
-        self.__variance = algorithm_data.variance(*params)
-        self.__standard_deviation = algorithm_data.standard_deviation(*params)
-        self.__skewness = algorithm_data.skewness(*params)
-        self.__kurtosis = algorithm_data.kurtosis(*params)
+        self.__variance = statistics[VARIANCE_KEY].item()
+        self.__standard_deviation = statistics[STANDARD_DEVIATION_KEY].item()
+        self.__skewness = statistics[SKEWNESS_KEY].item()
+        self.__kurtosis = statistics[KURTOSIS_KEY].item()
 
     @property
     def params(self) -> Tuple[float]:
@@ -131,7 +146,8 @@ class FittingResult:
                  fitting_space_x: np.ndarray, bin_numbers: np.ndarray,
                  target_y: np.ndarray, algorithm_data: AlgorithmData,
                  fitted_params: Iterable[float], x_offset: float,
-                 fitting_history: List[np.ndarray] = None):
+                 fitting_history: np.ndarray = None,
+                 stop_reason: StopReason = StopReason.Completed):
         length = len(real_x)
         assert len(fitting_space_x) == length
         assert len(bin_numbers) == length
@@ -149,13 +165,22 @@ class FittingResult:
         self.__component_number = algorithm_data.component_number
         self.__param_count = algorithm_data.param_count
         self.__param_names = algorithm_data.param_names
-        self.__fitting_history = [fitted_params] if fitting_history is None else fitting_history
+        # the 2-D array of iterations, see `FittingHistory`
+        # if the history was not recorded, only the final params are kept
+        self.__has_history = fitting_history is not None
+        if fitting_history is None:
+            self.__fitting_history = np.array([fitted_params], dtype=np.float64)
+        else:
+            self.__fitting_history = np.array(fitting_history, dtype=np.float64).reshape(-1, len(fitted_params))
+        self.__stop_reason = stop_reason
+        self.__from_cache = False
         self.__components = [] # type: List[ComponentFittingResult]
         self.update(fitted_params)
 
 
     def update(self, fitted_params: Iterable[float]):
         algorithm_data = AlgorithmData.get_algorithm_data(self.distribution_type, self.component_number)
+        self.__fitted_params = np.array(fitted_params, dtype=np.float64)
         if np.any(np.isnan(fitted_params)):
             self.__fitted_y = np.full_like(self.__fitting_space_x, fill_value=np.nan)
             self.__error_array = np.full_like(self.__fitting_space_x, fill_value=np.nan)
@@ -206,6 +231,31 @@ class FittingResult:
     def bin_numbers(self) -> np.ndarray:
         return self.__bin_numbers
 
+    @property
+    def x_offset(self) -> float:
+        return self.__x_offset
+
+    @property
+    def fitted_params(self) -> np.ndarray:
+        return self.__fitted_params
+
+    @property
+    def stop_reason(self) -> StopReason:
+        return self.__stop_reason
+
+    @property
+    def from_cache(self) -> bool:
+        return self.__from_cache
+
+    def as_cached(self) -> "FittingResult":
+        """
+        Return a shallow copy with a new uuid, which is marked as loaded from cache.
+        """
+        result = copy.copy(self)
+        result.__uuid = uuid4()
+        result.__from_cache = True
+        return result
+
     @property
     def target_y(self) -> np.ndarray:
         return self.__target_y
@@ -259,6 +309,17 @@ class FittingResult:
                 return True
         return False
 
+    @property
+    def has_history(self) -> bool:
+        return self.__has_history
+
+    @property
+    def fitting_history(self) -> np.ndarray:
+        """
+        The 2-D array of recorded iterations, `None` if the history was not recorded.
+        """
+        return self.__fitting_history if self.__has_history else None
+
     @property
     def history(self):
         copy_result = copy.deepcopy(self)
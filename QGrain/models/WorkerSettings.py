@@ -0,0 +1,46 @@
+__all__ = ["BLAS_THREAD_ENVIRONMENT_KEYS", "WorkerSettings"]
+
+import typing
+from multiprocessing import cpu_count
+
+# the variables read by the BLAS / OpenMP libraries when they are loaded
+BLAS_THREAD_ENVIRONMENT_KEYS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                                "BLIS_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+class WorkerSettings:
+    """
+    The settings of the worker processes of `MultiProcessingResolver`.
+
+    The fitting of one sample is too small to benefit from the threads of BLAS,
+    so each worker uses one thread by default to avoid oversubscribing the cores.
+    """
+    def __init__(self, worker_number: int = None,
+                 blas_thread_number: int = 1,
+                 cpu_affinity: bool = False):
+        # `None` means to use all cores
+        assert worker_number is None or (isinstance(worker_number, int) and worker_number > 0)
+        assert isinstance(blas_thread_number, int)
+        assert blas_thread_number > 0
+        # pin each worker to one core (only supported on Linux)
+        assert isinstance(cpu_affinity, bool)
+
+        self.__worker_number = cpu_count() if worker_number is None else worker_number
+        self.__blas_thread_number = blas_thread_number
+        self.__cpu_affinity = cpu_affinity
+
+    @property
+    def worker_number(self):
+        return self.__worker_number
+
+    @property
+    def blas_thread_number(self):
+        return self.__blas_thread_number
+
+    @property
+    def cpu_affinity(self):
+        return self.__cpu_affinity
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        prefix = "_{0}__".format(WorkerSettings.__name__)
+        return {name[len(prefix):]: value for name, value in vars(self).items() if name.startswith(prefix)}
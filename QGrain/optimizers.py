@@ -0,0 +1,215 @@
+__all__ = ["GlobalOptimizer", "LocalMinimizer", "get_minimizer_kwargs", "get_search_bounds", "latin_hypercube",
+           "repair_fractions", "multi_start", "differential_evolution"]
+
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+from scipy.optimize import OptimizeResult, minimize
+
+from QGrain.algorithms import (INFINITESIMAL, AlgorithmData, DistributionType,
+                               GlobalOptimizer, LocalMinimizer)
+from QGrain.reparameterization import (UnconstrainedParameterization,
+                                       minimize_reparameterized)
+from QGrain.resolvers.FittingProblem import FittingProblem
+
+
+def get_minimizer_kwargs(problem: FittingProblem, local_minimizer: LocalMinimizer,
+                         maximum_iteration: int, tolerance: float,
+                         callback: Callable = None) -> Dict:
+    """
+    Get the keyword arguments of `minimize(problem.objective, x0, **kwargs)`.
+
+    Whichever the local minimizer is, the starting point, the params passed to `callback`
+    and the result always use the raw params (i.e. the layout of `AlgorithmData`).
+    """
+    if local_minimizer == LocalMinimizer.SLSQP:
+        return dict(method="SLSQP", jac=problem.jacobian,
+                    bounds=problem.bounds,
+                    constraints=problem.constrains,
+                    callback=callback,
+                    options={"maxiter": maximum_iteration, "ftol": tolerance})
+    elif local_minimizer == LocalMinimizer.LBFGSB:
+        return dict(method=minimize_reparameterized, jac=problem.jacobian,
+                    callback=callback,
+                    options={"maxiter": maximum_iteration, "ftol": tolerance,
+                             "parameterization": UnconstrainedParameterization(problem.algorithm_data)})
+    else:
+        raise NotImplementedError(local_minimizer)
+
+
+def get_search_bounds(algorithm_data: AlgorithmData, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the finite box to sample the params of components.
+
+    Most params have no upper bound, so the box is estimated by the range of x.
+    The fractions are not included, see `repair_fractions`.
+
+    Returns:
+        The lower and upper bounds of the component params with shape (C*P,).
+    """
+    x_min, x_max = np.min(x), np.max(x)
+    x_range = max(x_max - x_min, 1.0)
+    distribution_type = algorithm_data.distribution_type
+    if distribution_type == DistributionType.Normal:
+        # mu, sigma
+        lower = (x_min, 0.5)
+        upper = (x_max, x_range / 2)
+    elif distribution_type == DistributionType.Weibull:
+        # beta, eta
+        lower = (1.5, max(x_min, 1.0))
+        upper = (20.0, x_max)
+    elif distribution_type == DistributionType.GeneralWeibull:
+        # mu, beta, eta
+        lower = (INFINITESIMAL, 1.5, 1.0)
+        upper = (max(x_min, 0.0) + x_range / 2, 20.0, x_range)
+    else:
+        raise NotImplementedError(distribution_type)
+    component_number = algorithm_data.component_number
+    return np.tile(lower, component_number).astype(np.float64), np.tile(upper, component_number).astype(np.float64)
+
+
+def latin_hypercube(sample_number: int, lower: np.ndarray, upper: np.ndarray,
+                    random_state: np.random.RandomState) -> np.ndarray:
+    """
+    Sample the points in the box by Latin hypercube, each dimension is divided into `sample_number` strata.
+    """
+    dimension = len(lower)
+    strata = np.argsort(random_state.uniform(size=(dimension, sample_number)), axis=1).T
+    unit = (strata + random_state.uniform(size=(sample_number, dimension))) / sample_number
+    return lower + unit * (upper - lower)
+
+
+def repair_fractions(params_matrix: np.ndarray, component_number: int) -> np.ndarray:
+    # make the fractions of each row non-negative and their sum not greater than 1
+    if component_number > 1:
+        fractions = params_matrix[:, 1-component_number:]
+        np.clip(fractions, 0.0, 1.0, out=fractions)
+        sum_of_fractions = np.sum(fractions, axis=1, keepdims=True)
+        np.divide(fractions, np.maximum(sum_of_fractions, 1.0), out=fractions)
+    return params_matrix
+
+
+def sample_params(algorithm_data: AlgorithmData, sample_number: int,
+                  lower: np.ndarray, upper: np.ndarray,
+                  random_state: np.random.RandomState) -> np.ndarray:
+    component_number = algorithm_data.component_number
+    component_params = latin_hypercube(sample_number, lower, upper, random_state)
+    if component_number == 1:
+        return component_params
+    # the weights of all C components are sampled, and normalized to fractions
+    weights = latin_hypercube(sample_number, np.full(component_number, 0.1), np.ones(component_number), random_state)
+    fractions = weights / np.sum(weights, axis=1, keepdims=True)
+    return np.concatenate([component_params, fractions[:, :-1]], axis=1)
+
+
+def multi_start(problem: FittingProblem, x0: np.ndarray,
+                start_number: int, minimizer_kwargs: Dict,
+                callback: Callable = None,
+                random_state: np.random.RandomState = None,
+                pool_ratio: int = 8) -> OptimizeResult:
+    """
+    Perform the local minimizer from several starting points and return the best one.
+
+    The candidates are sampled by Latin hypercube inside the search bounds, and
+    `start_number * pool_ratio` candidates are evaluated in one batch. They are divided into
+    groups randomly, and the best one of each group is used as a starting point. It keeps the
+    starting points diverse. `x0` is always the first starting point.
+
+    The `callback(x, f, accept)` is called after each local minimization,
+    the searching will stop if it returns `True`, which is the same as `basinhopping`.
+    """
+    assert start_number > 0
+    if random_state is None:
+        random_state = np.random.RandomState()
+    algorithm_data = problem.algorithm_data
+    lower, upper = get_search_bounds(algorithm_data, problem.x)
+    candidates = sample_params(algorithm_data, (start_number-1)*pool_ratio, lower, upper, random_state)
+    objectives = problem.objective_batch(candidates).reshape(start_number-1, pool_ratio)
+    candidates = candidates.reshape(start_number-1, pool_ratio, -1)
+    best_candidates = candidates[np.arange(start_number-1), np.argmin(objectives, axis=1)]
+    starts = np.concatenate([np.asarray(x0, dtype=np.float64)[np.newaxis, :], best_candidates], axis=0)
+    best_result = None # type: OptimizeResult
+    minimization_failures = 0
+    for i, start in enumerate(starts):
+        result = minimize(problem.objective, x0=start, **minimizer_kwargs)
+        if not result.success:
+            minimization_failures += 1
+        if best_result is None or result.fun < best_result.fun:
+            best_result = result
+        if callback is not None and callback(result.x, result.fun, True):
+            break
+    return OptimizeResult(x=best_result.x, fun=best_result.fun,
+                          lowest_optimization_result=best_result,
+                          minimization_failures=minimization_failures,
+                          nit=i+1, nfev=problem.evaluation_number,
+                          message=["multi-start completed"])
+
+
+def differential_evolution(problem: FittingProblem, x0: np.ndarray,
+                           population_size: int, maximum_generation: int,
+                           callback: Callable = None,
+                           random_state: np.random.RandomState = None,
+                           mutation: Tuple[float, float] = (0.5, 1.0), recombination: float = 0.9,
+                           tolerance: float = 1e-2) -> OptimizeResult:
+    """
+    The differential evolution (DE/rand/1/bin) whose whole population is evaluated in one batch per generation.
+
+    The individuals are kept inside the search bounds and the fractions are repaired by `repair_fractions`.
+    The mutation constant is randomly chosen from the `mutation` range in each generation (i.e. dithering).
+    It stops when the standard deviation of the population objectives is lower than
+    `tolerance` times their mean, or the `callback(x, f, accept)` returns `True`.
+    """
+    assert population_size >= 4
+    if random_state is None:
+        random_state = np.random.RandomState()
+    algorithm_data = problem.algorithm_data
+    component_number = algorithm_data.component_number
+    lower, upper = get_search_bounds(algorithm_data, problem.x)
+    if component_number > 1:
+        lower = np.concatenate([lower, np.zeros(component_number-1)])
+        upper = np.concatenate([upper, np.ones(component_number-1)])
+    population = sample_params(algorithm_data, population_size, lower[:len(lower)-component_number+1],
+                               upper[:len(upper)-component_number+1], random_state)
+    population[0] = np.clip(x0, lower, upper)
+    repair_fractions(population, component_number)
+    objectives = problem.objective_batch(population)
+    dimension = population.shape[1]
+    indexes = np.arange(population_size)
+    message = "Maximum number of generations has been exceeded."
+    for generation in range(1, maximum_generation+1):
+        # choose 3 distinct individuals which are different from the target one
+        keys = random_state.uniform(size=(population_size, population_size))
+        keys[indexes, indexes] = np.inf
+        r1, r2, r3 = np.argsort(keys, axis=1)[:, :3].T
+        mutants = population[r1] + random_state.uniform(*mutation) * (population[r2] - population[r3])
+        crossover = random_state.uniform(size=(population_size, dimension)) < recombination
+        crossover[indexes, random_state.randint(dimension, size=population_size)] = True
+        trials = np.where(crossover, mutants, population)
+        np.clip(trials, lower, upper, out=trials)
+        repair_fractions(trials, component_number)
+        trial_objectives = problem.objective_batch(trials)
+        improved = trial_objectives < objectives
+        population[improved] = trials[improved]
+        objectives[improved] = trial_objectives[improved]
+        best_index = np.argmin(objectives)
+        if callback is not None and callback(population[best_index], objectives[best_index], True):
+            message = "callback function requested stop early"
+            break
+        if np.std(objectives) <= tolerance * np.abs(np.mean(objectives)):
+            message = "Optimization terminated successfully."
+            break
+    best_index = np.argmin(objectives)
+    lowest_optimization_result = OptimizeResult(x=population[best_index].copy(), fun=objectives[best_index],
+                                                success=True, status=0, message=message)
+    return OptimizeResult(x=population[best_index].copy(), fun=objectives[best_index],
+                          lowest_optimization_result=lowest_optimization_result,
+                          nit=generation, nfev=problem.evaluation_number,
+                          message=[message])
+
+
+if __name__ == "__main__":
+    # compare the success rate and the wall time of the global optimizers
+    from QGrain.benchmarking import compare_settings
+    from QGrain.models.AlgorithmSettings import AlgorithmSettings
+
+    compare_settings({optimizer.name: AlgorithmSettings(global_optimizer=optimizer) for optimizer in GlobalOptimizer})
@@ -0,0 +1,135 @@
+__all__ = ["UnconstrainedParameterization", "minimize_reparameterized"]
+
+from typing import Callable, Iterable, List, Tuple
+
+import numpy as np
+from scipy.optimize import OptimizeResult, minimize
+
+from QGrain.algorithms import AlgorithmData
+
+
+class UnconstrainedParameterization:
+    """
+    The internal parameterization which removes the bounds and constraints of params.
+
+    All params of components are positive, so they are represented by their logarithms.
+    The fractions are represented by the softmax of C logits, and the logit of the last
+    component is fixed to 0 (i.e. only C-1 free logits, the same count as the raw fractions).
+    Hence the sum of fractions is always 1, and the problem can be solved by
+    the unconstrained (or box-only) minimizers, e.g. L-BFGS-B.
+
+    The internal values are multiplied by `STEP_SCALE`. The first step of L-BFGS-B has unit length,
+    and a unit step of logarithms is too large (it often moves a component out of the data range,
+    where the gradient vanishes and the component can not come back).
+    They are also limited in a wide box to avoid the overflow of `exp`.
+    """
+    STEP_SCALE = 5.0
+    MAXIMUM_LOGARITHM = 50.0
+    MINIMUM_FRACTION = 1e-12
+    def __init__(self, algorithm_data: AlgorithmData):
+        self.__algorithm_data = algorithm_data
+        self.__component_number = algorithm_data.component_number
+        self.__component_param_count = algorithm_data.component_number * algorithm_data.param_count
+        limit = self.MAXIMUM_LOGARITHM * self.STEP_SCALE
+        self.__bounds = [(-limit, limit)] * len(algorithm_data.defaults)
+
+    @property
+    def algorithm_data(self) -> AlgorithmData:
+        return self.__algorithm_data
+
+    @property
+    def bounds(self) -> List[Tuple[float, float]]:
+        return self.__bounds
+
+    def to_internal(self, params: Iterable[float]) -> np.ndarray:
+        params = np.asarray(params, dtype=np.float64)
+        logarithms = np.empty_like(params)
+        count = self.__component_param_count
+        # the starting point may be out of the bounds (e.g. the random displacement of basin hopping)
+        logarithms[:count] = np.log(np.maximum(params[:count], np.exp(-self.MAXIMUM_LOGARITHM)))
+        if self.__component_number > 1:
+            fractions = np.maximum(params[count:], self.MINIMUM_FRACTION)
+            last_fraction = max(1.0 - np.sum(params[count:]), self.MINIMUM_FRACTION)
+            logarithms[count:] = np.log(fractions) - np.log(last_fraction)
+        return np.clip(logarithms, -self.MAXIMUM_LOGARITHM, self.MAXIMUM_LOGARITHM) * self.STEP_SCALE
+
+    def to_params(self, internal: Iterable[float]) -> np.ndarray:
+        logarithms = np.asarray(internal, dtype=np.float64) / self.STEP_SCALE
+        params = np.empty_like(logarithms)
+        count = self.__component_param_count
+        params[:count] = np.exp(logarithms[:count])
+        if self.__component_number > 1:
+            logits = logarithms[count:]
+            # subtract the maximum logit to avoid the overflow
+            maximum = max(np.max(logits), 0.0)
+            weights = np.exp(logits - maximum)
+            params[count:] = weights / (np.sum(weights) + np.exp(-maximum))
+        return params
+
+    def to_internal_gradient(self, gradient: np.ndarray, params: np.ndarray) -> np.ndarray:
+        """
+        Convert the gradient with respect to the raw params to the gradient with respect to the internal values.
+        """
+        internal_gradient = np.empty_like(gradient)
+        count = self.__component_param_count
+        # d(exp(z))/dz = exp(z)
+        internal_gradient[:count] = gradient[:count] * params[:count]
+        if self.__component_number > 1:
+            # d(f_i)/d(u_j) = f_i * (delta_ij - f_j), the last fraction is implied by the raw params
+            fractions = params[count:]
+            fraction_gradient = gradient[count:]
+            internal_gradient[count:] = fractions * (fraction_gradient - np.dot(fraction_gradient, fractions))
+        return internal_gradient / self.STEP_SCALE
+
+
+def minimize_reparameterized(fun: Callable, x0: np.ndarray, args: Tuple = (),
+                             jac: Callable = None, callback: Callable = None,
+                             parameterization: UnconstrainedParameterization = None,
+                             maxiter: int = 1000, ftol: float = 1e-8, gtol: float = 1e-10,
+                             **unknown_options) -> OptimizeResult:
+    """
+    The custom method of `scipy.optimize.minimize` which performs L-BFGS-B in the internal space.
+
+    `fun`, `jac`, `callback`, `x0` and the returned `x` all use the raw params,
+    hence it can replace SLSQP in `minimize` and `basinhopping` directly, e.g.
+    `minimize(fun, x0, method=minimize_reparameterized, jac=jac, options={"parameterization": ...})`.
+    The bounds and constraints are ignored because they are always satisfied.
+
+    L-BFGS-B reports the iteration limit (status 1) and the line search failure at the
+    precision limit (status 2) as failures, they are regarded as success here,
+    like the status 9 of SLSQP.
+    """
+    assert parameterization is not None
+
+    def internal_fun(internal):
+        return fun(parameterization.to_params(internal), *args)
+
+    internal_jac = None
+    if callable(jac):
+        def internal_jac(internal):
+            params = parameterization.to_params(internal)
+            return parameterization.to_internal_gradient(jac(params, *args), params)
+
+    internal_callback = None
+    if callback is not None:
+        def internal_callback(internal):
+            callback(parameterization.to_params(internal))
+
+    result = minimize(internal_fun, parameterization.to_internal(x0), method="L-BFGS-B",
+                      jac=internal_jac, bounds=parameterization.bounds,
+                      callback=internal_callback,
+                      options={"maxiter": maxiter, "ftol": ftol, "gtol": gtol})
+    return OptimizeResult(x=parameterization.to_params(result.x), fun=result.fun,
+                          success=result.status in (0, 1, 2), status=result.status,
+                          message=result.message, nit=result.nit,
+                          nfev=result.nfev, njev=result.get("njev", 0))
+
+
+if __name__ == "__main__":
+    # compare the wall time and the error of SLSQP and the reparameterized L-BFGS-B
+    from QGrain.algorithms import DistributionType, LocalMinimizer
+    from QGrain.benchmarking import compare_settings
+    from QGrain.models.AlgorithmSettings import AlgorithmSettings
+
+    compare_settings({local_minimizer.name: AlgorithmSettings(local_minimizer=local_minimizer) for local_minimizer in LocalMinimizer},
+                     distribution_types=DistributionType)
@@ -0,0 +1,160 @@
+__all__ = ["get_valid_data_ranges", "get_x_offsets", "DatasetPreprocessor"]
+
+from typing import Iterable, Tuple
+
+import numpy as np
+
+from QGrain.algorithms import DistributionType
+from QGrain.models.SampleData import SampleData
+
+
+def get_valid_data_ranges(target_y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the valid data ranges of a batch of distributions in one pass.
+
+    The range starts at the class before the first positive value, and ends at the class
+    after the last positive value (one zero value is kept at each side). It is the same
+    as the loops of `Resolver.get_valid_data_range`.
+
+    Args:
+        target_y: The distributions with shape (K, M).
+
+    Returns:
+        The start indexes and the (exclusive and non-negative) end indexes with shape (K,).
+    """
+    target_y = np.asarray(target_y)
+    sample_number, class_number = target_y.shape
+    positive = target_y > 0.0
+    has_positive = np.any(positive, axis=1)
+    first_indexes = np.argmax(positive, axis=1)
+    start_indexes = np.where(has_positive & (first_indexes > 0), first_indexes-1, 0)
+    last_indexes = class_number - 1 - np.argmax(positive[:, ::-1], axis=1)
+    # only the values after the start index are searched
+    found = has_positive & (last_indexes > start_indexes)
+    end_indexes = np.where(found, np.minimum(last_indexes+2, class_number), class_number)
+    return start_indexes, end_indexes
+
+
+def get_x_offsets(distribution_type: DistributionType, start_indexes: np.ndarray) -> np.ndarray:
+    # Normal and General Weibull distribution need to use x offset to get better performance.
+    # Because if do not do that, the search space will be larger,
+    # and hence increse the difficulty of searching.
+    if distribution_type == DistributionType.Normal or \
+            distribution_type == DistributionType.GeneralWeibull:
+        return np.asarray(start_indexes, dtype=np.float64)
+    elif distribution_type == DistributionType.Weibull:
+        return np.zeros_like(start_indexes, dtype=np.float64)
+    else:
+        raise NotImplementedError(distribution_type)
+
+
+class DatasetPreprocessor:
+    """
+    The preprocessed table of the samples which share the same grain size classes.
+
+    The valid data ranges and x offsets of all samples are calculated by one vectorized pass
+    over the distribution matrix, and the bin numbers (i.e. the fitting space x) are shared.
+    Each row of `records` is the compact table entry of one sample, see `RECORD_DTYPE`.
+
+    Attributes:
+        distribution_type: The base distribution of components, which decides the x offsets.
+        target_y: The distributions with shape (K, M).
+    """
+    RECORD_DTYPE = np.dtype([("start_index", np.int64),
+                             ("end_index", np.int64),
+                             ("x_offset", np.float64)])
+    def __init__(self, distribution_type: DistributionType, target_y: np.ndarray):
+        target_y = np.asarray(target_y, dtype=np.float64)
+        assert target_y.ndim == 2
+        sample_number, class_number = target_y.shape
+        self.__distribution_type = distribution_type
+        # Bin numbers are similar to log(x), but will not raise negative value.
+        # This will make the fitting of some distributions (e.g. Weibull) easier.
+        self.__bin_numbers = np.arange(1, class_number+1, dtype=np.float64)
+        start_indexes, end_indexes = get_valid_data_ranges(target_y)
+        self.__records = np.empty(sample_number, dtype=self.RECORD_DTYPE)
+        self.__records["start_index"] = start_indexes
+        self.__records["end_index"] = end_indexes
+        self.__records["x_offset"] = get_x_offsets(distribution_type, start_indexes)
+
+    @classmethod
+    def from_samples(cls, distribution_type: DistributionType, samples: Iterable[SampleData]) -> "DatasetPreprocessor":
+        return cls(distribution_type, np.array([sample.distribution for sample in samples], dtype=np.float64))
+
+    @property
+    def distribution_type(self) -> DistributionType:
+        return self.__distribution_type
+
+    @property
+    def bin_numbers(self) -> np.ndarray:
+        return self.__bin_numbers
+
+    @property
+    def fitting_space_x(self) -> np.ndarray:
+        # fitting under the bin numbers' space
+        return self.__bin_numbers
+
+    @property
+    def records(self) -> np.ndarray:
+        return self.__records
+
+    @property
+    def start_indexes(self) -> np.ndarray:
+        return self.__records["start_index"]
+
+    @property
+    def end_indexes(self) -> np.ndarray:
+        return self.__records["end_index"]
+
+    @property
+    def x_offsets(self) -> np.ndarray:
+        return self.__records["x_offset"]
+
+    def __len__(self) -> int:
+        return len(self.__records)
+
+
+if __name__ == "__main__":
+    # compare the time of preprocessing a dataset by the loops and by one vectorized pass
+    import time
+
+    def get_valid_data_range(target_y: np.ndarray):
+        # the original loops of `Resolver.get_valid_data_range`, which is vectorized now
+        start_index = 0
+        end_index = len(target_y)
+        for i, value in enumerate(target_y):
+            if value > 0.0:
+                if i == 0:
+                    break
+                else:
+                    start_index = i-1
+                    break
+        # search from tail to head
+        for i, value in enumerate(target_y[start_index+1:][::-1]):
+            if value > 0.0:
+                if i <= 1:
+                    break
+                else:
+                    end_index = (i-1)*(-1)
+                    break
+        return start_index, end_index
+
+    random_state = np.random.RandomState(42)
+    sample_number, class_number = 10000, 101
+    target_y = random_state.uniform(size=(sample_number, class_number))
+    # zero heads and tails with random lengths
+    class_indexes = np.arange(class_number)
+    target_y[class_indexes < random_state.randint(0, 30, size=(sample_number, 1))] = 0.0
+    target_y[class_indexes > random_state.randint(70, 101, size=(sample_number, 1))] = 0.0
+
+    start = time.perf_counter()
+    for y in target_y:
+        start_index, end_index = get_valid_data_range(y)
+        x_offset = start_index
+        bin_numbers = np.array(range(len(y)), dtype=np.float64) + 1
+    loop_time = time.perf_counter() - start
+    start = time.perf_counter()
+    preprocessor = DatasetPreprocessor(DistributionType.GeneralWeibull, target_y)
+    vectorized_time = time.perf_counter() - start
+    print("{0} samples, loops: {1:.1f} ms, vectorized: {2:.1f} ms".format(
+        sample_number, loop_time*1000, vectorized_time*1000))
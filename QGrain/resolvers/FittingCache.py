@@ -0,0 +1,327 @@
+__all__ = ["get_user_cache_directory", "CachedFittingResult", "FittingCache"]
+
+import hashlib
+import logging
+import os
+import sys
+import tempfile
+from collections import OrderedDict
+from typing import Iterable, Tuple
+from uuid import UUID, uuid4
+
+import numpy as np
+
+from QGrain.algorithms import AlgorithmData, DistributionType
+from QGrain.models.AlgorithmSettings import AlgorithmSettings
+from QGrain.models.FittingResult import FittingResult, StopReason
+
+
+def get_user_cache_directory() -> str:
+    """
+    Get the cache directory of the current user, e.g. `~/.cache/QGrain` on Linux.
+    """
+    if sys.platform == "win32":
+        root = os.environ.get("LOCALAPPDATA") or os.path.expanduser(os.path.join("~", "AppData", "Local"))
+    elif sys.platform == "darwin":
+        root = os.path.expanduser(os.path.join("~", "Library", "Caches"))
+    else:
+        root = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser(os.path.join("~", ".cache"))
+    return os.path.join(root, "QGrain")
+
+
+class CachedFittingResult:
+    """
+    The compact record of a cached fitting, the `FittingResult` is built when `get` is called.
+
+    The frequently used values are available without building the result, like `LazyFittingResult`.
+    """
+    def __init__(self, name: str, real_x: np.ndarray,
+                 fitting_space_x: np.ndarray, bin_numbers: np.ndarray,
+                 target_y: np.ndarray, algorithm_data: AlgorithmData,
+                 fitted_params: np.ndarray, x_offset: float,
+                 mean_squared_error: float, stop_reason: StopReason):
+        self.__uuid = uuid4()
+        self.__name = name
+        self.__real_x = real_x
+        self.__fitting_space_x = fitting_space_x
+        self.__bin_numbers = bin_numbers
+        self.__target_y = target_y
+        self.__algorithm_data = algorithm_data
+        self.__fitted_params = fitted_params
+        self.__x_offset = x_offset
+        self.__mean_squared_error = mean_squared_error
+        self.__stop_reason = stop_reason
+
+    @property
+    def uuid(self) -> UUID:
+        return self.__uuid
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def distribution_type(self) -> DistributionType:
+        return self.__algorithm_data.distribution_type
+
+    @property
+    def component_number(self) -> int:
+        return self.__algorithm_data.component_number
+
+    @property
+    def fitted_params(self) -> np.ndarray:
+        return self.__fitted_params
+
+    @property
+    def x_offset(self) -> float:
+        return self.__x_offset
+
+    @property
+    def mean_squared_error(self) -> float:
+        return self.__mean_squared_error
+
+    @property
+    def stop_reason(self) -> StopReason:
+        return self.__stop_reason
+
+    @property
+    def from_cache(self) -> bool:
+        return True
+
+    def get(self) -> FittingResult:
+        result = FittingResult(self.__name, self.__real_x,
+                               self.__fitting_space_x, self.__bin_numbers,
+                               self.__target_y, self.__algorithm_data,
+                               self.__fitted_params, self.__x_offset,
+                               stop_reason=self.__stop_reason)
+        return result.as_cached()
+
+
+class FittingCache:
+    """
+    The persistent cache of fitting results, which is addressed by the content of the fitting.
+
+    The key is the hash of everything which decides the result, i.e. the classes and distribution
+    of the sample, the distribution type, component number, all fields of `AlgorithmSettings`,
+    the initial guess and the random seed. Only the compact record of each result (i.e. the fitted params,
+    x offset, error and stop reason, without the history) is written to one file under `directory`,
+    and the least recently used files are removed when the total size exceeds `maximum_size`.
+    The recently used records are also kept in memory.
+
+    The cache can be shared by several processes, the writing of each file is atomic.
+
+    Attributes:
+        directory: The directory to store the cached results.
+        maximum_size: The maximum total size (in bytes) of the files.
+        memory_size: The maximum total size (in bytes) of the results kept in memory.
+    """
+    DEFAULT_DIRECTORY = get_user_cache_directory()
+    # change it to invalidate all cached results when the algorithms or the format of records are changed,
+    # the settings which do not change the fitted params (i.e. `history_capacity`) are not in the keys,
+    # the records have no history anyway
+    VERSION = 2
+    IGNORED_SETTINGS = ("history_capacity",)
+    FILE_EXTENSION = ".bin"
+    logger = logging.getLogger(name="root.resolvers.FittingCache")
+    def __init__(self, directory: str,
+                 maximum_size: int = 256*1024*1024,
+                 memory_size: int = 16*1024*1024):
+        assert isinstance(maximum_size, int)
+        assert isinstance(memory_size, int)
+        assert maximum_size > 0
+        assert memory_size >= 0
+        os.makedirs(directory, exist_ok=True)
+        self.__directory = directory
+        self.__maximum_size = maximum_size
+        self.__memory_size = memory_size
+        self.__memory = OrderedDict() # type: OrderedDict[str, bytes]
+        self.__memory_used = 0
+        self.__disk_used = self.get_disk_usage()
+
+    @classmethod
+    def try_create(cls, directory: str, **kwargs) -> "FittingCache":
+        """
+        Create the cache, return `None` (i.e. the cache is disabled) if the directory is not writable.
+        """
+        try:
+            os.makedirs(directory, exist_ok=True)
+            if not os.access(directory, os.W_OK):
+                raise PermissionError(directory)
+            return cls(directory, **kwargs)
+        except OSError:
+            cls.logger.warning("The cache directory [%s] is not writable, the cache is disabled.", directory)
+            return None
+
+    @property
+    def directory(self) -> str:
+        return self.__directory
+
+    @property
+    def maximum_size(self) -> int:
+        return self.__maximum_size
+
+    @property
+    def memory_size(self) -> int:
+        return self.__memory_size
+
+    @classmethod
+    def get_key(cls, classes: np.ndarray, distribution: np.ndarray,
+                distribution_type: DistributionType, component_number: int,
+                algorithm_settings: AlgorithmSettings,
+                initial_guess: Iterable[float] = None, seed: int = None) -> str:
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(repr(cls.VERSION).encode())
+        for array in (classes, distribution):
+            digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+            # avoid the collision of the same bytes with different splitting
+            digest.update(b"|")
+        digest.update(repr((distribution_type.name, component_number, seed)).encode())
+        digest.update(repr(sorted((name, value) for name, value in algorithm_settings.to_dict().items()
+                                  if name not in cls.IGNORED_SETTINGS)).encode())
+        if initial_guess is not None:
+            digest.update(np.ascontiguousarray(initial_guess, dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    def get_filename(self, key: str) -> str:
+        return os.path.join(self.__directory, key + self.FILE_EXTENSION)
+
+    def get_disk_usage(self) -> int:
+        total_size = 0
+        with os.scandir(self.__directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(self.FILE_EXTENSION):
+                    total_size += entry.stat().st_size
+        return total_size
+
+    def remember(self, key: str, data: bytes):
+        if len(data) > self.__memory_size:
+            return
+        if key in self.__memory:
+            self.__memory_used -= len(self.__memory.pop(key))
+        self.__memory[key] = data
+        self.__memory_used += len(data)
+        while self.__memory_used > self.__memory_size:
+            _, removed = self.__memory.popitem(last=False)
+            self.__memory_used -= len(removed)
+
+    @staticmethod
+    def encode(result: FittingResult) -> bytes:
+        return np.concatenate(([result.x_offset, result.mean_squared_error, result.stop_reason.value],
+                               result.fitted_params)).astype(np.float64).tobytes()
+
+    @staticmethod
+    def decode(data: bytes) -> Tuple[np.ndarray, float, float, StopReason]:
+        record = np.frombuffer(data, dtype=np.float64)
+        return record[3:].copy(), record[0].item(), record[1].item(), StopReason(int(record[2]))
+
+    def get(self, key: str) -> Tuple[np.ndarray, float, float, StopReason]:
+        """
+        Get the cached record of the key, return `None` if it is not found.
+
+        The record is the fitted params, x offset, mean squared error and stop reason,
+        see `CachedFittingResult`.
+        """
+        data = self.__memory.get(key)
+        if data is not None:
+            self.__memory.move_to_end(key)
+        else:
+            filename = self.get_filename(key)
+            try:
+                with open(filename, "rb") as f:
+                    data = f.read()
+                # update the access time for LRU
+                os.utime(filename)
+            except OSError:
+                # not cached, or removed by another process
+                return None
+            self.remember(key, data)
+        try:
+            return self.decode(data)
+        except Exception:
+            self.logger.exception("Failed to load the cached result [%s].", key)
+            return None
+
+    def put(self, key: str, result: FittingResult):
+        data = self.encode(result)
+        filename = self.get_filename(key)
+        try:
+            existing_size = os.path.getsize(filename)
+        except OSError:
+            existing_size = 0
+        try:
+            # write to a temporary file and then replace, so that other processes never read a partial file
+            handle, temp_filename = tempfile.mkstemp(dir=self.__directory, suffix=".tmp")
+            with os.fdopen(handle, "wb") as f:
+                f.write(data)
+            os.replace(temp_filename, filename)
+        except OSError:
+            self.logger.exception("Failed to write the cached result [%s].", key)
+            return
+        self.remember(key, data)
+        self.__disk_used += len(data) - existing_size
+        if self.__disk_used > self.__maximum_size:
+            self.evict()
+
+    def evict(self):
+        # other processes may write this directory too, so rescan it
+        files = []
+        with os.scandir(self.__directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(self.FILE_EXTENSION):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        total_size = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total_size <= self.__maximum_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total_size -= size
+        self.__disk_used = total_size
+
+    def clear(self):
+        self.__memory.clear()
+        self.__memory_used = 0
+        with os.scandir(self.__directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(self.FILE_EXTENSION):
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+        self.__disk_used = 0
+
+
+if __name__ == "__main__":
+    # compare the time of fitting and the time of cache hits
+    import time
+
+    from QGrain.benchmarking import get_ordered_samples
+    from QGrain.resolvers.FittingCache import FittingCache
+    from QGrain.resolvers.HeadlessResolver import FittingTask, HeadlessResolver
+
+    distribution_type, component_number = DistributionType.GeneralWeibull, 3
+    samples = get_ordered_samples(distribution_type, component_number, 20)
+    with tempfile.TemporaryDirectory() as directory:
+        resolver = HeadlessResolver()
+        resolver.cache = FittingCache(directory)
+        tasks = [FittingTask(sample, distribution_type, component_number) for sample in samples]
+        for title in ("Cold", "Warm (memory)"):
+            start = time.perf_counter()
+            outputs = [resolver.execute_task(task) for task in tasks]
+            print("{0}: {1:.3f} ms per sample, cached: {2}".format(
+                title, (time.perf_counter()-start) / len(tasks) * 1000,
+                sum(result.from_cache for _, _, result in outputs)))
+        # a new cache object (e.g. reopening the app) only has the files
+        resolver.cache = FittingCache(directory)
+        start = time.perf_counter()
+        outputs = [resolver.execute_task(task) for task in tasks]
+        print("Warm (disk): {0:.3f} ms per sample".format((time.perf_counter()-start) / len(tasks) * 1000))
+        key = resolver.get_cache_key()
+        start = time.perf_counter()
+        for i in range(1000):
+            resolver.cache.get(key)
+        print("Lookup of one key: {0:.1f} us".format((time.perf_counter()-start) / 1000 * 1e6))
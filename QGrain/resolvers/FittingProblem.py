@@ -0,0 +1,143 @@
+__all__ = ["FittingProblem"]
+
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from QGrain.algorithms import AlgorithmData
+from QGrain.kernels import KernelBackend, create_workspace
+
+
+class FittingProblem:
+    """
+    The prepared problem of fitting one sample.
+
+    All data which the optimizers need are built once, the objective function
+    and its gradient can be passed to `basinhopping` and `minimize` directly.
+    The best feasible solution among all evaluations is recorded, so that
+    the fitting can be stopped at any time.
+
+    Attributes:
+        algorithm_data: The `AlgorithmData` of the distribution type and component number.
+        x: The trimmed x values (i.e. the x offset has been subtracted) in the valid data range.
+        target_y: The trimmed target distribution in the valid data range.
+        kernel_backend: The preferred backend of the kernel workspace.
+    """
+    # scale the objective to make the tolerance of minimizers meaningful
+    OBJECTIVE_SCALE = 100.0
+    def __init__(self, algorithm_data: AlgorithmData,
+                 x: np.ndarray, target_y: np.ndarray,
+                 kernel_backend: KernelBackend = None):
+        assert len(x) == len(target_y)
+        self.__algorithm_data = algorithm_data
+        self.__x = np.array(x, dtype=np.float64)
+        self.__target_y = np.array(target_y, dtype=np.float64)
+        self.__bounds = algorithm_data.bounds
+        lower, upper = zip(*self.__bounds)
+        self.__lower_bounds = np.array([-np.inf if bound is None else bound for bound in lower], dtype=np.float64)
+        self.__upper_bounds = np.array([np.inf if bound is None else bound for bound in upper], dtype=np.float64)
+        self.__constrains = algorithm_data.constrains
+        self.__workspace = create_workspace(
+            algorithm_data.distribution_type, algorithm_data.component_number,
+            self.__x, self.__target_y, backend=kernel_backend)
+        self.__evaluation_number = 0
+        self.__jacobian_evaluation_number = 0
+        self.__best_objective = np.inf
+        self.__best_params = None # type: np.ndarray
+
+    @property
+    def algorithm_data(self) -> AlgorithmData:
+        return self.__algorithm_data
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.__x
+
+    @property
+    def target_y(self) -> np.ndarray:
+        return self.__target_y
+
+    @property
+    def bounds(self) -> List[Tuple[float, float]]:
+        return self.__bounds
+
+    @property
+    def lower_bounds(self) -> np.ndarray:
+        return self.__lower_bounds
+
+    @property
+    def upper_bounds(self) -> np.ndarray:
+        return self.__upper_bounds
+
+    @property
+    def constrains(self) -> Dict:
+        return self.__constrains
+
+    @property
+    def workspace(self):
+        return self.__workspace
+
+    @property
+    def evaluation_number(self) -> int:
+        return self.__evaluation_number
+
+    @property
+    def jacobian_evaluation_number(self) -> int:
+        return self.__jacobian_evaluation_number
+
+    @property
+    def best_objective(self) -> float:
+        return self.__best_objective
+
+    @property
+    def best_params(self) -> np.ndarray:
+        return self.__best_params
+
+    def reset(self):
+        self.__evaluation_number = 0
+        self.__jacobian_evaluation_number = 0
+        self.__best_objective = np.inf
+        self.__best_params = None
+
+    def is_feasible(self, args: Iterable[float]) -> bool:
+        args = np.asarray(args)
+        if np.any(args < self.__lower_bounds) or np.any(args > self.__upper_bounds):
+            return False
+        component_number = self.__algorithm_data.component_number
+        if component_number > 1 and np.sum(args[1-component_number:]) > 1.0:
+            return False
+        return True
+
+    def objective(self, args: Iterable[float]) -> float:
+        self.__evaluation_number += 1
+        value = self.__workspace.get_squared_sum_of_residual_errors(args) * self.OBJECTIVE_SCALE
+        # the minimizers may try the points out of the bounds or constraints
+        if value < self.__best_objective and self.is_feasible(args):
+            self.__best_objective = value
+            self.__best_params = np.array(args, dtype=np.float64)
+        return value
+
+    def objective_batch(self, params_matrix: np.ndarray) -> np.ndarray:
+        """
+        Evaluate the objective function of N groups of params (N, (P+1)*C-1) in one pass.
+        """
+        params_matrix = np.asarray(params_matrix, dtype=np.float64)
+        self.__evaluation_number += len(params_matrix)
+        values = self.__algorithm_data.evaluate_batch(self.__x, params_matrix)
+        objectives = np.sum(np.square(values - self.__target_y), axis=1) * self.OBJECTIVE_SCALE
+        feasible = np.all((params_matrix >= self.__lower_bounds) & (params_matrix <= self.__upper_bounds), axis=1)
+        component_number = self.__algorithm_data.component_number
+        if component_number > 1:
+            feasible &= np.sum(params_matrix[:, 1-component_number:], axis=1) <= 1.0
+        if np.any(feasible):
+            best_index = np.argmin(np.where(feasible, objectives, np.inf))
+            if objectives[best_index] < self.__best_objective:
+                self.__best_objective = objectives[best_index]
+                self.__best_params = params_matrix[best_index].copy()
+        return objectives
+
+    # the analytic gradient of `objective`, avoid to approximate it by finite differences
+    def jacobian(self, args: Iterable[float]) -> np.ndarray:
+        self.__jacobian_evaluation_number += 1
+        return self.__algorithm_data.get_squared_sum_of_residual_errors_gradient(
+            self.__x, self.__target_y, args) * self.OBJECTIVE_SCALE
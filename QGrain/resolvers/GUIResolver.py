@@ -12,6 +12,7 @@ from QGrain.algorithms import DistributionType
 from QGrain.models.AlgorithmSettings import AlgorithmSettings
 from QGrain.models.FittingResult import FittingResult
 from QGrain.models.SampleData import SampleData
+from QGrain.resolvers.FittingCache import CachedFittingResult, FittingCache
 from QGrain.resolvers.Resolver import Resolver
 
 
@@ -51,6 +52,11 @@ class GUIResolver(QObject, Resolver):
         self.inherit_params = value
         self.logger.info("Setting [%s] have been changed to [%s].", "inherit_params", value)
 
+    def on_use_cache_changed(self, value: bool):
+        # the cache is disabled if its directory is not writable
+        self.cache = FittingCache.try_create(FittingCache.DEFAULT_DIRECTORY) if value else None
+        self.logger.info("Setting [%s] have been changed to [%s].", "use_cache", self.cache is not None)
+
     def on_algorithm_settings_changed(self, settings: AlgorithmSettings):
         self.change_settings(settings)
         self.logger.info("Algorithm settings have been changed.")
@@ -73,7 +79,7 @@ class GUIResolver(QObject, Resolver):
             len(self.last_succeeded_params) == len(self.algorithm_data.defaults):
             self.initial_guess = self.last_succeeded_params
         else:
-            self.initial_guess = self.algorithm_data.defaults
+            self.initial_guess = self.get_initial_guess()
 
         if self.expected_params is not None:
             self.initial_guess = self.expected_params
@@ -84,7 +90,8 @@ class GUIResolver(QObject, Resolver):
     def on_fitting_finished(self):
         self.expected_params = None
         self.sigFittingFinished.emit()
-        self.logger.debug("Fitting progress finished.")
+        self.logger.debug("Fitting progress finished, the objective function was evaluated [%d] times, and its gradient [%d] times.",
+                          self.problem.evaluation_number, self.problem.jacobian_evaluation_number)
 
     def on_global_fitting_failed(self, algorithm_result: OptimizeResult):
         self.sigFittingFailed.emit(self.tr("Fitting failed during global fitting progress."))
@@ -123,7 +130,16 @@ class GUIResolver(QObject, Resolver):
         # record the succeeded params
         self.last_succeeded_params = algorithm_result.x
         self.logger.info("The epoch of fitting has finished, the fitted parameters are: [%s]", algorithm_result.x)
-        self.sigFittingSucceeded.emit(self.get_fitting_result(algorithm_result.x))
+        result = self.get_fitting_result(algorithm_result.x)
+        self.cache_result(result)
+        self.sigFittingSucceeded.emit(result)
+
+    def on_cached_result_found(self, result: CachedFittingResult):
+        # the canvases need the full result
+        result = result.get()
+        self.last_succeeded_params = result.fitted_params
+        self.logger.info("The result was loaded from the cache, the fitted parameters are: [%s]", result.fitted_params)
+        self.sigFittingSucceeded.emit(result)
 
     # call this func by another thread
     # so, lock is necessary
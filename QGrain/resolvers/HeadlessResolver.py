@@ -2,6 +2,7 @@ __all__ = ["FittingTask", "FinalLocalOptimizationError",
            "GlobalOptimizationError",
            "HeadlessResolver"]
 
+from typing import Callable, List, Tuple, Union
 from uuid import UUID, uuid4
 
 import numpy as np
@@ -11,6 +12,8 @@ from QGrain.algorithms import DistributionType
 from QGrain.models.AlgorithmSettings import AlgorithmSettings
 from QGrain.models.FittingResult import FittingResult
 from QGrain.models.SampleData import SampleData
+from QGrain.resolvers.DatasetPreprocessor import DatasetPreprocessor
+from QGrain.resolvers.FittingCache import CachedFittingResult
 from QGrain.resolvers.Resolver import Resolver
 
 
@@ -18,7 +21,8 @@ class FittingTask:
     def __init__(self, sample: SampleData,
                  distribution_type=DistributionType.GeneralWeibull,
                  component_number=3,
-                 algorithm_settings=None):
+                 algorithm_settings=None,
+                 seed=None):
         self.uuid = uuid4()
         self.sample = sample
         self.component_number = component_number
@@ -27,6 +31,8 @@ class FittingTask:
             self.algorithm_settings = AlgorithmSettings()
         else:
             self.algorithm_settings = algorithm_settings
+        # `None` means the seed is derived from the content of sample, see `Resolver.get_default_seed`
+        self.seed = seed
 
 
 class FinalLocalOptimizationError(Exception):
@@ -44,14 +50,28 @@ class GlobalOptimizationError(Exception):
 
 
 class HeadlessResolver(Resolver):
+    # the global optimization of warm-started fitting is reduced to a few hops
+    WARM_START_MAXIMUM_ITERATION = 3
+    WARM_START_SUCCESS_ITERATION = 1
+    # and the searches of multi-start and differential evolution are reduced too
+    WARM_START_START_NUMBER = 2
+    WARM_START_POPULATION_SIZE = 8
+    WARM_START_MAXIMUM_GENERATION = 100
+    # fall back to the full search if the error is much larger than the last sample's
+    WARM_START_ERROR_RATIO = 4.0
     def __init__(self):
         super().__init__()
         self.current_task = None # type: FittingTask
-        self.current_result = None # type: FittingResult
+        self.current_result = None # type: Union[FittingResult, CachedFittingResult]
         self.current_exception = None # type: Exception
 
     def on_fitting_succeeded(self, algorithm_result: OptimizeResult):
         result = self.get_fitting_result(algorithm_result.x)
+        self.cache_result(result)
+        self.current_result = result
+
+    def on_cached_result_found(self, result: CachedFittingResult):
+        # the result is only built if it is needed, e.g. the workers only send the records back
         self.current_result = result
 
     def on_global_fitting_failed(self, algorithm_result: OptimizeResult):
@@ -61,15 +81,41 @@ class HeadlessResolver(Resolver):
         self.current_exception = FinalLocalOptimizationError(algorithm_result.message)
 
     def on_exception_raised_while_fitting(self, exception: Exception):
-        self.current_exception
-
-    def execute_task(self, task: FittingTask):
+        self.current_exception = exception
+
+    def execute_task(self, task: FittingTask,
+                     last_result: FittingResult = None,
+                     algorithm_settings: AlgorithmSettings = None,
+                     preprocessor: DatasetPreprocessor = None,
+                     index: int = None) -> Tuple[bool, FittingTask, Union[FittingResult, Exception]]:
+        """
+        Fit the sample of the task.
+
+        Args:
+            task: The `FittingTask` to execute.
+            last_result: Optional, the result of a similar sample (e.g. the neighbour in a core),
+                its params will be used as the initial guess.
+            algorithm_settings: Optional, use it instead of the settings of task.
+            preprocessor: Optional, the preprocessed table of the dataset, and `index` is the row of this sample.
+
+        If the result is found in `cache`, a `CachedFittingResult` is returned, call its `get` to build the `FittingResult`.
+        """
         self.current_task = task
+        self.current_result = None
+        self.current_exception = None
         self.distribution_type = task.distribution_type
         self.component_number = task.component_number
-        if task.algorithm_settings is not None:
-            self.change_settings(task.algorithm_settings)
-        self.feed_data(task.sample)
+        if algorithm_settings is None:
+            algorithm_settings = task.algorithm_settings
+        if algorithm_settings is not None:
+            self.change_settings(algorithm_settings)
+        self.feed_data(task.sample, preprocessor, index)
+        if task.seed is not None:
+            self.seed = task.seed
+        if last_result is not None:
+            # the x offsets of these two samples may be different
+            self.initial_guess = self.algorithm_data.shift_params(
+                last_result.fitted_params, last_result.x_offset - self.x_offset)
         self.try_fit()
         if self.current_result is None:
             assert self.current_exception is not None
@@ -77,4 +123,92 @@ class HeadlessResolver(Resolver):
         else:
             return True, self.current_task, self.current_result
 
-        
\ No newline at end of file
+    @classmethod
+    def get_warm_start_settings(cls, settings: AlgorithmSettings) -> AlgorithmSettings:
+        # only the sizes of global searches are reduced, the others are kept
+        return settings.replace(
+            global_optimization_maximum_iteration=min(settings.global_optimization_maximum_iteration,
+                                                      cls.WARM_START_MAXIMUM_ITERATION),
+            global_optimization_success_iteration=min(settings.global_optimization_success_iteration,
+                                                      cls.WARM_START_SUCCESS_ITERATION),
+            start_number=min(settings.start_number, cls.WARM_START_START_NUMBER),
+            population_size=min(settings.population_size, cls.WARM_START_POPULATION_SIZE),
+            maximum_generation=min(settings.maximum_generation, cls.WARM_START_MAXIMUM_GENERATION))
+
+    def execute_segment(self, tasks: List[FittingTask],
+                        should_stop: Callable[[], bool] = None,
+                        warm_start: bool = True) -> List[Tuple[bool, FittingTask, Union[FittingResult, Exception]]]:
+        """
+        Fit a contiguous segment of samples in order.
+
+        The neighbouring samples of a core have similar params, so each fitting is warm-started
+        from the last succeeded result with a reduced global search. If the error of the
+        warm-started fitting is poor, the full search will be performed again.
+
+        All tasks should have the same distribution type and component number.
+
+        If `should_stop` is given, it is checked before each task, and the outputs of
+        the finished tasks are returned once it returns `True` (i.e. the rest are not started).
+        If `warm_start` is `False`, all tasks are fitted independently, and only the preprocessing is shared.
+        """
+        outputs = []
+        last_result = None # type: FittingResult
+        # preprocess all samples at once if they share the same classes
+        preprocessor, indexes = None, [None] * len(tasks)
+        if len(tasks) > 1 and \
+                len(set(task.distribution_type for task in tasks)) == 1 and \
+                len(set(len(task.sample.distribution) for task in tasks)) == 1:
+            preprocessor = DatasetPreprocessor.from_samples(tasks[0].distribution_type, [task.sample for task in tasks])
+            indexes = range(len(tasks))
+        for task, index in zip(tasks, indexes):
+            if should_stop is not None and should_stop():
+                break
+            if not warm_start or last_result is None or \
+                    last_result.distribution_type != task.distribution_type or \
+                    last_result.component_number != task.component_number:
+                output = self.execute_task(task, preprocessor=preprocessor, index=index)
+            else:
+                warm_start_settings = self.get_warm_start_settings(task.algorithm_settings)
+                output = self.execute_task(task, last_result=last_result, algorithm_settings=warm_start_settings,
+                                           preprocessor=preprocessor, index=index)
+                flag, _, result = output
+                if not flag or not result.mean_squared_error <= \
+                        last_result.mean_squared_error * self.WARM_START_ERROR_RATIO:
+                    full_output = self.execute_task(task, preprocessor=preprocessor, index=index)
+                    if not flag or (full_output[0] and
+                            full_output[2].mean_squared_error < result.mean_squared_error):
+                        output = full_output
+            outputs.append(output)
+            if output[0]:
+                last_result = output[2]
+        return outputs
+
+
+if __name__ == "__main__":
+    # compare the time of fitting an ordered series of samples with and without warm start
+    import time
+
+    from QGrain.benchmarking import get_ordered_samples
+
+    distribution_type, component_number = DistributionType.GeneralWeibull, 3
+    tasks = [FittingTask(sample, distribution_type, component_number)
+             for sample in get_ordered_samples(distribution_type, component_number, 60, noise=1e-4)]
+
+    resolver = HeadlessResolver()
+    start = time.time()
+    outputs = [resolver.execute_task(task) for task in tasks]
+    print("Independent fitting: {0:.2f} s, median MSE: {1:.3e}".format(
+        time.time()-start, np.median([result.mean_squared_error for flag, _, result in outputs if flag])))
+    start = time.time()
+    outputs = resolver.execute_segment(tasks)
+    print("Warm-started fitting: {0:.2f} s, median MSE: {1:.3e}".format(
+        time.time()-start, np.median([result.mean_squared_error for flag, _, result in outputs if flag])))
+
+    # the early-stop conditions trade a little precision for much less time
+    for settings in (AlgorithmSettings(time_budget=0.1), AlgorithmSettings(plateau_iteration=2),
+                     AlgorithmSettings(target_objective=2e-3)):
+        start = time.time()
+        outputs = [resolver.execute_task(task, algorithm_settings=settings) for task in tasks]
+        print("Early-stopped fitting (time budget: {0}, plateau iteration: {1}, target objective: {2}): {3:.2f} s, median MSE: {4:.3e}".format(
+            settings.time_budget, settings.plateau_iteration, settings.target_objective, time.time()-start,
+            np.median([result.mean_squared_error for flag, _, result in outputs if flag])))
@@ -1,19 +1,37 @@
 __all__ = ["MultiProcessingResolver"]
 
 import logging
+import os
 import time
 from enum import Enum, unique
-from multiprocessing import Pool, cpu_count
-from typing import Dict, List
+from multiprocessing import Event, Pool, Value, cpu_count, resource_tracker
+from queue import Queue
+from typing import Any, Dict, List, Tuple
 from uuid import UUID, uuid4
 
 import numpy as np
 from PySide2.QtCore import QMutex, QObject, Signal
 
-from QGrain.algorithms import DistributionType
+from QGrain.algorithms import AlgorithmData, DistributionType
 from QGrain.models.AlgorithmSettings import AlgorithmSettings
 from QGrain.models.FittingResult import FittingResult
+from QGrain.models.WorkerSettings import (BLAS_THREAD_ENVIRONMENT_KEYS,
+                                          WorkerSettings)
+from QGrain.resolvers.DatasetPreprocessor import get_valid_data_ranges
+from QGrain.resolvers.FittingCache import FittingCache
+from QGrain.resolvers.FittingProblem import FittingProblem
 from QGrain.resolvers.HeadlessResolver import FittingTask, HeadlessResolver
+from QGrain.resolvers.ResultTable import (LazyFittingResult, ResultTable,
+                                          get_histories, get_records)
+from QGrain.resolvers.TaskBatch import TaskBatch, load_payload, split_batches
+from QGrain.resolvers.TaskScheduler import (ChunkScheduler, SchedulingPolicy,
+                                            TaskCostModel)
+
+try:
+    from threadpoolctl import threadpool_limits
+    HAS_THREADPOOLCTL = True
+except ImportError:
+    HAS_THREADPOOLCTL = False
 
 
 @unique
@@ -22,31 +40,131 @@ class ProcessState(Enum):
     Succeeded = 1
     Failed = 2
 
-def run_task(task):
-    global resolver
-    results = resolver.execute_task(task)
-    return results
+def start_next_task() -> bool:
+    global pause_event, started_task_number
+    # the rest tasks of the segment will not be started after the pause
+    if pause_event.is_set():
+        return False
+    with started_task_number.get_lock():
+        started_task_number.value += 1
+    return True
+
+def use_cache_directory(directory: str):
+    global resolver, cache_directory
+    if directory != cache_directory:
+        # the cache is disabled if the directory is not writable
+        resolver.cache = None if directory is None else FittingCache.try_create(directory)
+        cache_directory = directory
 
-def setup_process(*args):
+def run_chunk(reference, indexes, warm_start, directory, record_history):
     global resolver
+    use_cache_directory(directory)
+    payload = load_payload(reference)
+    settings = payload.algorithm_settings
+    # the records are fixed-size without the histories
+    if not record_history and settings.history_capacity != 0:
+        settings = settings.replace(history_capacity=0)
+    tasks = [payload.get_task(index, settings) for index in indexes]
+    start_times = []
+    def should_stop():
+        if start_next_task():
+            start_times.append(time.perf_counter())
+            return False
+        return True
+    outputs = resolver.execute_segment(tasks, should_stop=should_stop, warm_start=warm_start)
+    spent_times = np.diff(start_times + [time.perf_counter()])[:len(outputs)]
+    # only the compact records (and the histories if recorded) are sent back,
+    # the results are rebuilt by the main process if needed
+    param_count = len(AlgorithmData.get_algorithm_data(payload.distribution_type, payload.component_number).defaults)
+    return get_records(indexes, outputs, spent_times, param_count), get_histories(indexes, outputs)
+
+# the distribution types and component numbers to warm up if the pool is started before any task,
+# i.e. the defaults of the task window and the control panel
+DEFAULT_CONFIGURATIONS = [(DistributionType.GeneralWeibull, component_number) for component_number in range(1, 4)]
+# the later configurations of the pending tasks are warmed up by their first tasks
+MAXIMUM_WARM_UP_CONFIGURATION_NUMBER = 8
+
+def warm_up(configurations):
+    # build the algorithm data and evaluate the kernels once, so that the first tasks will not pay for them
+    x = np.linspace(1, 101, 101)
+    target_y = np.exp(-np.square(x-50)/200)
+    for distribution_type, component_number in configurations:
+        algorithm_data = AlgorithmData.get_algorithm_data(distribution_type, component_number)
+        problem = FittingProblem(algorithm_data, x, target_y)
+        params = np.array(algorithm_data.defaults, dtype=np.float64)
+        problem.objective(params)
+        problem.jacobian(params)
+
+def apply_worker_settings(settings: WorkerSettings, worker_index: int):
+    logger = logging.getLogger(name="root.resolvers.MultiProcessingResolver")
+    # the environment variables are set before spawning (see `get_pool`),
+    # without threadpoolctl the limit is best-effort as it relies on them only
+    if HAS_THREADPOOLCTL:
+        threadpool_limits(limits=settings.blas_thread_number)
+    if settings.cpu_affinity:
+        if hasattr(os, "sched_setaffinity"):
+            cores = sorted(os.sched_getaffinity(0))
+            os.sched_setaffinity(0, {cores[worker_index % len(cores)]})
+        else:
+            logger.warning("The CPU affinity is not supported on this platform, it is ignored.")
+
+def setup_process(event, counter, launched_counter, ready_counter, configurations, worker_settings):
+    global resolver, pause_event, started_task_number, cache_directory
+    with launched_counter.get_lock():
+        worker_index = launched_counter.value
+        launched_counter.value += 1
+    apply_worker_settings(worker_settings, worker_index)
+    pause_event = event
+    started_task_number = counter
     resolver = HeadlessResolver()
-    for distribution_type, component_number in args:
-        resolver.distribution_type = distribution_type
-        resolver.component_number = component_number
+    cache_directory = None
+    warm_up(configurations)
+    with ready_counter.get_lock():
+        ready_counter.value += 1
 
 class MultiProcessingResolver(QObject):
-    task_state_updated = Signal(list, dict, dict)
+    # only the newly finished tasks, i.e. the states (`Dict[UUID, ProcessState]`)
+    # and the succeeded results (`Dict[UUID, LazyFittingResult]`) of them
+    task_state_updated = Signal(dict, dict)
     logger = logging.getLogger(name="root.resolvers.MultiProcessingResolver")
-    STATE_CHECK_TIME_INTERVAL = 0.20
-    def __init__(self):
+    def __init__(self, worker_settings: WorkerSettings = None):
         super().__init__()
         self.tasks = [] # type: List[FittingTask]
         self.states = {} # type: Dict[UUID, ProcessState]
-        self.succeeded_results = {} # type: Dict[UUID, FittingResult]
+        # the results are built when `LazyFittingResult.get` is called
+        self.succeeded_results = {} # type: Dict[UUID, LazyFittingResult]
+        # warm-start each fitting from the last sample, see `HeadlessResolver.execute_segment`
+        self.warm_start = False
+        # the directory of `FittingCache`, `None` means disabled
+        self.cache_directory = None # type: str
+        # record the histories of the results (see `AlgorithmSettings.history_capacity`), which are sent back with the records
+        self.record_history = False
+        # the count of workers, the BLAS threads of each worker and the CPU affinity
+        self.worker_settings = WorkerSettings() if worker_settings is None else worker_settings
+        # the count of tasks of each chunk, the warm-started segments are not split
+        self.chunk_size = 64
+        # the order to dispatch the chunks, and the runtimes observed by all executions
+        self.scheduling_policy = SchedulingPolicy.LongestFirst
+        self.cost_model = TaskCostModel()
 
+        # the pool is started in background by `setup_all`, and kept until `cleanup_all`
+        self.__pool = None # type: Pool
+        # the worker settings which the current pool was started with
+        self.__pool_worker_settings = None # type: Dict[str, Any]
+        # set to stop the workers from starting new tasks
+        self.__pause_event = Event()
+        # the count of tasks started by the workers of current pool
+        self.__started_task_number = Value("q", 0)
+        # the count of workers which have been launched and set up
+        self.__launched_worker_number = Value("q", 0)
+        self.__ready_worker_number = Value("q", 0)
+        self.__recorded_task_number = 0
         self.__pause_flag = False
         self.__cancel_flag = False
         self.__pause_mutex = QMutex()
+        # the outputs of finished chunks are put by the callbacks of pool,
+        # `None` is put to wake up the execution to handle the pause request
+        self.__finished_queue = Queue()
 
     def on_task_generated(self, tasks: List[FittingTask]):
         assert tasks is not None
@@ -60,50 +178,211 @@ class MultiProcessingResolver(QObject):
         assert self.tasks is not None
         assert self.states is not None
         assert self.succeeded_results is not None
-        # setup the thread pool
-        suggested_params = [(DistributionType.GeneralWeibull, 1), (DistributionType.GeneralWeibull, 2),
-                            (DistributionType.GeneralWeibull, 3), (DistributionType.GeneralWeibull, 4)]
-        pool = Pool(cpu_count(), setup_process, suggested_params)
-        async_results = {task.uuid: pool.apply_async(run_task, args=(task,))
-                         for task in self.tasks
-                         if self.states[task.uuid] == ProcessState.NotStarted}
-        def check_states():
-            for task_id, result in async_results.items():
-                if result.ready():
-                    flag, task, fitting_result = result.get()
-                    if flag:
-                        self.states[task_id] = ProcessState.Succeeded
-                        self.succeeded_results[task_id] = fitting_result
-                    else:
-                        self.states[task_id] = ProcessState.Failed
-                else:
-                    self.states[task_id] = ProcessState.NotStarted
-            self.task_state_updated.emit(self.tasks, self.states, self.succeeded_results)
-
-        while True:
-            self.__pause_mutex.lock()
-            # handle the pause request
-            if self.__pause_flag:
-                self.__pause_flag = False
-                self.__pause_mutex.unlock()
-                check_states()
-                pool.terminate()
-                pool.join()
-                break
+        # discard the stale pause request
+        self.__pause_mutex.lock()
+        self.__pause_flag = False
+        self.__finished_queue = Queue()
+        self.__pause_mutex.unlock()
+        pool = self.get_pool()
+        self.__pause_event.clear()
+        tasks_to_run = [task for task in self.tasks if self.states[task.uuid] == ProcessState.NotStarted]
+        # the shared data of each batch is sent to each worker once
+        batches = split_batches(tasks_to_run)
+        # the chunks are selected while dispatching, so that the latest observed costs are used
+        scheduler = ChunkScheduler(self.scheduling_policy, self.cost_model)
+        for batch in batches:
+            first = batch.tasks[0]
+            start_indexes, end_indexes = get_valid_data_ranges(
+                np.array([task.sample.distribution for task in batch.tasks]))
+            valid_lengths = end_indexes - start_indexes
+            if self.warm_start:
+                chunk_size = int(np.ceil(len(batch) / self.worker_settings.worker_number))
+            else:
+                chunk_size = self.chunk_size
+            scheduler.add_batch((batch, ResultTable(batch.tasks), valid_lengths),
+                                first.distribution_type, first.component_number,
+                                valid_lengths, chunk_size, keep_order=self.warm_start)
+
+        finished_queue = self.__finished_queue
+        # the count of finished tasks of each batch, its block is released after the last chunk
+        finished_task_numbers = {batch: 0 for batch in batches}
+        def dispatch(item: Tuple[TaskBatch, ResultTable, np.ndarray], indexes: np.ndarray):
+            batch = item[0]
+            # the callbacks are called in the result handler thread of pool
+            pool.apply_async(run_chunk, args=batch.get_chunk(indexes) + \
+                                 (self.warm_start, self.cache_directory, self.record_history),
+                             callback=lambda output: finished_queue.put((item, indexes, output)),
+                             error_callback=lambda exception: finished_queue.put((item, indexes, exception)))
+
+        def handle_finished(item: Tuple[TaskBatch, ResultTable, np.ndarray], indexes: np.ndarray, output):
+            batch, table, valid_lengths = item
+            finished_task_numbers[batch] += len(indexes)
+            if finished_task_numbers[batch] == len(batch):
+                batch.release()
+            states, succeeded_results = {}, {}
+            if isinstance(output, Exception):
+                self.logger.error("Failed to run the chunk of %d tasks: %s", len(indexes), output)
+                for index in indexes:
+                    states[table.tasks[index].uuid] = ProcessState.Failed
             else:
+                records, histories = output
+                self.__recorded_task_number += len(records)
+                table.write(records, histories)
+                # learn the costs from the fitted tasks
+                fitted = ~records["from_cache"]
+                self.cost_model.observe(table.algorithm_data.distribution_type, table.algorithm_data.component_number,
+                                        valid_lengths[records["index"][fitted]], records["spent_time"][fitted])
+                for index, succeeded in zip(records["index"].tolist(), records["succeeded"].tolist()):
+                    task_id = table.tasks[index].uuid
+                    if succeeded:
+                        states[task_id] = ProcessState.Succeeded
+                        succeeded_results[task_id] = table.get_lazy_result(index)
+                    else:
+                        states[task_id] = ProcessState.Failed
+            self.states.update(states)
+            self.succeeded_results.update(succeeded_results)
+            return states, succeeded_results
+
+        def drain(first_item=None):
+            # handle all finished chunks at once, and emit only the changes
+            states, succeeded_results = {}, {}
+            finished_number = 0
+            item = first_item
+            while True:
+                if item is not None:
+                    new_states, new_results = handle_finished(*item)
+                    states.update(new_states)
+                    succeeded_results.update(new_results)
+                    finished_number += 1
+                if finished_queue.empty():
+                    break
+                item = finished_queue.get_nowait()
+            if len(states) != 0:
+                self.task_state_updated.emit(states, succeeded_results)
+            return finished_number
+
+        # the pool is kept after pausing, and the chunks are dispatched gradually
+        maximum_pending_chunk_number = 2 * self.worker_settings.worker_number
+        pending_chunk_number = 0
+        paused = False
+        try:
+            while True:
+                while not paused and len(scheduler) > 0 and \
+                        pending_chunk_number < maximum_pending_chunk_number:
+                    dispatch(*scheduler.pop())
+                    pending_chunk_number += 1
+                if pending_chunk_number == 0:
+                    break
+                # block until any chunk is finished or the pause is requested
+                item = finished_queue.get()
+                pending_chunk_number -= drain(item)
+                self.__pause_mutex.lock()
+                # handle the pause request, the pending chunks stop after their current tasks
+                if self.__pause_flag:
+                    self.__pause_flag = False
+                    paused = True
+                    self.__pause_event.set()
                 self.__pause_mutex.unlock()
-                time.sleep(self.STATE_CHECK_TIME_INTERVAL)
-                check_states()
-                # check if all tasks are finished
-                if np.alltrue([state!=ProcessState.NotStarted for state in self.states.values()]):
-                    pool.terminate()
-                    pool.join()
+        finally:
+            # the rest batches were paused or an exception was raised, the attached blocks are
+            # still valid for the pending chunks, and the chunks which have not attached will fail
+            for batch in batches:
+                batch.release()
+
+    def get_warm_up_configurations(self) -> List[Tuple[DistributionType, int]]:
+        # only the configurations of the pending tasks, in the order of tasks
+        configurations = []
+        for task in self.tasks:
+            configuration = (task.distribution_type, task.component_number)
+            if self.states[task.uuid] == ProcessState.NotStarted and configuration not in configurations:
+                configurations.append(configuration)
+                if len(configurations) == MAXIMUM_WARM_UP_CONFIGURATION_NUMBER:
                     break
+        if len(configurations) == 0:
+            return list(DEFAULT_CONFIGURATIONS)
+        return configurations
+
+    def get_pool(self) -> Pool:
+        # the workers must be restarted to apply the new settings
+        if self.__pool is not None and self.__pool_worker_settings != self.worker_settings.to_dict():
+            self.close_pool()
+        if self.__pool is None:
+            configurations = self.get_warm_up_configurations()
+            self.__started_task_number.value = 0
+            self.__launched_worker_number.value = 0
+            self.__ready_worker_number.value = 0
+            self.__recorded_task_number = 0
+            settings = self.worker_settings
+            # the workers inherit the running resource tracker, otherwise the forked ones start their own,
+            # see `TaskBatch.attach_memory`
+            if os.name == "posix":
+                resource_tracker.ensure_running()
+            # the spawned workers inherit the environment variables, so that BLAS is limited while it is loaded
+            original_environment = {key: os.environ.get(key) for key in BLAS_THREAD_ENVIRONMENT_KEYS}
+            os.environ.update({key: str(settings.blas_thread_number) for key in BLAS_THREAD_ENVIRONMENT_KEYS})
+            try:
+                self.__pool = Pool(settings.worker_number, setup_process,
+                                   (self.__pause_event, self.__started_task_number,
+                                    self.__launched_worker_number, self.__ready_worker_number,
+                                    configurations, settings))
+            finally:
+                for key, value in original_environment.items():
+                    if value is None:
+                        os.environ.pop(key, None)
+                    else:
+                        os.environ[key] = value
+            self.__pool_worker_settings = settings.to_dict()
+        return self.__pool
+
+    def close_pool(self):
+        if self.__pool is not None:
+            self.__pool.terminate()
+            self.__pool.join()
+            self.__pool = None
+
+    @property
+    def pool(self) -> Pool:
+        return self.__pool
+
+    @property
+    def ready_worker_number(self) -> int:
+        return self.__ready_worker_number.value
+
+    @property
+    def lost_task_number(self) -> int:
+        """
+        The count of tasks which were started by the workers of current pool, but their outputs were not recorded.
+
+        It is zero after the execution returns, unless the pool was broken.
+        """
+        return self.__started_task_number.value - self.__recorded_task_number
+
+    def set_warm_start(self, value: bool):
+        self.warm_start = value
+
+    def set_cache_directory(self, directory: str):
+        self.cache_directory = directory
 
+    def set_record_history(self, value: bool):
+        self.record_history = value
+
+    def set_worker_settings(self, settings: WorkerSettings):
+        # the pool is restarted by the next execution if the settings changed
+        assert isinstance(settings, WorkerSettings)
+        self.worker_settings = settings
+
+    def set_scheduling_policy(self, policy: SchedulingPolicy):
+        assert isinstance(policy, SchedulingPolicy)
+        self.scheduling_policy = policy
+
+    def set_chunk_size(self, value: int):
+        assert value > 0
+        self.chunk_size = value
 
     def pause_task(self):
         self.__pause_mutex.lock()
         self.__pause_flag = True
+        self.__finished_queue.put(None)
         self.__pause_mutex.unlock()
 
 
@@ -113,7 +392,57 @@ class MultiProcessingResolver(QObject):
         self.succeeded_results = {}
 
     def setup_all(self):
-        pass
+        # the workers are spawned and warmed up in background
+        self.get_pool()
 
     def cleanup_all(self):
-        pass
+        self.close_pool()
+
+
+if __name__ == "__main__":
+    # compare the time to get the first result with a cold pool and a pre-warmed pool,
+    # then measure the throughput of the pre-warmed pools from 1 to N workers
+    import multiprocessing
+
+    from QGrain.benchmarking import get_ordered_samples
+    from QGrain.models.WorkerSettings import WorkerSettings
+    from QGrain.resolvers.MultiprocessingResolver import MultiProcessingResolver
+
+    # the start method of the application, see `QGrain.main`
+    multiprocessing.set_start_method("spawn", True)
+    def get_tasks(task_number: int):
+        return [FittingTask(sample, DistributionType.Normal, 2)
+                for sample in get_ordered_samples(DistributionType.Normal, 2, task_number)]
+
+    def wait_until_ready(resolver: MultiProcessingResolver):
+        resolver.setup_all()
+        while resolver.ready_worker_number < resolver.worker_settings.worker_number:
+            time.sleep(0.01)
+
+    for prewarmed in (False, True):
+        resolver = MultiProcessingResolver()
+        first_times = []
+        resolver.task_state_updated.connect(lambda states, results: first_times.append(time.perf_counter()))
+        if prewarmed:
+            wait_until_ready(resolver)
+        resolver.on_task_generated(get_tasks(cpu_count()))
+        start = time.perf_counter()
+        resolver.execute_tasks()
+        print("{0} pool, the first result: {1:.2f} s, all results: {2:.2f} s".format(
+            "Pre-warmed" if prewarmed else "Cold", first_times[0]-start, first_times[-1]-start))
+        resolver.cleanup_all()
+
+    maximum_worker_number = cpu_count()
+    worker_numbers = sorted({2**i for i in range(maximum_worker_number.bit_length()) if 2**i <= maximum_worker_number} | \
+                            {maximum_worker_number})
+    for worker_number in worker_numbers:
+        resolver = MultiProcessingResolver(WorkerSettings(worker_number=worker_number, blas_thread_number=1))
+        resolver.set_chunk_size(8)
+        wait_until_ready(resolver)
+        tasks = get_tasks(32 * worker_number)
+        resolver.on_task_generated(tasks)
+        start = time.perf_counter()
+        resolver.execute_tasks()
+        spent_time = time.perf_counter() - start
+        print("{0} workers: {1:.1f} tasks/s".format(worker_number, len(tasks) / spent_time))
+        resolver.cleanup_all()
@@ -1,15 +1,34 @@
-__all__ = ["Resolver"]
+__all__ = ["EarlyStop", "Resolver"]
 
+import hashlib
+import time
 from enum import Enum, unique
 from typing import Dict, Iterable, List, Tuple
 
 import numpy as np
 from scipy.optimize import OptimizeResult, basinhopping, minimize
 
-from QGrain.algorithms import AlgorithmData, DistributionType
+from QGrain.algorithms import AlgorithmData, DistributionType, GlobalOptimizer
+from QGrain.initializers import InitialGuessMethod, get_peak_initial_guesses
+from QGrain.optimizers import (differential_evolution, get_minimizer_kwargs,
+                               multi_start)
 from QGrain.models.AlgorithmSettings import AlgorithmSettings
-from QGrain.models.FittingResult import FittingResult
+from QGrain.models.FittingHistory import FittingHistory
+from QGrain.models.FittingResult import FittingResult, StopReason
 from QGrain.models.SampleData import SampleData
+from QGrain.resolvers.DatasetPreprocessor import (DatasetPreprocessor,
+                                                  get_valid_data_ranges)
+from QGrain.resolvers.FittingCache import CachedFittingResult, FittingCache
+from QGrain.resolvers.FittingProblem import FittingProblem
+
+
+class EarlyStop(Exception):
+    """
+    Raises to stop the fitting when any early-stop condition is triggered.
+    """
+    def __init__(self, reason: StopReason):
+        super().__init__(reason)
+        self.reason = reason
 
 
 class Resolver:
@@ -19,7 +38,6 @@ class Resolver:
     def __init__(self):
         self.__distribution_type = DistributionType.GeneralWeibull
         self.__component_number = 3
-        self.refresh()
 
         # algorithms settings
         self.algorthm_settings = AlgorithmSettings()
@@ -34,7 +52,21 @@ class Resolver:
         # parameters to preprocess the data
         self.start_index = None # type: int
         self.end_index = None # type: int
-        self.fitting_history = None # type: List[np.ndarray]
+        # `None` if the recording of history is disabled
+        self.fitting_history = None # type: FittingHistory
+        # the prepared problem of current sample and its initial guess, see `prepare_problem`
+        self.__problem = None # type: FittingProblem
+        self.__initial_guess = None # type: np.ndarray
+        self.__problem_outdated = True
+        # why the last fitting stopped, see `AlgorithmSettings` for the early-stop conditions
+        self.stop_reason = None # type: StopReason
+        self.fitting_start_time = None # type: float
+        # the persistent cache of results, `None` means disabled
+        self.cache = None # type: FittingCache
+        # the seed of the stochastic search, see `get_default_seed`
+        # `None` means using the unpredictable random state
+        self.seed = None # type: int
+        self.refresh()
 
     @property
     def distribution_type(self) -> DistributionType:
@@ -62,7 +94,28 @@ class Resolver:
 
     def refresh(self):
         self.algorithm_data = AlgorithmData.get_algorithm_data(self.distribution_type, self.component_number)
-        self.initial_guess = self.algorithm_data.defaults
+        # the problem depends on the distribution type and component number
+        self.__problem_outdated = True
+
+    @property
+    def problem(self) -> FittingProblem:
+        # the problem is rebuilt lazily, because the settings are usually changed before feeding a new sample
+        if self.__problem_outdated:
+            self.prepare_problem()
+        return self.__problem
+
+    @property
+    def initial_guess(self) -> np.ndarray:
+        if self.__problem_outdated:
+            self.prepare_problem()
+        return self.__initial_guess
+
+    @initial_guess.setter
+    def initial_guess(self, value: np.ndarray):
+        # prepare the outdated problem first, otherwise its guess will overwrite this one
+        if self.__problem_outdated:
+            self.prepare_problem()
+        self.__initial_guess = value
 
     @staticmethod
     def get_squared_sum_of_residual_errors(
@@ -72,25 +125,23 @@ class Resolver:
 
     @staticmethod
     def get_valid_data_range(target_y: np.ndarray, slice_data: bool=True):
-        start_index = 0
-        end_index = len(target_y)
-        if slice_data:
-            for i, value in enumerate(target_y):
-                if value > 0.0:
-                    if i == 0:
-                        break
-                    else:
-                        start_index = i-1
-                        break
-            # search from tail to head
-            for i, value in enumerate(target_y[start_index+1:][::-1]):
-                if value > 0.0:
-                    if i <= 1:
-                        break
-                    else:
-                        end_index = (i-1)*(-1)
-                        break
-        return start_index, end_index
+        if not slice_data:
+            return 0, len(target_y)
+        start_indexes, end_indexes = get_valid_data_ranges(np.asarray(target_y)[np.newaxis, :])
+        return start_indexes[0].item(), end_indexes[0].item()
+
+    @staticmethod
+    def get_default_seed(classes: np.ndarray, distribution: np.ndarray) -> int:
+        """
+        Get the seed which is derived from the content of the sample.
+
+        Hence the same sample always gets the same result, no matter when and where it is fitted.
+        """
+        digest = hashlib.blake2b(digest_size=4)
+        for array in (classes, distribution):
+            digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+            digest.update(b"|")
+        return int.from_bytes(digest.digest(), "little")
 
     # hooks
     def on_data_fed(self, sample_name: str):
@@ -100,7 +151,11 @@ class Resolver:
         pass
 
     def on_fitting_started(self):
-        self.fitting_history = []
+        capacity = self.algorthm_settings.history_capacity
+        if capacity == 0:
+            self.fitting_history = None
+        else:
+            self.fitting_history = FittingHistory(len(self.algorithm_data.defaults), capacity)
 
     def on_fitting_finished(self):
         pass
@@ -118,7 +173,8 @@ class Resolver:
         pass
 
     def local_iteration_callback(self, fitted_params: Iterable[float]):
-        self.fitting_history.append(fitted_params)
+        if self.fitting_history is not None:
+            self.fitting_history.append(fitted_params)
 
     def global_iteration_callback(self, fitted_params: Iterable[float], function_value: float, accept: bool):
         pass
@@ -126,32 +182,66 @@ class Resolver:
     def on_fitting_succeeded(self, algorithm_result: OptimizeResult):
         pass
 
-    def preprocess_data(self):
-        self.start_index, self.end_index = Resolver.get_valid_data_range(self.target_y)
-        # Normal and General Weibull distribution need to use x offset to get better performance.
-        # Because if do not do that, the search space will be larger,
-        # and hence increse the difficulty of searching.
-        if self.distribution_type == DistributionType.Normal or \
-                self.distribution_type == DistributionType.GeneralWeibull:
-            self.x_offset = self.start_index
-        else:
-            self.x_offset = 0.0
-        # Bin numbers are similar to log(x), but will not raise negative value.
-        # This will make the fitting of some distributions (e.g. Weibull) easier.
-        self.bin_numbers = np.array(range(len(self.target_y)), dtype=np.float64) + 1
-        # fitting under the bin numbers' space
-        if self.distribution_type == DistributionType.Normal or \
-                self.distribution_type == DistributionType.Weibull or \
-                self.distribution_type == DistributionType.GeneralWeibull:
-            self.fitting_space_x = self.bin_numbers
+    def on_cached_result_found(self, result: CachedFittingResult):
+        pass
+
+    def preprocess_data(self, preprocessor: DatasetPreprocessor = None, index: int = None):
+        """
+        Preprocess the data of current sample.
+
+        If the `DatasetPreprocessor` of the dataset is given, the row `index` of its table will be used directly.
+        """
+        if preprocessor is None:
+            preprocessor = DatasetPreprocessor(self.distribution_type, np.asarray(self.target_y)[np.newaxis, :])
+            index = 0
+        assert preprocessor.distribution_type == self.distribution_type
+        assert len(preprocessor.bin_numbers) == len(self.target_y)
+        start_index, end_index, x_offset = preprocessor.records[index].item()
+        self.start_index = start_index
+        self.end_index = end_index
+        self.x_offset = x_offset
+        self.bin_numbers = preprocessor.bin_numbers
+        self.fitting_space_x = preprocessor.fitting_space_x
+        self.prepare_problem()
+
+    def prepare_problem(self):
+        """
+        Build the problem and the initial guess of current sample.
+
+        It is called by `preprocess_data`, the other changes (i.e. the distribution type,
+        component number and settings) only mark the problem outdated.
+        """
+        self.__problem_outdated = False
+        if not self.data_prepared:
+            self.__problem = None
+            self.__initial_guess = self.algorithm_data.defaults
+            return
+        # using partial values (i.e. don't use unnecessary zero values)
+        # will highly improve the performance of algorithms
+        self.__problem = FittingProblem(
+            self.algorithm_data,
+            self.fitting_space_x[self.start_index: self.end_index]-self.x_offset,
+            self.target_y[self.start_index: self.end_index],
+            kernel_backend=self.algorthm_settings.kernel_backend)
+        self.__initial_guess = self.get_initial_guess()
+
+    def get_initial_guess(self):
+        method = self.algorthm_settings.initial_guess_method
+        problem = self.__problem
+        if problem is None or method == InitialGuessMethod.Defaults:
+            return self.algorithm_data.defaults
+        elif method == InitialGuessMethod.Peaks:
+            return get_peak_initial_guesses(self.algorithm_data, problem.x, problem.target_y[np.newaxis, :])[0]
         else:
-            raise NotImplementedError(self.distribution_type)
+            raise NotImplementedError(method)
 
-    def feed_data(self, sample: SampleData):
+    def feed_data(self, sample: SampleData,
+                  preprocessor: DatasetPreprocessor = None, index: int = None):
         self.sample_name = sample.name
         self.real_x = sample.classes
         self.target_y = sample.distribution
-        self.preprocess_data()
+        self.seed = self.get_default_seed(sample.classes, sample.distribution)
+        self.preprocess_data(preprocessor, index)
         self.on_data_fed(sample.name)
 
     @property
@@ -173,45 +263,139 @@ class Resolver:
         assert settings is not None
         assert isinstance(settings, AlgorithmSettings)
         self.algorthm_settings = settings
+        # the kernel backend and initial guess method may be changed
+        self.__problem_outdated = True
 
     def get_fitting_result(self, fitted_params: Iterable[float],
-                           fitting_history: List[np.ndarray] = None):
+                           fitting_history: np.ndarray = None):
+        if fitting_history is None and self.fitting_history is not None:
+            fitting_history = self.fitting_history.params
         result = FittingResult(self.sample_name, self.real_x,
                                self.fitting_space_x, self.bin_numbers,
                                self.target_y, self.algorithm_data,
                                fitted_params, self.x_offset,
-                               fitting_history=self.fitting_history if fitting_history is None else fitting_history)
+                               fitting_history=fitting_history,
+                               stop_reason=self.stop_reason)
         return result
 
+    def get_cache_key(self) -> str:
+        return FittingCache.get_key(self.real_x, self.target_y,
+                                    self.distribution_type, self.component_number,
+                                    self.algorthm_settings, initial_guess=self.initial_guess,
+                                    seed=self.seed)
+
+    def get_cached_result(self, fitted_params: np.ndarray, x_offset: float,
+                          mean_squared_error: float, stop_reason: StopReason) -> CachedFittingResult:
+        return CachedFittingResult(self.sample_name, self.real_x,
+                                   self.fitting_space_x, self.bin_numbers,
+                                   self.target_y, self.algorithm_data,
+                                   fitted_params, x_offset,
+                                   mean_squared_error, stop_reason)
+
+    def cache_result(self, result: FittingResult):
+        # the progress within the time budget depends on the load of machine, it should not be reused
+        if self.cache is not None and not result.from_cache and \
+                result.stop_reason != StopReason.TimeBudget:
+            self.cache.put(self.get_cache_key(), result)
+
+    def check_budgets(self) -> StopReason:
+        """
+        Check the time budget and the target objective, return `None` if the fitting should go on.
+        """
+        settings = self.algorthm_settings
+        if settings.time_budget is not None and \
+                time.perf_counter() - self.fitting_start_time > settings.time_budget:
+            return StopReason.TimeBudget
+        if settings.target_objective is not None and \
+                self.problem.best_objective <= settings.target_objective:
+            return StopReason.TargetObjective
+        return None
+
     def try_fit(self):
         if not self.data_prepared:
             self.on_data_not_prepared()
             return
+        problem = self.problem
+        problem.reset()
+        self.stop_reason = StopReason.Completed
+        self.fitting_start_time = time.perf_counter()
         self.on_fitting_started()
-
-        def closure(args):
-            # using partial values (i.e. don't use unnecessary zero values)
-            # will highly improve the performance of algorithms
-            x_to_fit = self.fitting_space_x[self.start_index: self.end_index]-self.x_offset
-            y_to_fit = self.target_y[self.start_index: self.end_index]
-            current_values = self.algorithm_data.mixed_func(x_to_fit, *args)
-            return Resolver.get_squared_sum_of_residual_errors(current_values, y_to_fit)*100
-
-        global_optimization_minimizer_kwargs = \
-            dict(method="SLSQP",
-                 bounds=self.algorithm_data.bounds,
-                 constraints=self.algorithm_data.constrains,
-                 callback=self.local_iteration_callback,
-                 options={"maxiter": self.algorthm_settings.global_optimization_minimizer_maximum_iteration,
-                          "ftol": 10**-self.algorthm_settings.global_optimization_minimizer_tolerance_level})
+        # the initial guess may be changed while the fitting is starting
+        if self.cache is not None:
+            record = self.cache.get(self.get_cache_key())
+            if record is not None:
+                self.on_cached_result_found(self.get_cached_result(*record))
+                self.on_fitting_finished()
+                return
+        settings = self.algorthm_settings
+        # a new random state for each fitting, so that the result does not depend on the former fittings
+        random_state = np.random.RandomState(self.seed)
+
+        def local_callback(fitted_params):
+            self.local_iteration_callback(fitted_params)
+            reason = self.check_budgets()
+            if reason is not None:
+                self.stop_reason = reason
+                # the minimizer can not be stopped by the return value of callback
+                raise EarlyStop(reason)
+
+        # the best local minimum and the number of hops since it was found
+        plateau_state = [np.inf, 0]
+        def global_callback(fitted_params, function_value, accept):
+            self.global_iteration_callback(fitted_params, function_value, accept)
+            reason = self.check_budgets()
+            if reason is None and settings.plateau_iteration is not None:
+                if function_value < plateau_state[0] * (1 - settings.plateau_tolerance):
+                    plateau_state[0] = function_value
+                    plateau_state[1] = 0
+                else:
+                    plateau_state[1] += 1
+                if plateau_state[1] >= settings.plateau_iteration:
+                    reason = StopReason.Plateau
+            if reason is not None:
+                self.stop_reason = reason
+                return True
+
+        global_optimization_minimizer_kwargs = get_minimizer_kwargs(
+            problem, settings.local_minimizer,
+            settings.global_optimization_minimizer_maximum_iteration,
+            10**-settings.global_optimization_minimizer_tolerance_level,
+            callback=local_callback)
+        final_optimization_minimizer_kwargs = get_minimizer_kwargs(
+            problem, settings.local_minimizer,
+            settings.final_optimization_minimizer_maximum_iteration,
+            10**-settings.final_optimization_minimizer_tolerance_level,
+            callback=local_callback)
         try:
-            global_optimization_result = \
-                basinhopping(closure, x0=self.initial_guess,
-                             minimizer_kwargs=global_optimization_minimizer_kwargs,
-                             callback=self.global_iteration_callback,
-                             niter_success=self.algorthm_settings.global_optimization_success_iteration,
-                             niter=self.algorthm_settings.global_optimization_maximum_iteration,
-                             stepsize=self.algorthm_settings.global_optimization_step_size)
+            if settings.global_optimizer == GlobalOptimizer.BasinHopping:
+                global_optimization_result = \
+                    basinhopping(problem.objective, x0=self.initial_guess,
+                                 minimizer_kwargs=global_optimization_minimizer_kwargs,
+                                 callback=global_callback,
+                                 niter_success=settings.global_optimization_success_iteration,
+                                 niter=settings.global_optimization_maximum_iteration,
+                                 stepsize=settings.global_optimization_step_size,
+                                 seed=random_state)
+            elif settings.global_optimizer == GlobalOptimizer.MultiStart:
+                global_optimization_result = \
+                    multi_start(problem, self.initial_guess,
+                                settings.start_number,
+                                global_optimization_minimizer_kwargs,
+                                callback=global_callback,
+                                random_state=random_state)
+            elif settings.global_optimizer == GlobalOptimizer.DifferentialEvolution:
+                global_optimization_result = \
+                    differential_evolution(problem, self.initial_guess,
+                                           settings.population_size,
+                                           settings.maximum_generation,
+                                           callback=global_callback,
+                                           random_state=random_state)
+            else:
+                raise NotImplementedError(settings.global_optimizer)
+            # the final optimization is still performed after the plateau was reached
+            if self.stop_reason == StopReason.TimeBudget or \
+                    self.stop_reason == StopReason.TargetObjective:
+                raise EarlyStop(self.stop_reason)
 
             if global_optimization_result.lowest_optimization_result.success or \
                     global_optimization_result.lowest_optimization_result.status == 9:
@@ -221,13 +405,8 @@ class Resolver:
                 self.on_fitting_finished()
                 return
             final_optimization_result = \
-                minimize(closure, method="SLSQP",
-                         x0=global_optimization_result.x,
-                         bounds=self.algorithm_data.bounds,
-                         constraints=self.algorithm_data.constrains,
-                         callback=self.local_iteration_callback,
-                         options={"maxiter": self.algorthm_settings.final_optimization_minimizer_maximum_iteration,
-                                  "ftol": 10**-self.algorthm_settings.final_optimization_minimizer_tolerance_level})
+                minimize(problem.objective, x0=global_optimization_result.x,
+                         **final_optimization_minimizer_kwargs)
             # judge if the final fitting succeed
             # see https://docs.scipy.org/doc/scipy/reference/generated/scipy.optimize.fmin_slsqp.html
             if final_optimization_result.success or final_optimization_result.status == 9:
@@ -238,6 +417,19 @@ class Resolver:
                 self.on_final_fitting_failed(final_optimization_result)
                 self.on_fitting_finished()
                 return
+        except EarlyStop as e:
+            # return the best solution so far
+            message = "The fitting was stopped early, reason: {0}.".format(e.reason.name)
+            if problem.best_params is None:
+                self.on_global_fitting_failed(OptimizeResult(
+                    x=np.array(self.initial_guess), success=False, status=-1,
+                    message=message + " There is no feasible solution yet."))
+            else:
+                self.on_fitting_succeeded(OptimizeResult(
+                    x=problem.best_params, fun=problem.best_objective,
+                    success=True, status=0, message=message,
+                    nfev=problem.evaluation_number, njev=problem.jacobian_evaluation_number))
+            self.on_fitting_finished()
         except Exception as e:
             self.on_exception_raised_while_fitting(e)
             self.on_fitting_finished()
@@ -0,0 +1,196 @@
+__all__ = ["get_record_dtype", "get_records", "get_histories", "ResultTable", "LazyFittingResult"]
+
+from typing import Dict, Iterable, List, Tuple, Union
+
+import numpy as np
+
+from QGrain.algorithms import AlgorithmData, DistributionType
+from QGrain.models.FittingResult import FittingResult, StopReason
+from QGrain.resolvers.HeadlessResolver import FittingTask
+
+
+def get_record_dtype(param_count: int) -> np.dtype:
+    """
+    Get the fixed-size record of one fitting, which is enough to rebuild the `FittingResult` with the sample.
+
+    `param_count` is the count of all fitted params, i.e. `len(algorithm_data.defaults)`.
+    """
+    return np.dtype([("index", np.int64),
+                     ("succeeded", np.bool_),
+                     ("from_cache", np.bool_),
+                     ("stop_reason", np.int8),
+                     ("x_offset", np.float64),
+                     ("mean_squared_error", np.float64),
+                     ("spent_time", np.float64),
+                     ("fitted_params", np.float64, (param_count,))])
+
+
+def get_records(indexes: Iterable[int], outputs: List[Tuple[bool, FittingTask, Union[FittingResult, Exception]]],
+                spent_times: Iterable[float], param_count: int) -> np.ndarray:
+    """
+    Convert the outputs of `HeadlessResolver` to the records, the fitting history is not kept.
+    """
+    records = np.zeros(len(outputs), dtype=get_record_dtype(param_count))
+    for record, index, (flag, _, result), spent_time in zip(records, indexes, outputs, spent_times):
+        record["index"] = index
+        record["spent_time"] = spent_time
+        if flag:
+            record["succeeded"] = True
+            record["from_cache"] = result.from_cache
+            record["stop_reason"] = result.stop_reason.value
+            record["x_offset"] = result.x_offset
+            record["mean_squared_error"] = result.mean_squared_error
+            record["fitted_params"] = result.fitted_params
+        else:
+            record["mean_squared_error"] = np.nan
+            record["fitted_params"] = np.nan
+    return records
+
+
+def get_histories(indexes: Iterable[int],
+                  outputs: List[Tuple[bool, FittingTask, Union[FittingResult, Exception]]]) -> Dict[int, np.ndarray]:
+    """
+    Get the fitting histories of the outputs which recorded them (see `AlgorithmSettings.history_capacity`).
+
+    The histories are optional and variable-sized, so they are not kept by the records.
+    """
+    histories = {}
+    for index, (flag, _, result) in zip(indexes, outputs):
+        # the cached results have no history
+        if flag and not result.from_cache and result.has_history:
+            histories[index] = result.fitting_history
+    return histories
+
+
+class ResultTable:
+    """
+    The preallocated records of the tasks of a batch, which are written by the outputs of workers.
+
+    The `FittingResult` of each task is only built when it is requested, see `get_result`.
+    The fitting histories are only kept for the tasks which recorded them.
+    """
+    def __init__(self, tasks: List[FittingTask]):
+        assert len(tasks) > 0
+        first = tasks[0]
+        self.__tasks = tasks
+        self.__algorithm_data = AlgorithmData.get_algorithm_data(first.distribution_type, first.component_number)
+        self.__records = np.zeros(len(tasks), dtype=get_record_dtype(len(self.__algorithm_data.defaults)))
+        # the rows which are not written
+        self.__records["index"] = -1
+        self.__histories = {} # type: Dict[int, np.ndarray]
+
+    @property
+    def tasks(self) -> List[FittingTask]:
+        return self.__tasks
+
+    @property
+    def algorithm_data(self) -> AlgorithmData:
+        return self.__algorithm_data
+
+    @property
+    def records(self) -> np.ndarray:
+        return self.__records
+
+    def __len__(self) -> int:
+        return len(self.__tasks)
+
+    def write(self, records: np.ndarray, histories: Dict[int, np.ndarray] = None):
+        if len(records) != 0:
+            self.__records[records["index"]] = records
+        if histories is not None:
+            self.__histories.update(histories)
+
+    def get_lazy_result(self, index: int) -> "LazyFittingResult":
+        return LazyFittingResult(self, index)
+
+    def get_result(self, index: int) -> FittingResult:
+        record = self.__records[index]
+        assert record["index"] == index and record["succeeded"]
+        sample = self.__tasks[index].sample
+        bin_numbers = np.arange(1, len(sample.classes)+1, dtype=np.float64)
+        result = FittingResult(sample.name, sample.classes,
+                               bin_numbers, bin_numbers,
+                               sample.distribution, self.__algorithm_data,
+                               record["fitted_params"], record["x_offset"].item(),
+                               fitting_history=self.__histories.get(index),
+                               stop_reason=StopReason(record["stop_reason"].item()))
+        if record["from_cache"]:
+            result = result.as_cached()
+        return result
+
+
+class LazyFittingResult:
+    """
+    The reference of one record of `ResultTable`, the `FittingResult` is built when `get` is called.
+
+    The frequently used values are available without building the result.
+    """
+    def __init__(self, table: ResultTable, index: int):
+        self.__table = table
+        self.__index = index
+
+    @property
+    def task(self) -> FittingTask:
+        return self.__table.tasks[self.__index]
+
+    @property
+    def name(self) -> str:
+        return self.task.sample.name
+
+    @property
+    def distribution_type(self) -> DistributionType:
+        return self.__table.algorithm_data.distribution_type
+
+    @property
+    def component_number(self) -> int:
+        return self.__table.algorithm_data.component_number
+
+    @property
+    def fitted_params(self) -> np.ndarray:
+        return self.__table.records[self.__index]["fitted_params"].copy()
+
+    @property
+    def mean_squared_error(self) -> float:
+        return self.__table.records[self.__index]["mean_squared_error"].item()
+
+    @property
+    def stop_reason(self) -> StopReason:
+        return StopReason(self.__table.records[self.__index]["stop_reason"].item())
+
+    @property
+    def from_cache(self) -> bool:
+        return bool(self.__table.records[self.__index]["from_cache"])
+
+    @property
+    def spent_time(self) -> float:
+        return self.__table.records[self.__index]["spent_time"].item()
+
+    def get(self) -> FittingResult:
+        return self.__table.get_result(self.__index)
+
+
+if __name__ == "__main__":
+    # compare the pickled size of the results and the records
+    import pickle
+    import time
+
+    from QGrain.benchmarking import get_ordered_samples
+    from QGrain.resolvers.HeadlessResolver import HeadlessResolver
+    from QGrain.resolvers.ResultTable import ResultTable, get_records
+
+    distribution_type, component_number = DistributionType.GeneralWeibull, 3
+    data = AlgorithmData.get_algorithm_data(distribution_type, component_number)
+    tasks = [FittingTask(sample, distribution_type, component_number)
+             for sample in get_ordered_samples(distribution_type, component_number, 20)]
+    outputs = HeadlessResolver().execute_segment(tasks, warm_start=False)
+    results_size = len(pickle.dumps([result for _, _, result in outputs]))
+    records = get_records(range(len(tasks)), outputs, np.zeros(len(tasks)), len(data.defaults))
+    records_size = len(pickle.dumps(records))
+    print("Pickled size per task, results: {0:.0f} bytes, records: {1:.0f} bytes".format(
+        results_size / len(tasks), records_size / len(tasks)))
+    table = ResultTable(tasks)
+    table.write(records)
+    start = time.perf_counter()
+    for i in range(len(tasks)):
+        table.get_result(i)
+    print("Building one result lazily: {0:.2f} ms".format((time.perf_counter()-start) / len(tasks) * 1000))
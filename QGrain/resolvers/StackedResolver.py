@@ -0,0 +1,213 @@
+__all__ = ["StackedResolver"]
+
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from QGrain.algorithms import AlgorithmData, DistributionType
+from QGrain.models.AlgorithmSettings import AlgorithmSettings
+from QGrain.models.FittingResult import FittingResult
+from QGrain.models.SampleData import SampleData
+from QGrain.resolvers.DatasetPreprocessor import (DatasetPreprocessor,
+                                                  get_x_offsets)
+
+
+class StackedResolver:
+    """
+    The resolver to fit a block of samples at once.
+
+    All samples of a dataset share the same grain size classes, so the residuals of K samples can be
+    calculated by one batched evaluation of the mixed function. The local refinement is a batched
+    Levenberg-Marquardt method, each sample has its own damping factor and converges on its own.
+
+    Attributes:
+        distribution_type: The base distribution of components.
+        component_number: The component number of each sample.
+        algorithm_settings: The `AlgorithmSettings`, the tolerance level and maximum iteration of
+            the minimizer of global optimization are used as the termination conditions.
+        block_size: The number of samples which are fitted at once.
+    """
+    INITIAL_DAMPING = 1e-3
+    MAXIMUM_DAMPING = 1e10
+    def __init__(self, distribution_type: DistributionType = DistributionType.GeneralWeibull,
+                 component_number: int = 3,
+                 algorithm_settings: AlgorithmSettings = None,
+                 block_size: int = 256):
+        assert isinstance(block_size, int)
+        assert block_size > 0
+        self.algorithm_data = AlgorithmData.get_algorithm_data(distribution_type, component_number)
+        self.algorithm_settings = AlgorithmSettings() if algorithm_settings is None else algorithm_settings
+        self.block_size = block_size
+        lower, upper = zip(*self.algorithm_data.bounds)
+        self.lower_bounds = np.array([-np.inf if bound is None else bound for bound in lower], dtype=np.float64)
+        self.upper_bounds = np.array([np.inf if bound is None else bound for bound in upper], dtype=np.float64)
+
+    @property
+    def distribution_type(self) -> DistributionType:
+        return self.algorithm_data.distribution_type
+
+    @property
+    def component_number(self) -> int:
+        return self.algorithm_data.component_number
+
+    def get_x_offsets(self, start_indexes: np.ndarray) -> np.ndarray:
+        # keep the same preprocessing as `Resolver.preprocess_data`
+        return get_x_offsets(self.distribution_type, start_indexes)
+
+    def get_initial_guesses(self, fitting_space_x: np.ndarray, target_y: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """
+        Use the quantiles of each distribution as the mean values of components,
+        and convert them to params by `AlgorithmData.get_param_by_mean`.
+        """
+        component_number = self.component_number
+        cumulative = np.cumsum(target_y * weights, axis=1)
+        # the empty samples get the quantiles of zero cumulative values instead of NaN
+        cumulative /= np.maximum(cumulative[:, -1:], 1e-300)
+        quantiles = (np.arange(component_number) + 0.5) / component_number
+        # the positions of quantiles at the x axis of each sample
+        indexes = np.array([np.searchsorted(row, quantiles) for row in cumulative])
+        indexes = np.clip(indexes, 0, fitting_space_x.shape[1]-1)
+        mean_values = np.take_along_axis(fitting_space_x, indexes, axis=1)
+        return np.array([self.algorithm_data.get_param_by_mean(values) for values in mean_values])
+
+    def project(self, params_matrix: np.ndarray) -> np.ndarray:
+        # make sure the params are inside the bounds and the sum of fractions is not greater than 1
+        np.clip(params_matrix, self.lower_bounds, self.upper_bounds, out=params_matrix)
+        if self.component_number > 1:
+            fractions = params_matrix[:, 1-self.component_number:]
+            sum_of_fractions = np.sum(fractions, axis=1, keepdims=True)
+            np.divide(fractions, np.maximum(sum_of_fractions, 1.0), out=fractions)
+        return params_matrix
+
+    @staticmethod
+    def solve_steps(damped_hessian: np.ndarray, negative_gradient: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Solve the damped normal equations of K samples.
+
+        Returns:
+            The steps with shape (K, N) and the flags (K,) of the samples whose systems were solved.
+            The steps of the singular systems are zeros.
+        """
+        try:
+            steps = np.linalg.solve(damped_hessian, negative_gradient[:, :, np.newaxis])[:, :, 0]
+            return steps, np.ones(len(steps), dtype=bool)
+        except np.linalg.LinAlgError:
+            # one singular system should not abort the other samples of the block
+            steps = np.zeros_like(negative_gradient)
+            solved = np.ones(len(steps), dtype=bool)
+            for i, (hessian, gradient) in enumerate(zip(damped_hessian, negative_gradient)):
+                try:
+                    steps[i] = np.linalg.solve(hessian, gradient)
+                except np.linalg.LinAlgError:
+                    solved[i] = False
+            return steps, solved
+
+    def get_costs(self, fitting_space_x: np.ndarray, target_y: np.ndarray,
+                  weights: np.ndarray, params_matrix: np.ndarray) -> np.ndarray:
+        values = self.algorithm_data.evaluate_batch(fitting_space_x, params_matrix)
+        return np.sum(np.square((values - target_y) * weights), axis=1)
+
+    def refine(self, fitting_space_x: np.ndarray, target_y: np.ndarray,
+               weights: np.ndarray, initial_guesses: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Refine the params of K samples by the batched Levenberg-Marquardt method.
+
+        Args:
+            fitting_space_x: The x values of each sample with shape (K, M).
+            target_y: The distributions with shape (K, M).
+            weights: 1 inside the valid data range of each sample and 0 outside, shape (K, M).
+            initial_guesses: The initial params with shape (K, N).
+
+        Returns:
+            The fitted params (K, N), the sums of squared residual errors (K,) and the convergence flags (K,).
+            The samples whose normal equations became singular are stopped and not converged.
+        """
+        tolerance = 10**-self.algorithm_settings.global_optimization_minimizer_tolerance_level
+        maximum_iteration = self.algorithm_settings.global_optimization_minimizer_maximum_iteration
+        params_matrix = self.project(np.array(initial_guesses, dtype=np.float64))
+        sample_number, param_number = params_matrix.shape
+        costs = self.get_costs(fitting_space_x, target_y, weights, params_matrix)
+        damping = np.full(sample_number, self.INITIAL_DAMPING)
+        converged = np.zeros(sample_number, dtype=bool)
+        failed = np.zeros(sample_number, dtype=bool)
+        for _ in range(maximum_iteration):
+            active = np.flatnonzero(~np.logical_or(converged, failed))
+            if len(active) == 0:
+                break
+            x, y, w = fitting_space_x[active], target_y[active], weights[active]
+            values, jacobian = self.algorithm_data.evaluate_jacobian_batch(x, params_matrix[active])
+            jacobian *= w[:, np.newaxis, :]
+            residuals = (values - y) * w
+            # the normal equations of Gauss-Newton method, (K, N, N) and (K, N)
+            approximate_hessian = jacobian @ np.transpose(jacobian, (0, 2, 1))
+            gradient = np.einsum("knm,km->kn", jacobian, residuals)
+            diagonal = np.diagonal(approximate_hessian, axis1=1, axis2=2)
+            # avoid the singular matrix while some params have no effect (e.g. the fraction is 0)
+            diagonal = diagonal + np.max(diagonal, axis=1, keepdims=True)*1e-12 + 1e-300
+            damped_hessian = approximate_hessian.copy()
+            indexes = np.arange(param_number)
+            damped_hessian[:, indexes, indexes] += damping[active, np.newaxis] * diagonal
+            steps, solved = self.solve_steps(damped_hessian, -gradient)
+            failed[active[~solved]] = True
+            candidates = self.project(params_matrix[active] + steps)
+            # the too long steps may overflow, their costs are infinite or NaN and they are rejected
+            with np.errstate(over="ignore", invalid="ignore"):
+                candidate_costs = self.get_costs(x, y, w, candidates)
+            accepted = np.logical_and(solved, candidate_costs < costs[active])
+            improvement = np.where(accepted, costs[active] - candidate_costs, 0.0)
+            accepted_indexes = active[accepted]
+            params_matrix[accepted_indexes] = candidates[accepted]
+            costs[accepted_indexes] = candidate_costs[accepted]
+            damping[active] = np.where(accepted, damping[active]/10, damping[active]*10)
+            # each sample converges on its own
+            converged[active] = np.logical_and(solved, np.logical_or(
+                np.logical_and(accepted, improvement <= tolerance * costs[active]),
+                damping[active] > self.MAXIMUM_DAMPING))
+        return params_matrix, costs, converged
+
+    def fit(self, samples: Iterable[SampleData], initial_guesses: np.ndarray = None) -> List[Tuple[bool, FittingResult]]:
+        """
+        Fit the samples block by block.
+
+        Args:
+            samples: The samples which have the same grain size classes.
+            initial_guesses: Optional, the initial params of each sample with shape (K, N).
+
+        Returns:
+            A list of `(converged, fitting_result)` in the same order as `samples`.
+        """
+        samples = list(samples)
+        if len(samples) == 0:
+            return []
+        classes = samples[0].classes
+        for sample in samples:
+            assert np.all(np.equal(sample.classes, classes))
+        results = []
+        for block_start in range(0, len(samples), self.block_size):
+            block = samples[block_start: block_start+self.block_size]
+            block_guesses = None if initial_guesses is None else \
+                np.asarray(initial_guesses)[block_start: block_start+self.block_size]
+            results.extend(self.fit_block(block, block_guesses))
+        return results
+
+    def fit_block(self, samples: List[SampleData], initial_guesses: np.ndarray = None) -> List[Tuple[bool, FittingResult]]:
+        classes = samples[0].classes
+        class_number = len(classes)
+        target_y = np.array([sample.distribution for sample in samples], dtype=np.float64)
+        preprocessor = DatasetPreprocessor(self.distribution_type, target_y)
+        class_indexes = np.arange(class_number)
+        weights = np.logical_and(class_indexes >= preprocessor.start_indexes[:, np.newaxis],
+                                 class_indexes < preprocessor.end_indexes[:, np.newaxis]).astype(np.float64)
+        bin_numbers = preprocessor.bin_numbers
+        x_offsets = preprocessor.x_offsets
+        fitting_space_x = bin_numbers - x_offsets[:, np.newaxis]
+        if initial_guesses is None:
+            initial_guesses = self.get_initial_guesses(fitting_space_x, target_y, weights)
+        params_matrix, _, converged = self.refine(fitting_space_x, target_y, weights, initial_guesses)
+        results = []
+        for sample, params, x_offset, flag in zip(samples, params_matrix, x_offsets, converged):
+            result = FittingResult(sample.name, sample.classes, bin_numbers, bin_numbers,
+                                   sample.distribution, self.algorithm_data,
+                                   params, x_offset.item())
+            results.append((bool(flag), result))
+        return results
@@ -0,0 +1,232 @@
+__all__ = ["BatchPayload", "TaskBatch", "split_batches", "load_payload"]
+
+import pickle
+import sys
+from collections import OrderedDict
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterable, List, Tuple
+from uuid import UUID, uuid4
+
+import numpy as np
+
+from QGrain.algorithms import DistributionType
+from QGrain.models.AlgorithmSettings import AlgorithmSettings
+from QGrain.models.SampleData import SampleData
+from QGrain.resolvers.HeadlessResolver import FittingTask
+
+
+class BatchPayload:
+    """
+    The data shared by all tasks of a batch, which is sent to each worker only once.
+
+    Each task of the batch is reduced to its index, see `get_task`.
+    """
+    def __init__(self, uuid: UUID, classes: np.ndarray, distributions: np.ndarray,
+                 distribution_type: DistributionType, component_number: int,
+                 algorithm_settings: AlgorithmSettings,
+                 names: List[str], seeds: List[int] = None):
+        self.__uuid = uuid
+        self.__classes = classes
+        self.__distributions = distributions
+        self.__distribution_type = distribution_type
+        self.__component_number = component_number
+        self.__algorithm_settings = algorithm_settings
+        self.__names = names
+        self.__seeds = seeds
+
+    @property
+    def uuid(self) -> UUID:
+        return self.__uuid
+
+    @property
+    def classes(self) -> np.ndarray:
+        return self.__classes
+
+    @property
+    def distributions(self) -> np.ndarray:
+        return self.__distributions
+
+    @property
+    def distribution_type(self) -> DistributionType:
+        return self.__distribution_type
+
+    @property
+    def component_number(self) -> int:
+        return self.__component_number
+
+    @property
+    def algorithm_settings(self) -> AlgorithmSettings:
+        return self.__algorithm_settings
+
+    def get_task(self, index: int, algorithm_settings: AlgorithmSettings = None) -> FittingTask:
+        # copy the row, so that the results and resolvers never refer to the shared memory
+        sample = SampleData(self.__names[index], self.__classes, np.array(self.__distributions[index]))
+        seed = None if self.__seeds is None else self.__seeds[index]
+        # the settings of batch can be overridden, e.g. to disable the history
+        if algorithm_settings is None:
+            algorithm_settings = self.__algorithm_settings
+        return FittingTask(sample, self.__distribution_type, self.__component_number,
+                           algorithm_settings, seed=seed)
+
+
+class TaskBatch:
+    """
+    The tasks which share the same classes, distribution type, component number and algorithm settings.
+
+    The distributions matrix of the batch, followed by the other pickled data of the payload,
+    is put into a shared memory block (see `share`). The workers attach a zero-copy view of the
+    matrix (see `load_payload`), so the chunks of tasks (see `get_chunk`) only carry the reference
+    of the block and the row indexes.
+    """
+    def __init__(self, tasks: List[FittingTask]):
+        assert len(tasks) > 0
+        self.__uuid = uuid4()
+        self.__tasks = tasks
+        self.__memory = None # type: SharedMemory
+        self.__reference = None # type: Tuple[UUID, str, int, int, int]
+
+    @property
+    def tasks(self) -> List[FittingTask]:
+        return self.__tasks
+
+    def __len__(self) -> int:
+        return len(self.__tasks)
+
+    def share(self) -> Tuple[UUID, str, int, int, int]:
+        """
+        Put the payload into a shared memory block, and return the reference of it,
+        i.e. the uuid of batch, the name of block, the shape of matrix and the size of the pickled data.
+        """
+        if self.__reference is None:
+            first = self.__tasks[0]
+            seeds = [task.seed for task in self.__tasks]
+            data = pickle.dumps((
+                np.asarray(first.sample.classes, dtype=np.float64),
+                first.distribution_type, first.component_number,
+                first.algorithm_settings,
+                [task.sample.name for task in self.__tasks],
+                None if all(seed is None for seed in seeds) else seeds),
+                protocol=pickle.HIGHEST_PROTOCOL)
+            sample_number, class_number = len(self.__tasks), len(first.sample.classes)
+            matrix_size = sample_number * class_number * 8
+            self.__memory = SharedMemory(create=True, size=matrix_size+len(data))
+            distributions = np.ndarray((sample_number, class_number), dtype=np.float64, buffer=self.__memory.buf)
+            for i, task in enumerate(self.__tasks):
+                distributions[i] = task.sample.distribution
+            # release the view before the block may be closed
+            del distributions
+            self.__memory.buf[matrix_size:matrix_size+len(data)] = data
+            self.__reference = (self.__uuid, self.__memory.name, sample_number, class_number, len(data))
+        return self.__reference
+
+    def release(self):
+        if self.__memory is not None:
+            self.__memory.close()
+            self.__memory.unlink()
+            self.__memory = None
+            self.__reference = None
+
+    def get_chunk(self, indexes: Iterable[int]) -> Tuple[Tuple[UUID, str, int, int, int], np.ndarray]:
+        """
+        Get the arguments of `run_chunk`, i.e. the reference of payload and the row indexes of tasks.
+        """
+        return self.share(), np.asarray(indexes, dtype=np.int64)
+
+
+def split_batches(tasks: Iterable[FittingTask]) -> List[TaskBatch]:
+    """
+    Group the tasks into batches and keep their order in each batch.
+    """
+    # the samples of a dataset usually share the same classes object,
+    # but each task may have its own settings object, e.g. `FittingTask` creates the default one
+    classes_keys = {}
+    settings_keys = {}
+    groups = {}
+    for task in tasks:
+        classes = task.sample.classes
+        classes_key = classes_keys.get(id(classes))
+        if classes_key is None:
+            classes_key = np.asarray(classes, dtype=np.float64).tobytes()
+            classes_keys[id(classes)] = classes_key
+        settings = task.algorithm_settings
+        settings_key = settings_keys.get(id(settings))
+        if settings_key is None:
+            settings_key = tuple(sorted(settings.to_dict().items()))
+            settings_keys[id(settings)] = settings_key
+        key = (classes_key, task.distribution_type, task.component_number, settings_key)
+        if key in groups:
+            groups[key].append(task)
+        else:
+            groups[key] = [task]
+    return [TaskBatch(group) for group in groups.values()]
+
+
+# the payloads which were loaded by this process, and their attached memory blocks
+_loaded_payloads = OrderedDict() # type: OrderedDict[UUID, Tuple[BatchPayload, SharedMemory]]
+MAXIMUM_LOADED_PAYLOAD_NUMBER = 4
+
+def attach_memory(name: str) -> SharedMemory:
+    # the block is owned (i.e. unlinked) by the main process, a worker with its own resource tracker
+    # would warn the leaked blocks at shutdown, or unlink the live ones when it exits,
+    # so the workers share the tracker of main process (see `MultiProcessingResolver.get_pool`),
+    # which only counts the registration of the same block once
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=name, track=False)
+    return SharedMemory(name=name)
+
+def load_payload(reference: Tuple[UUID, str, int, int, int]) -> BatchPayload:
+    uuid, name, sample_number, class_number, data_size = reference
+    loaded = _loaded_payloads.get(uuid)
+    if loaded is not None:
+        _loaded_payloads.move_to_end(uuid)
+        return loaded[0]
+    memory = attach_memory(name)
+    matrix_size = sample_number * class_number * 8
+    distributions = np.ndarray((sample_number, class_number), dtype=np.float64, buffer=memory.buf)
+    data = memory.buf[matrix_size:matrix_size+data_size]
+    try:
+        classes, distribution_type, component_number, algorithm_settings, names, seeds = pickle.loads(data)
+    finally:
+        data.release()
+    payload = BatchPayload(uuid, classes, distributions,
+                           distribution_type, component_number,
+                           algorithm_settings, names, seeds)
+    _loaded_payloads[uuid] = (payload, memory)
+    while len(_loaded_payloads) > MAXIMUM_LOADED_PAYLOAD_NUMBER:
+        _, (payload_to_remove, memory_to_remove) = _loaded_payloads.popitem(last=False)
+        # the view of matrix must be released before closing
+        del payload_to_remove
+        try:
+            memory_to_remove.close()
+        except BufferError:
+            # still referred by others, it will be closed by the garbage collector
+            pass
+    return payload
+
+
+if __name__ == "__main__":
+    # compare the serialization of the tasks one by one and by chunks
+    import time
+
+    from QGrain.resolvers.TaskBatch import split_batches
+
+    sample_number, chunk_size = 100000, 64
+    classes = np.logspace(0, 3, 101)
+    random_state = np.random.RandomState(42)
+    settings = AlgorithmSettings()
+    tasks = [FittingTask(SampleData("Sample_{0}".format(i), classes, random_state.uniform(size=len(classes))),
+                         DistributionType.GeneralWeibull, 3, settings) for i in range(sample_number)]
+    start = time.perf_counter()
+    total_size = sum(len(pickle.dumps(([task],))) for task in tasks)
+    print("One by one: {0:.2f} s, {1:.1f} MB".format(time.perf_counter()-start, total_size / 1024**2))
+    batch, = split_batches(tasks)
+    start = time.perf_counter()
+    batch.share()
+    print("Sharing the batch: {0:.2f} s".format(time.perf_counter()-start))
+    start = time.perf_counter()
+    total_size = 0
+    for chunk_start in range(0, sample_number, chunk_size):
+        total_size += len(pickle.dumps(batch.get_chunk(range(chunk_start, min(chunk_start+chunk_size, sample_number)))))
+    print("By chunks of {0}: {1:.2f} s, {2:.1f} MB".format(
+        chunk_size, time.perf_counter()-start, total_size / 1024**2))
+    batch.release()
@@ -0,0 +1,226 @@
+__all__ = ["SchedulingPolicy", "TaskCostModel", "ChunkScheduler"]
+
+import heapq
+from collections import deque
+from enum import Enum, unique
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from QGrain.algorithms import DistributionType, get_param_count
+
+
+@unique
+class SchedulingPolicy(Enum):
+    # the order of generation
+    InOrder = 0
+    # the most expensive chunks are dispatched first, to shorten the tail of the batch
+    LongestFirst = 1
+
+
+class TaskCostModel:
+    """
+    Estimate the spent time of fitting tasks by their configurations (i.e. the distribution type
+    and component number) and the lengths of valid data ranges.
+
+    The cost of one task is regarded as proportional to the length of its valid range,
+    and the rate of each configuration is learned from the observed runtimes (see `observe`).
+    Before a configuration is observed, its rate is guessed by the square of param count,
+    which is scaled to the observed configurations if any.
+    """
+    DISTRIBUTION_WEIGHTS = {DistributionType.Normal: 1.0,
+                            DistributionType.Weibull: 1.0,
+                            DistributionType.GeneralWeibull: 2.0}
+
+    def __init__(self):
+        # the total spent time and the total valid length of each configuration
+        self.__observations = {} # type: Dict[Tuple[DistributionType, int], Tuple[float, float]]
+
+    @staticmethod
+    def get_prior_rate(distribution_type: DistributionType, component_number: int) -> float:
+        param_count = get_param_count(distribution_type) * component_number + component_number - 1
+        return TaskCostModel.DISTRIBUTION_WEIGHTS[distribution_type] * param_count**2
+
+    def get_rate(self, distribution_type: DistributionType, component_number: int) -> float:
+        """
+        Get the estimated spent time per class of valid range.
+        """
+        observation = self.__observations.get((distribution_type, component_number))
+        if observation is not None:
+            spent_time, valid_length = observation
+            return spent_time / valid_length
+        rate = self.get_prior_rate(distribution_type, component_number)
+        if len(self.__observations) == 0:
+            return rate
+        observed_time = sum(spent_time for spent_time, _ in self.__observations.values())
+        expected_time = sum(self.get_prior_rate(*key) * valid_length
+                            for key, (_, valid_length) in self.__observations.items())
+        return rate * observed_time / expected_time
+
+    def estimate(self, distribution_type: DistributionType, component_number: int,
+                 valid_lengths: Iterable[int]) -> np.ndarray:
+        return np.asarray(valid_lengths, dtype=np.float64) * self.get_rate(distribution_type, component_number)
+
+    def observe(self, distribution_type: DistributionType, component_number: int,
+                valid_lengths: Iterable[int], spent_times: Iterable[float]):
+        valid_length = float(np.sum(valid_lengths))
+        spent_time = float(np.sum(spent_times))
+        # the cached results spent nearly no time, they should not be observed
+        if valid_length <= 0.0 or spent_time <= 0.0:
+            return
+        key = (distribution_type, component_number)
+        total_time, total_length = self.__observations.get(key, (0.0, 0.0))
+        self.__observations[key] = (total_time + spent_time, total_length + valid_length)
+
+
+class ChunkScheduler:
+    """
+    Split the batches of tasks into chunks, and decide the order to dispatch them.
+
+    The chunks are selected one by one (see `pop`), so that the costs observed by
+    the finished chunks are used to select the rest.
+
+    The batches of one configuration share the same rate, so their head chunks are ordered
+    by the valid lengths only, and kept in a heap of that configuration. The rates are only
+    compared between the heads of the heaps, so the observed costs never re-key the heaps.
+    """
+    def __init__(self, policy: SchedulingPolicy, cost_model: TaskCostModel):
+        assert isinstance(policy, SchedulingPolicy)
+        self.__policy = policy
+        self.__cost_model = cost_model
+        # the item, valid lengths and the chunks (i.e. the indexes of tasks) of each batch,
+        # the exhausted batches are removed
+        self.__batches = deque() # type: deque[Tuple[Any, np.ndarray, deque]]
+        # the negative valid length of the head chunk, the order of adding and the batch, of each configuration
+        self.__heaps = {} # type: Dict[Tuple[DistributionType, int], List[Tuple[float, int, Tuple[Any, np.ndarray, deque]]]]
+        self.__added_batch_number = 0
+        self.__rest_chunk_number = 0
+
+    @property
+    def policy(self) -> SchedulingPolicy:
+        return self.__policy
+
+    def __len__(self) -> int:
+        return self.__rest_chunk_number
+
+    def add_batch(self, item: Any, distribution_type: DistributionType, component_number: int,
+                  valid_lengths: np.ndarray, chunk_size: int, keep_order: bool = False):
+        """
+        Add the tasks of one batch, which share the same configuration.
+
+        `item` is returned with the indexes of tasks by `pop`, and `keep_order` is
+        required by the warm-started segments.
+        """
+        assert chunk_size > 0
+        valid_lengths = np.asarray(valid_lengths)
+        if keep_order or self.__policy == SchedulingPolicy.InOrder:
+            order = np.arange(len(valid_lengths))
+        elif self.__policy == SchedulingPolicy.LongestFirst:
+            # the costs of the tasks of one batch are ordered by their valid lengths
+            order = np.argsort(-valid_lengths, kind="stable")
+        else:
+            raise NotImplementedError(self.__policy)
+        chunks = deque(order[start: start+chunk_size] for start in range(0, len(order), chunk_size))
+        if len(chunks) == 0:
+            return
+        batch = (item, valid_lengths, chunks)
+        if self.__policy == SchedulingPolicy.InOrder:
+            self.__batches.append(batch)
+        else:
+            heap = self.__heaps.setdefault((distribution_type, component_number), [])
+            self.__push(heap, self.__added_batch_number, batch)
+        self.__added_batch_number += 1
+        self.__rest_chunk_number += len(chunks)
+
+    @staticmethod
+    def __push(heap: list, order: int, batch: Tuple[Any, np.ndarray, deque]):
+        _, valid_lengths, chunks = batch
+        heapq.heappush(heap, (-float(np.sum(valid_lengths[chunks[0]])), order, batch))
+
+    def pop(self) -> Tuple[Any, np.ndarray]:
+        assert self.__rest_chunk_number > 0
+        if self.__policy == SchedulingPolicy.InOrder:
+            item, _, chunks = self.__batches[0]
+            indexes = chunks.popleft()
+            if len(chunks) == 0:
+                self.__batches.popleft()
+        elif self.__policy == SchedulingPolicy.LongestFirst:
+            # the head chunk of each batch is the most expensive one of it, except the warm-started segments,
+            # and the earlier batch is selected if the estimates are equal
+            def get_priority(configuration: Tuple[DistributionType, int]):
+                negative_length, order, _ = self.__heaps[configuration][0]
+                return -negative_length * self.__cost_model.get_rate(*configuration), -order
+            configuration = max(self.__heaps, key=get_priority)
+            heap = self.__heaps[configuration]
+            _, order, batch = heapq.heappop(heap)
+            item, _, chunks = batch
+            indexes = chunks.popleft()
+            if len(chunks) != 0:
+                self.__push(heap, order, batch)
+            elif len(heap) == 0:
+                del self.__heaps[configuration]
+        else:
+            raise NotImplementedError(self.__policy)
+        self.__rest_chunk_number -= 1
+        return item, indexes
+
+
+if __name__ == "__main__":
+    # measure the costs of a mixed batch, then simulate the makespans of the policies on N workers
+    # (the pool keeps `2 * N` chunks pending, and the costs are learned while the chunks finish)
+    import heapq
+    import time
+
+    from QGrain.benchmarking import get_random_samples
+    from QGrain.resolvers.DatasetPreprocessor import get_valid_data_ranges
+    from QGrain.resolvers.HeadlessResolver import FittingTask, HeadlessResolver
+    from QGrain.resolvers.TaskScheduler import (ChunkScheduler, SchedulingPolicy,
+                                                TaskCostModel)
+
+    sample_number, component_numbers, chunk_size = 48, (1, 2, 3, 4), 4
+    random_state = np.random.RandomState(42)
+    samples = get_random_samples(DistributionType.GeneralWeibull, 3, sample_number, random_state=random_state)
+    for sample in samples:
+        # the fine and coarse tails are trimmed differently
+        sample.distribution[sample.distribution < random_state.uniform(1e-5, 1e-3)] = 0.0
+    start_indexes, end_indexes = get_valid_data_ranges(np.array([sample.distribution for sample in samples]))
+    valid_lengths = end_indexes - start_indexes
+    # the order of `TaskWindow`, i.e. sample x component number
+    tasks = [FittingTask(sample, DistributionType.GeneralWeibull, component_number)
+             for sample in samples for component_number in component_numbers]
+    resolver = HeadlessResolver()
+    costs = {component_number: np.zeros(sample_number) for component_number in component_numbers}
+    for i, task in enumerate(tasks):
+        start = time.perf_counter()
+        resolver.execute_task(task)
+        costs[task.component_number][i // len(component_numbers)] = time.perf_counter() - start
+    total_cost = sum(np.sum(values) for values in costs.values())
+    print("{0} tasks, total cost: {1:.1f} s".format(len(tasks), total_cost))
+
+    def simulate(policy: SchedulingPolicy, worker_number: int) -> float:
+        cost_model = TaskCostModel()
+        scheduler = ChunkScheduler(policy, cost_model)
+        for component_number in component_numbers:
+            scheduler.add_batch(component_number, DistributionType.GeneralWeibull, component_number,
+                                valid_lengths, chunk_size)
+        waiting, running = [], [] # the chunks which are queued by the pool, and the finish times of running ones
+        now = 0.0
+        while True:
+            while len(scheduler) > 0 and len(waiting) + len(running) < 2 * worker_number:
+                waiting.append(scheduler.pop())
+            while len(waiting) > 0 and len(running) < worker_number:
+                component_number, indexes = waiting.pop(0)
+                heapq.heappush(running, (now + np.sum(costs[component_number][indexes]), id(indexes),
+                                         component_number, indexes))
+            if len(running) == 0:
+                return now
+            now, _, component_number, indexes = heapq.heappop(running)
+            cost_model.observe(DistributionType.GeneralWeibull, component_number,
+                               valid_lengths[indexes], costs[component_number][indexes])
+
+    for worker_number in (4, 16, 64):
+        lower_bound = max(total_cost / worker_number, max(np.max(values) for values in costs.values()))
+        in_order = simulate(SchedulingPolicy.InOrder, worker_number)
+        longest_first = simulate(SchedulingPolicy.LongestFirst, worker_number)
+        print("{0} workers, makespan of in order: {1:.2f} s, longest first: {2:.2f} s ({3:.0%} shorter), lower bound: {4:.2f} s".format(
+            worker_number, in_order, longest_first, 1 - longest_first / in_order, lower_bound))
@@ -4,9 +4,11 @@ import logging
 import os
 
 from PySide2.QtCore import QSettings, Qt, Signal
-from PySide2.QtWidgets import (QDoubleSpinBox, QFrame, QGridLayout, QLabel,
-                               QMessageBox, QSpinBox, QWidget)
+from PySide2.QtWidgets import (QComboBox, QDoubleSpinBox, QFrame, QGridLayout,
+                               QLabel, QMessageBox, QSpinBox, QWidget)
 
+from QGrain.algorithms import GlobalOptimizer, LocalMinimizer
+from QGrain.initializers import InitialGuessMethod
 from QGrain.models.AlgorithmSettings import AlgorithmSettings
 
 
@@ -83,6 +85,69 @@ class AlgorithmSettingWidget(QWidget):
         self.final_optimization_minimizer_maximum_iteration_input.setValue(1000)
         self.main_layout.addWidget(self.final_optimization_minimizer_maximum_iteration_input, 6, 1)
 
+        self.initial_guess_method_label = QLabel(self.tr("Initial Guess"))
+        self.initial_guess_method_label.setToolTip(self.tr("The method to get the initial guess of params.\nDefaults: use the fixed default params.\nPeaks: convert the peaks and shoulders of the distribution to params, it starts the searching near the answer."))
+        self.main_layout.addWidget(self.initial_guess_method_label, 7, 0)
+        self.initial_guess_method_combo_box = QComboBox()
+        self.initial_guess_method_options = {self.tr("Defaults"): InitialGuessMethod.Defaults,
+                                             self.tr("Peaks"): InitialGuessMethod.Peaks}
+        self.initial_guess_method_combo_box.addItems(self.initial_guess_method_options.keys())
+        self.initial_guess_method_combo_box.setCurrentIndex(0)
+        self.main_layout.addWidget(self.initial_guess_method_combo_box, 7, 1)
+
+        self.time_budget_label = QLabel(self.tr("Time Budget (s)"))
+        self.time_budget_label.setToolTip(self.tr("The maximum time of fitting each sample, the best solution so far will be returned when it is reached.\n0 means no limit."))
+        self.main_layout.addWidget(self.time_budget_label, 8, 0)
+        self.time_budget_input = QDoubleSpinBox()
+        self.time_budget_input.setRange(0.0, 3600.0)
+        self.time_budget_input.setValue(0.0)
+        self.main_layout.addWidget(self.time_budget_input, 8, 1)
+
+        self.target_objective_level_label = QLabel(self.tr("Target Objective Level"))
+        self.target_objective_level_label.setToolTip(self.tr("The fitting will stop when the objective function reaches 10 ^ -level.\n0 means disabled."))
+        self.main_layout.addWidget(self.target_objective_level_label, 9, 0)
+        self.target_objective_level_input = QSpinBox()
+        self.target_objective_level_input.setRange(0, 100)
+        self.target_objective_level_input.setValue(0)
+        self.main_layout.addWidget(self.target_objective_level_input, 9, 1)
+
+        self.plateau_iteration_label = QLabel(self.tr("Plateau Iteration"))
+        self.plateau_iteration_label.setToolTip(self.tr("The global optimization will stop when the best local optimal value has not been improved in these iterations.\n0 means disabled."))
+        self.main_layout.addWidget(self.plateau_iteration_label, 10, 0)
+        self.plateau_iteration_input = QSpinBox()
+        self.plateau_iteration_input.setRange(0, 10000)
+        self.plateau_iteration_input.setValue(0)
+        self.main_layout.addWidget(self.plateau_iteration_input, 10, 1)
+
+        self.global_optimizer_label = QLabel(self.tr("Global Optimizer"))
+        self.global_optimizer_label.setToolTip(self.tr("The algorithm of global optimization.\nBasin Hopping: random perturbation and local minimization.\nMulti-Start: local minimization from several Latin-hypercube starting points.\nDifferential Evolution: the whole population is evaluated at once in each generation."))
+        self.main_layout.addWidget(self.global_optimizer_label, 11, 0)
+        self.global_optimizer_combo_box = QComboBox()
+        self.global_optimizer_options = {self.tr("Basin Hopping"): GlobalOptimizer.BasinHopping,
+                                         self.tr("Multi-Start"): GlobalOptimizer.MultiStart,
+                                         self.tr("Differential Evolution"): GlobalOptimizer.DifferentialEvolution}
+        self.global_optimizer_combo_box.addItems(self.global_optimizer_options.keys())
+        self.global_optimizer_combo_box.setCurrentIndex(0)
+        self.main_layout.addWidget(self.global_optimizer_combo_box, 11, 1)
+
+        self.local_minimizer_label = QLabel(self.tr("Local Minimizer"))
+        self.local_minimizer_label.setToolTip(self.tr("The algorithm of local minimization.\nSLSQP: with the bounds and the constraint of fractions.\nL-BFGS-B: the params are transformed to be unconstrained (log and softmax), which is usually faster."))
+        self.main_layout.addWidget(self.local_minimizer_label, 12, 0)
+        self.local_minimizer_combo_box = QComboBox()
+        self.local_minimizer_options = {self.tr("SLSQP"): LocalMinimizer.SLSQP,
+                                        self.tr("L-BFGS-B"): LocalMinimizer.LBFGSB}
+        self.local_minimizer_combo_box.addItems(self.local_minimizer_options.keys())
+        self.local_minimizer_combo_box.setCurrentIndex(0)
+        self.main_layout.addWidget(self.local_minimizer_combo_box, 12, 1)
+
+        self.history_capacity_label = QLabel(self.tr("History Capacity"))
+        self.history_capacity_label.setToolTip(self.tr("The maximum count of iterations to record, the iterations will be decimated when it is reached.\n0 means do not record the history.\nThe batch mode only records the history if it is enabled in the task window."))
+        self.main_layout.addWidget(self.history_capacity_label, 13, 0)
+        self.history_capacity_input = QSpinBox()
+        self.history_capacity_input.setRange(0, 100000)
+        self.history_capacity_input.setValue(256)
+        self.main_layout.addWidget(self.history_capacity_input, 13, 1)
+
         self.global_optimization_maximum_iteration_input.valueChanged.connect(self.on_settings_changed)
         self.global_optimization_success_iteration_input.valueChanged.connect(self.on_settings_changed)
         self.global_optimization_step_size_input.valueChanged.connect(self.on_settings_changed)
@@ -90,6 +155,13 @@ class AlgorithmSettingWidget(QWidget):
         self.global_optimization_minimizer_maximum_iteration_input.valueChanged.connect(self.on_settings_changed)
         self.final_optimization_minimizer_tolerance_level_input.valueChanged.connect(self.on_settings_changed)
         self.final_optimization_minimizer_maximum_iteration_input.valueChanged.connect(self.on_settings_changed)
+        self.initial_guess_method_combo_box.currentIndexChanged.connect(self.on_settings_changed)
+        self.time_budget_input.valueChanged.connect(self.on_settings_changed)
+        self.target_objective_level_input.valueChanged.connect(self.on_settings_changed)
+        self.plateau_iteration_input.valueChanged.connect(self.on_settings_changed)
+        self.global_optimizer_combo_box.currentIndexChanged.connect(self.on_settings_changed)
+        self.local_minimizer_combo_box.currentIndexChanged.connect(self.on_settings_changed)
+        self.history_capacity_input.valueChanged.connect(self.on_settings_changed)
 
     @property
     def algorithm_settings(self):
@@ -100,6 +172,19 @@ class AlgorithmSettingWidget(QWidget):
         global_optimization_minimizer_maximum_iteration = self.global_optimization_minimizer_maximum_iteration_input.value()
         final_optimization_minimizer_tolerance_level = self.final_optimization_minimizer_tolerance_level_input.value()
         final_optimization_minimizer_maximum_iteration = self.final_optimization_minimizer_maximum_iteration_input.value()
+        initial_guess_method = self.initial_guess_method_options[self.initial_guess_method_combo_box.currentText()]
+        # 0 means the early-stop condition is disabled
+        time_budget = self.time_budget_input.value()
+        time_budget = None if time_budget == 0.0 else time_budget
+        target_objective_level = self.target_objective_level_input.value()
+        target_objective = None if target_objective_level == 0 else 10**-target_objective_level
+        plateau_iteration = self.plateau_iteration_input.value()
+        plateau_iteration = None if plateau_iteration == 0 else plateau_iteration
+        global_optimizer = self.global_optimizer_options[self.global_optimizer_combo_box.currentText()]
+        local_minimizer = self.local_minimizer_options[self.local_minimizer_combo_box.currentText()]
+        # the history needs 2 rows at least (the first and last iterations)
+        history_capacity = self.history_capacity_input.value()
+        history_capacity = 0 if history_capacity == 0 else max(history_capacity, 2)
 
         algorithm_settings = AlgorithmSettings(
             global_optimization_maximum_iteration,
@@ -108,7 +193,14 @@ class AlgorithmSettingWidget(QWidget):
             global_optimization_minimizer_tolerance_level,
             global_optimization_minimizer_maximum_iteration,
             final_optimization_minimizer_tolerance_level,
-            final_optimization_minimizer_maximum_iteration)
+            final_optimization_minimizer_maximum_iteration,
+            initial_guess_method=initial_guess_method,
+            time_budget=time_budget,
+            target_objective=target_objective,
+            plateau_iteration=plateau_iteration,
+            global_optimizer=global_optimizer,
+            local_minimizer=local_minimizer,
+            history_capacity=history_capacity)
         return algorithm_settings
 
     def save(self):
@@ -121,6 +213,13 @@ class AlgorithmSettingWidget(QWidget):
             self.setting_file.setValue("global_optimization_minimizer_maximum_iteration", settings.global_optimization_minimizer_maximum_iteration)
             self.setting_file.setValue("final_optimization_minimizer_tolerance_level", settings.final_optimization_minimizer_tolerance_level)
             self.setting_file.setValue("final_optimization_minimizer_maximum_iteration", settings.final_optimization_minimizer_maximum_iteration)
+            self.setting_file.setValue("initial_guess_method", settings.initial_guess_method.name)
+            self.setting_file.setValue("time_budget", self.time_budget_input.value())
+            self.setting_file.setValue("target_objective_level", self.target_objective_level_input.value())
+            self.setting_file.setValue("plateau_iteration", self.plateau_iteration_input.value())
+            self.setting_file.setValue("global_optimizer", settings.global_optimizer.name)
+            self.setting_file.setValue("local_minimizer", settings.local_minimizer.name)
+            self.setting_file.setValue("history_capacity", settings.history_capacity)
 
             self.logger.info("Algorithm settings have been saved to the file.")
 
@@ -134,6 +233,22 @@ class AlgorithmSettingWidget(QWidget):
             self.global_optimization_minimizer_maximum_iteration_input.setValue(self.setting_file.value("global_optimization_minimizer_maximum_iteration", defaultValue=500, type=int))
             self.final_optimization_minimizer_tolerance_level_input.setValue(self.setting_file.value("final_optimization_minimizer_tolerance_level", defaultValue=100, type=int))
             self.final_optimization_minimizer_maximum_iteration_input.setValue(self.setting_file.value("final_optimization_minimizer_maximum_iteration", defaultValue=1000, type=int))
+            initial_guess_method_name = self.setting_file.value("initial_guess_method", defaultValue=InitialGuessMethod.Defaults.name, type=str)
+            for index, method in enumerate(self.initial_guess_method_options.values()):
+                if method.name == initial_guess_method_name:
+                    self.initial_guess_method_combo_box.setCurrentIndex(index)
+            self.time_budget_input.setValue(self.setting_file.value("time_budget", defaultValue=0.0, type=float))
+            self.target_objective_level_input.setValue(self.setting_file.value("target_objective_level", defaultValue=0, type=int))
+            self.plateau_iteration_input.setValue(self.setting_file.value("plateau_iteration", defaultValue=0, type=int))
+            global_optimizer_name = self.setting_file.value("global_optimizer", defaultValue=GlobalOptimizer.BasinHopping.name, type=str)
+            for index, optimizer in enumerate(self.global_optimizer_options.values()):
+                if optimizer.name == global_optimizer_name:
+                    self.global_optimizer_combo_box.setCurrentIndex(index)
+            local_minimizer_name = self.setting_file.value("local_minimizer", defaultValue=LocalMinimizer.SLSQP.name, type=str)
+            for index, minimizer in enumerate(self.local_minimizer_options.values()):
+                if minimizer.name == local_minimizer_name:
+                    self.local_minimizer_combo_box.setCurrentIndex(index)
+            self.history_capacity_input.setValue(self.setting_file.value("history_capacity", defaultValue=256, type=int))
 
             self.logger.info("Algorithm settings have been retored from the file.")
 
@@ -21,6 +21,7 @@ class ControlPanel(QWidget):
     sigDataSettingsChanged = Signal(dict)
     sigObserveIterationChanged = Signal(bool)
     sigInheritParamsChanged = Signal(bool)
+    sigUseCacheChanged = Signal(bool)
     sigGUIResolverFittingStarted = Signal()
     sigGUIResolverFittingCanceled = Signal()
     sigMultiProcessingFittingButtonClicked = Signal()
@@ -85,6 +86,9 @@ class ControlPanel(QWidget):
         self.auto_record_checkbox.setToolTip(self.tr("Whether to automaticlly record the fitting result after fitting finished."))
         self.main_layout.addWidget(self.auto_fit_checkbox, 3, 0, 1, 2)
         self.main_layout.addWidget(self.auto_record_checkbox, 3, 2, 1, 2)
+        self.use_cache_checkbox = QCheckBox(self.tr("Use Cache"))
+        self.use_cache_checkbox.setToolTip(self.tr("Whether to reuse the results of the same samples and settings which have been fitted before."))
+        self.main_layout.addWidget(self.use_cache_checkbox, 4, 0, 1, 2)
         # Target data to fit
         self.data_index_label = QLabel(self.tr("Current Sample:"))
         self.data_index_label.setToolTip(self.tr("Current sample to fit."))
@@ -93,10 +97,10 @@ class ControlPanel(QWidget):
         self.data_index_previous_button.setToolTip(self.tr("Click to back to the previous sample."))
         self.data_index_next_button = QPushButton(self.tr("Next"))
         self.data_index_next_button.setToolTip(self.tr("Click to jump to the next sample."))
-        self.main_layout.addWidget(self.data_index_label, 4, 0)
-        self.main_layout.addWidget(self.data_index_display, 4, 1)
-        self.main_layout.addWidget(self.data_index_previous_button, 4, 2)
-        self.main_layout.addWidget(self.data_index_next_button, 4, 3)
+        self.main_layout.addWidget(self.data_index_label, 5, 0)
+        self.main_layout.addWidget(self.data_index_display, 5, 1)
+        self.main_layout.addWidget(self.data_index_previous_button, 5, 2)
+        self.main_layout.addWidget(self.data_index_next_button, 5, 3)
         # Control bottons
         self.auto_run = QPushButton(self.tr("Auto Run Orderly"))
         self.auto_run.setToolTip(self.tr("Click to run the program automatically.\nThe samples from current to the end will be processed one by one."))
@@ -106,14 +110,14 @@ class ControlPanel(QWidget):
         self.try_fit_button.setToolTip(self.tr("Click to fit the current sample."))
         self.record_button = QPushButton(self.tr("Record"))
         self.record_button.setToolTip(self.tr("Click to record the current fitting result.\nNote: It will record the LAST SUCCESS fitting result, NOT CURRENT SAMPLE."))
-        self.main_layout.addWidget(self.auto_run, 5, 0)
-        self.main_layout.addWidget(self.cancel_run, 5, 1)
-        self.main_layout.addWidget(self.try_fit_button, 5, 2)
-        self.main_layout.addWidget(self.record_button, 5, 3)
+        self.main_layout.addWidget(self.auto_run, 6, 0)
+        self.main_layout.addWidget(self.cancel_run, 6, 1)
+        self.main_layout.addWidget(self.try_fit_button, 6, 2)
+        self.main_layout.addWidget(self.record_button, 6, 3)
         # Multi cores
         self.multiprocessing_button = QPushButton(self.tr("Multi Cores Fitting"))
         self.multiprocessing_button.setToolTip(self.tr("Click to fit all samples. It will utilize all cores of cpu to accelerate calculation."))
-        self.main_layout.addWidget(self.multiprocessing_button, 6, 0, 1, 4)
+        self.main_layout.addWidget(self.multiprocessing_button, 7, 0, 1, 4)
 
     def connect_all(self):
         self.distribution_normal_radio_button.clicked.connect(self.on_distribution_type_changed)
@@ -129,6 +133,7 @@ class ControlPanel(QWidget):
         self.inherit_params_checkbox.stateChanged.connect(self.on_inherit_params_changed)
         self.auto_fit_checkbox.stateChanged.connect(self.on_auto_fit_changed)
         self.auto_record_checkbox.stateChanged.connect(self.on_auto_record_changed)
+        self.use_cache_checkbox.stateChanged.connect(self.on_use_cache_changed)
 
         self.auto_run.clicked.connect(self.on_auto_run_clicked)
         self.cancel_run.clicked.connect(self.on_cancel_run_clicked)
@@ -267,6 +272,12 @@ class ControlPanel(QWidget):
         else:
             self.sigDataSettingsChanged.emit({"auto_record": False})
 
+    def on_use_cache_changed(self, state: Qt.CheckState):
+        if state == Qt.Checked:
+            self.sigUseCacheChanged.emit(True)
+        else:
+            self.sigUseCacheChanged.emit(False)
+
     def on_data_loaded(self, dataset: SampleDataset):
         self.sample_names = [sample.name for sample in dataset.samples]
         self.logger.info("Data was loaded.")
@@ -290,6 +301,7 @@ class ControlPanel(QWidget):
         self.inherit_params_checkbox.setEnabled(enable)
         self.auto_fit_checkbox.setEnabled(enable)
         self.auto_record_checkbox.setEnabled(enable)
+        self.use_cache_checkbox.setEnabled(enable)
         self.auto_run.setEnabled(enable)
         self.try_fit_button.setEnabled(enable)
         self.record_button.setEnabled(enable)
@@ -320,6 +332,8 @@ class ControlPanel(QWidget):
             return
         self.auto_fit_checkbox.setCheckState(Qt.Checked)
         self.auto_record_checkbox.setCheckState(Qt.Checked)
+        # the cache is opt-in
+        self.use_cache_checkbox.setCheckState(Qt.Unchecked)
         # from current sample to fit, to avoid that it need to resart from the first sample every time
         self.auto_run_flag = True
         self.data_index = self.data_index
@@ -173,7 +173,8 @@ class DistributionCanvas(Canvas):
                 self.__update_components(result)
                 self.__iteration_mutex.unlock()
 
-        if self.observe_iteration_tag:
+        # the results of batch mode may have no history, i.e. only the final params
+        if self.observe_iteration_tag and result.has_history:
             self.__iteration_timer.timeout.connect(closure)
             self.__iteration_timer.start(1000//30)
         else:
@@ -182,6 +183,9 @@ class DistributionCanvas(Canvas):
             self.__iteration_mutex.unlock()
 
     def generate_video(self, result: FittingResult):
+        if not result.has_history:
+            self.gui_logger.warning(self.tr("The history of sample [%s] was not recorded, the video can not be generated."), result.name)
+            return
         # necessary to stop
         self.stop_demo()
         # update target series
@@ -54,6 +54,10 @@ class LossCanvas(Canvas):
             return
         self.stop_demo()
         self.loss_series.clear()
+        # the results of batch mode may have no history, i.e. only the final params
+        if not result.has_history:
+            self.chart.setTitle(("{0} ("+self.tr("No History")+")").format(result.name))
+            return
         max_loss = -sys.maxsize
         min_loss = sys.maxsize
         for i, result_in_process in enumerate(result.history):
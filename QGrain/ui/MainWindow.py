@@ -160,6 +160,7 @@ class MainWindow(QMainWindow):
         self.control_panel.sigObserveIterationChanged.connect(self.distribution_canvas.on_observe_iteration_changed)
         self.control_panel.sigObserveIterationChanged.connect(self.loss_canvas.on_observe_iteration_changed)
         self.control_panel.sigInheritParamsChanged.connect(self.gui_resolver.on_inherit_params_changed)
+        self.control_panel.sigUseCacheChanged.connect(self.gui_resolver.on_use_cache_changed)
         self.control_panel.sigGUIResolverFittingStarted.connect(self.gui_resolver.try_fit)
         self.control_panel.sigMultiProcessingFittingButtonClicked.connect(self.on_multiprocessing_fitting_button_clicked)
 
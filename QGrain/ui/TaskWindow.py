@@ -1,21 +1,26 @@
 __all__ = ["ProcessState", "TaskWindow"]
 import time
 from math import sqrt
+from multiprocessing import cpu_count
 from typing import Dict, Iterable, List, Tuple
 from uuid import UUID, uuid4
 
 import numpy as np
 from PySide2.QtCore import Qt, Signal
-from PySide2.QtWidgets import (QComboBox, QDialog, QGridLayout, QLabel,
+from PySide2.QtWidgets import (QCheckBox, QComboBox, QDialog, QGridLayout, QLabel,
                                QMessageBox, QProgressBar, QPushButton,
                                QSpinBox, QTableWidget, QWidget)
 
 from QGrain.algorithms import DistributionType
+from QGrain.models.AlgorithmSettings import AlgorithmSettings
 from QGrain.models.FittingResult import FittingResult
 from QGrain.models.SampleDataset import SampleDataset
+from QGrain.models.WorkerSettings import WorkerSettings
+from QGrain.resolvers.FittingCache import FittingCache
 from QGrain.resolvers.HeadlessResolver import FittingTask
 from QGrain.resolvers.MultiprocessingResolver import (MultiProcessingResolver,
                                                       ProcessState)
+from QGrain.resolvers.ResultTable import LazyFittingResult
 from QGrain.ui.AlgorithmSettingWidget import AlgorithmSettingWidget
 
 
@@ -34,6 +39,9 @@ class TaskWindow(QDialog):
         self.states = None
         self.succeeded_results = None
         self.staging_tasks = None
+        # the counts are updated by the changes of states
+        self.succeeded_task_number = 0
+        self.failed_task_number = 0
         # to calculate the residual time
         self.task_start_time = None
         self.task_accumulative_time = 0.0
@@ -88,35 +96,79 @@ class TaskWindow(QDialog):
         self.main_layout.addWidget(self.distribution_type_label, 6, 0)
         self.main_layout.addWidget(self.distribution_type_combo_box, 6, 1)
 
+        self.warm_start_label = QLabel(self.tr("Warm Start"))
+        self.warm_start_label.setToolTip(self.tr("Fit the samples in order, and use the result of the last sample as the initial guess.\nIt is much faster for the ordered samples (e.g. the samples of a core)."))
+        self.warm_start_checkbox = QCheckBox()
+        self.warm_start_checkbox.setChecked(False)
+        self.main_layout.addWidget(self.warm_start_label, 7, 0)
+        self.main_layout.addWidget(self.warm_start_checkbox, 7, 1)
+
+        self.use_cache_label = QLabel(self.tr("Use Cache"))
+        self.use_cache_label.setToolTip(self.tr("Reuse the results of the same samples and settings which have been fitted before."))
+        self.use_cache_checkbox = QCheckBox()
+        self.use_cache_checkbox.setChecked(False)
+        self.main_layout.addWidget(self.use_cache_label, 8, 0)
+        self.main_layout.addWidget(self.use_cache_checkbox, 8, 1)
+
+        self.record_history_label = QLabel(self.tr("Record History"))
+        self.record_history_label.setToolTip(self.tr("Record the iterations of each fitting (see History Capacity), which are needed to observe the iterations of the results.\nIt costs more time and memory."))
+        self.record_history_checkbox = QCheckBox()
+        self.record_history_checkbox.setChecked(False)
+        self.main_layout.addWidget(self.record_history_label, 9, 0)
+        self.main_layout.addWidget(self.record_history_checkbox, 9, 1)
+
+        self.worker_number_label = QLabel(self.tr("Worker Number"))
+        self.worker_number_label.setToolTip(self.tr("Select the number of processes to fit the samples in parallel."))
+        self.worker_number_input = QSpinBox()
+        self.worker_number_input.setRange(1, cpu_count())
+        self.worker_number_input.setValue(cpu_count())
+        self.main_layout.addWidget(self.worker_number_label, 10, 0)
+        self.main_layout.addWidget(self.worker_number_input, 10, 1)
+
+        self.blas_thread_number_label = QLabel(self.tr("BLAS Threads"))
+        self.blas_thread_number_label.setToolTip(self.tr("Select the number of BLAS threads of each process.\nThe workers may oversubscribe the cores if it is greater than 1."))
+        self.blas_thread_number_input = QSpinBox()
+        self.blas_thread_number_input.setRange(1, cpu_count())
+        self.blas_thread_number_input.setValue(1)
+        self.main_layout.addWidget(self.blas_thread_number_label, 11, 0)
+        self.main_layout.addWidget(self.blas_thread_number_input, 11, 1)
+
+        self.cpu_affinity_label = QLabel(self.tr("CPU Affinity"))
+        self.cpu_affinity_label.setToolTip(self.tr("Pin each process to one core (only supported on Linux)."))
+        self.cpu_affinity_checkbox = QCheckBox()
+        self.cpu_affinity_checkbox.setChecked(False)
+        self.main_layout.addWidget(self.cpu_affinity_label, 12, 0)
+        self.main_layout.addWidget(self.cpu_affinity_checkbox, 12, 1)
+
         self.algorithm_setting_widget = AlgorithmSettingWidget()
         self.algorithm_setting_widget.main_layout.setContentsMargins(0, 0, 0, 0)
-        self.main_layout.addWidget(self.algorithm_setting_widget, 7, 0, 1, 2)
+        self.main_layout.addWidget(self.algorithm_setting_widget, 13, 0, 1, 2)
 
         self.generate_task_button = QPushButton(self.tr("Generate Tasks"))
         self.generate_task_button.setToolTip(self.tr("Click to generate the fitting tasks."))
-        self.main_layout.addWidget(self.generate_task_button, 8, 0, 1, 2)
+        self.main_layout.addWidget(self.generate_task_button, 14, 0, 1, 2)
 
         self.process_state_label = QLabel(self.tr("Process State:"))
         self.process_state_label.setStyleSheet("QLabel {font: bold;}")
-        self.main_layout.addWidget(self.process_state_label, 9, 0)
+        self.main_layout.addWidget(self.process_state_label, 15, 0)
 
         self.not_started_label = QLabel(self.tr("Not Started"))
         self.not_started_label.setToolTip(self.tr("The number of not started tasks."))
         self.not_started_display = QLabel("0")
-        self.main_layout.addWidget(self.not_started_label, 10, 0)
-        self.main_layout.addWidget(self.not_started_display, 10, 1)
+        self.main_layout.addWidget(self.not_started_label, 16, 0)
+        self.main_layout.addWidget(self.not_started_display, 16, 1)
 
         self.succeeded_label = QLabel(self.tr("Succeeded"))
         self.succeeded_label.setToolTip(self.tr("The number of succeeded tasks."))
         self.succeeded_display = QLabel("0")
-        self.main_layout.addWidget(self.succeeded_label, 11, 0)
-        self.main_layout.addWidget(self.succeeded_display, 11, 1)
+        self.main_layout.addWidget(self.succeeded_label, 17, 0)
+        self.main_layout.addWidget(self.succeeded_display, 17, 1)
 
         self.failed_label = QLabel(self.tr("Failed"))
         self.failed_label.setToolTip(self.tr("The number of failed tasks."))
         self.failed_display = QLabel("0")
-        self.main_layout.addWidget(self.failed_label, 12, 0)
-        self.main_layout.addWidget(self.failed_display, 12, 1)
+        self.main_layout.addWidget(self.failed_label, 18, 0)
+        self.main_layout.addWidget(self.failed_display, 18, 1)
 
         self.time_spent_label = QLabel(self.tr("Time Spent"))
         self.time_spent_label.setToolTip(self.tr("The spent time of these fitting tasks."))
@@ -124,15 +176,15 @@ class TaskWindow(QDialog):
         self.time_left_label = QLabel(self.tr("Time Left"))
         self.time_left_label.setToolTip(self.tr("The left time of these fitting tasks."))
         self.time_left_display = QLabel("99:59:59")
-        self.main_layout.addWidget(self.time_spent_label, 13, 0)
-        self.main_layout.addWidget(self.time_spent_dispaly, 13, 1)
-        self.main_layout.addWidget(self.time_left_label, 14, 0)
-        self.main_layout.addWidget(self.time_left_display, 14, 1)
+        self.main_layout.addWidget(self.time_spent_label, 19, 0)
+        self.main_layout.addWidget(self.time_spent_dispaly, 19, 1)
+        self.main_layout.addWidget(self.time_left_label, 20, 0)
+        self.main_layout.addWidget(self.time_left_display, 20, 1)
 
         self.progress_bar = QProgressBar()
         self.progress_bar.setMaximum(0)
         self.progress_bar.setValue(0)
-        self.main_layout.addWidget(self.progress_bar, 15, 0, 1, 2)
+        self.main_layout.addWidget(self.progress_bar, 21, 0, 1, 2)
 
         self.run_button = QPushButton(self.tr("Run"))
         self.run_button.setToolTip(self.tr("Click to run / pause these fitting tasks."))
@@ -140,8 +192,8 @@ class TaskWindow(QDialog):
         self.finish_button = QPushButton(self.tr("Finish"))
         self.finish_button.setToolTip(self.tr("Click to finish these fitting progress, record the succeeded results."))
         self.finish_button.setEnabled(False)
-        self.main_layout.addWidget(self.run_button, 16, 0)
-        self.main_layout.addWidget(self.finish_button, 16, 1)
+        self.main_layout.addWidget(self.run_button, 22, 0)
+        self.main_layout.addWidget(self.finish_button, 22, 1)
 
         self.generate_task_button.clicked.connect(self.on_generate_task_button_clicked)
         self.run_button.clicked.connect(self.on_run_button_clicked)
@@ -178,6 +230,16 @@ class TaskWindow(QDialog):
             start, end = end, start
         return self.grain_size_data.samples[start: end+1: interval]
 
+    @property
+    def worker_settings(self) -> WorkerSettings:
+        return WorkerSettings(worker_number=self.worker_number_input.value(),
+                              blas_thread_number=self.blas_thread_number_input.value(),
+                              cpu_affinity=self.cpu_affinity_checkbox.isChecked())
+
+    @property
+    def algorithm_settings(self) -> AlgorithmSettings:
+        return self.algorithm_setting_widget.algorithm_settings
+
     @property
     def distribution_type(self):
         return self.distribution_type_options[self.distribution_type_combo_box.currentText()]
@@ -210,15 +272,22 @@ class TaskWindow(QDialog):
         if self.staging_tasks is not None:
             tasks.extend(self.staging_tasks)
             self.staging_tasks = None
+        algorithm_settings = self.algorithm_settings
         for sample in self.samples:
             for component_number in self.component_numbers:
                 task = FittingTask(
                     sample,
                     component_number=component_number,
                     distribution_type=self.distribution_type,
-                    algorithm_settings=self.algorithm_setting_widget.algorithm_settings)
+                    algorithm_settings=algorithm_settings)
                 tasks.append(task)
         self.task_generated_signal.emit(tasks)
+        if self.tasks is None:
+            self.tasks = []
+            self.states = {}
+            self.succeeded_results = {}
+        self.tasks.extend(tasks)
+        self.states.update({task.uuid: ProcessState.NotStarted for task in tasks})
         # update the ui
         self.time_left_display.setText("99:59:59")
         new_task_number = len(tasks)
@@ -229,16 +298,25 @@ class TaskWindow(QDialog):
         self.run_button.setEnabled(True)
         self.finish_button.setEnabled(True)
 
-    def on_task_state_updated(self, tasks: List[FittingTask],
-                              states: Dict[UUID, ProcessState],
-                              succeeded_results: Dict[UUID, FittingResult]):
-        assert tasks is not None
+    def on_task_state_updated(self, states: Dict[UUID, ProcessState],
+                              succeeded_results: Dict[UUID, LazyFittingResult]):
+        # only the newly finished tasks are passed
         assert states is not None
         assert succeeded_results is not None
-
-        task_number = len(tasks)
-        succeeded_task_number = len([value for value in states.values() if value == ProcessState.Succeeded])
-        failed_task_number = len([value for value in states.values() if value == ProcessState.Failed])
+        assert self.tasks is not None
+        for task_id, state in states.items():
+            if self.states[task_id] != ProcessState.NotStarted:
+                continue
+            if state == ProcessState.Succeeded:
+                self.succeeded_task_number += 1
+            elif state == ProcessState.Failed:
+                self.failed_task_number += 1
+            self.states[task_id] = state
+        self.succeeded_results.update(succeeded_results)
+
+        task_number = len(self.tasks)
+        succeeded_task_number = self.succeeded_task_number
+        failed_task_number = self.failed_task_number
         not_started_task_number = task_number - succeeded_task_number - failed_task_number
 
         # update the ui
@@ -265,13 +343,11 @@ class TaskWindow(QDialog):
         self.time_spent_dispaly.setText(second_to_hms(time_spent))
         self.time_left_display.setText(second_to_hms(time_left))
 
-        self.tasks = tasks
-        self.states = states
-        self.succeeded_results = succeeded_results
-
         if not_started_task_number == 0:
             self.running_flag = False
-            self.task_accumulative_time += time.time() - self.task_start_time
+            # the last changes may arrive after the pause
+            if self.task_start_time is not None:
+                self.task_accumulative_time += time.time() - self.task_start_time
             self.task_start_time = None
             self.generate_task_button.setEnabled(True)
             self.run_button.setText(self.tr("Run"))
@@ -282,6 +358,13 @@ class TaskWindow(QDialog):
         if not self.running_flag:
             self.running_flag = True
             self.task_start_time = time.time()
+            if self.multiprocessing_resolver is not None:
+                self.multiprocessing_resolver.set_warm_start(self.warm_start_checkbox.isChecked())
+                self.multiprocessing_resolver.set_cache_directory(
+                    FittingCache.DEFAULT_DIRECTORY if self.use_cache_checkbox.isChecked() else None)
+                self.multiprocessing_resolver.set_worker_settings(self.worker_settings)
+                # the history capacity of the widget is shared with the GUI mode, the batch mode records no history by default
+                self.multiprocessing_resolver.set_record_history(self.record_history_checkbox.isChecked())
             self.fitting_started_signal.emit()
             self.generate_task_button.setEnabled(False)
             self.run_button.setEnabled(True)
@@ -304,6 +387,8 @@ class TaskWindow(QDialog):
         self.tasks = None
         self.states = None
         self.succeeded_results = None
+        self.succeeded_task_number = 0
+        self.failed_task_number = 0
         self.task_start_time = None
         self.task_accumulative_time = 0.0
         self.not_started_display.setText("0")
@@ -324,10 +409,11 @@ class TaskWindow(QDialog):
         results_by_sample_id = {}
         for task in self.tasks:
             if self.states[task.uuid] == ProcessState.Succeeded:
+                result = self.succeeded_results[task.uuid].get()
                 if task.sample.uuid in results_by_sample_id:
-                    results_by_sample_id[task.sample.uuid].append(self.succeeded_results[task.uuid])
+                    results_by_sample_id[task.sample.uuid].append(result)
                 else:
-                    results_by_sample_id[task.sample.uuid] = [self.succeeded_results[task.uuid]]
+                    results_by_sample_id[task.sample.uuid] = [result]
 
         checked_results = []
         for sample_id, results in results_by_sample_id.items():
@@ -409,7 +495,8 @@ class TaskWindow(QDialog):
         else:
             # self.check_result()
             not_started_number = int(self.not_started_display.text())
-            self.fitting_finished_signal.emit(list(self.succeeded_results.values()))
+            # the results are built only now
+            self.fitting_finished_signal.emit([result.get() for result in self.succeeded_results.values()])
             if not_started_number != 0:
                 res = self.storage_msg_box.exec_()
                 if res == QMessageBox.Yes:
@@ -22,7 +22,8 @@ setup(
         "XlsxWriter>=1.2.7",
         "xlwt>=1.3.0",
         "Pillow>=7.0.0",
-        "opencv-python>=4.2.0.32"
+        "opencv-python>=4.2.0.32",
+        "threadpoolctl>=2.0.0"
     ],
     entry_points = {
         'console_scripts': ['qgrain=QGrain.main:main'],
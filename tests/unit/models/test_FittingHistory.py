@@ -0,0 +1,53 @@
+import unittest
+
+import numpy as np
+
+from QGrain.models.FittingHistory import *
+
+
+class TestFittingHistory(unittest.TestCase):
+    def append(self, history: FittingHistory, iteration_number: int) -> np.ndarray:
+        # the first param of each iteration is its index
+        iterations = np.zeros((iteration_number, 3))
+        iterations[:, 0] = np.arange(iteration_number)
+        for params in iterations:
+            history.append(params)
+        return iterations
+
+    def test_empty(self):
+        history = FittingHistory(3, 8)
+        self.assertEqual(history.params.shape, (0, 3))
+        self.assertEqual(len(history), 0)
+
+    def test_not_full(self):
+        # one row is reserved for the last iteration
+        history = FittingHistory(3, 8)
+        iterations = self.append(history, 7)
+        self.assertTrue(np.array_equal(history.params, iterations))
+        self.assertEqual(history.stride, 1)
+
+    def test_capacity(self):
+        for capacity in (2, 3, 8, 100):
+            for iteration_number in (1, 2, 9, 100, 1001):
+                history = FittingHistory(3, capacity)
+                self.append(history, iteration_number)
+                indexes = history.params[:, 0]
+                self.assertLessEqual(len(indexes), capacity)
+                self.assertEqual(history.iteration_number, iteration_number)
+                # the first and last iterations are always kept
+                self.assertEqual(indexes[0], 0)
+                self.assertEqual(indexes[-1], iteration_number-1)
+                # the others are every k-th iteration
+                self.assertTrue(np.all(indexes[:-1] % history.stride == 0))
+                self.assertTrue(np.all(np.diff(indexes) > 0))
+
+    def test_copy(self):
+        history = FittingHistory(3, 8)
+        params = np.zeros(3)
+        history.append(params)
+        params[0] = 1.0
+        self.assertEqual(history.params[0, 0], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -158,6 +158,23 @@ class TestFittingResult(unittest.TestCase):
         fitting_result.kendall_tau
         fitting_result.spearman_r
         fitting_result.has_invalid_value
+        fitting_result.has_history
+        fitting_result.fitting_history
+
+    def test_history(self):
+        fitting_result = self.gen_by_defaluts()
+        # only the final params are kept
+        self.assertFalse(fitting_result.has_history)
+        self.assertIsNone(fitting_result.fitting_history)
+        self.assertEqual(fitting_result.iteration_number, 1)
+        history = np.array([self.fitted_params*0.9, self.fitted_params])
+        fitting_result = FittingResult(
+            self.name, self.real_x, self.fitting_space_x,
+            self.bin_numbers, self.target_y, self.algorithm_data,
+            self.fitted_params, self.x_offset, fitting_history=history)
+        self.assertTrue(fitting_result.has_history)
+        self.assertTrue(np.array_equal(fitting_result.fitting_history, history))
+        self.assertEqual(len(list(fitting_result.history)), 2)
 
     def test_read_only(self):
         fitting_result = self.gen_by_defaluts()
@@ -0,0 +1,76 @@
+import unittest
+
+import numpy as np
+
+from QGrain.algorithms import DistributionType
+from QGrain.models.SampleData import SampleData
+from QGrain.resolvers.DatasetPreprocessor import *
+from QGrain.resolvers.Resolver import Resolver
+
+
+def get_valid_data_range_by_loops(target_y):
+    # the original implementation of `Resolver.get_valid_data_range`
+    start_index = 0
+    end_index = len(target_y)
+    for i, value in enumerate(target_y):
+        if value > 0.0:
+            if i == 0:
+                break
+            else:
+                start_index = i-1
+                break
+    for i, value in enumerate(target_y[start_index+1:][::-1]):
+        if value > 0.0:
+            if i <= 1:
+                break
+            else:
+                end_index = (i-1)*(-1)
+                break
+    return start_index, end_index
+
+
+class TestDatasetPreprocessor(unittest.TestCase):
+    def setUp(self):
+        random_state = np.random.RandomState(0)
+        self.target_y = random_state.uniform(size=(200, 20))
+        # random zero heads, tails and holes
+        self.target_y[random_state.uniform(size=self.target_y.shape) < 0.5] = 0.0
+        class_indexes = np.arange(20)
+        self.target_y[class_indexes < random_state.randint(0, 21, size=(200, 1))] = 0.0
+        self.target_y[class_indexes > random_state.randint(-1, 20, size=(200, 1))] = 0.0
+
+    def test_valid_data_ranges(self):
+        start_indexes, end_indexes = get_valid_data_ranges(self.target_y)
+        for y, start_index, end_index in zip(self.target_y, start_indexes, end_indexes):
+            expected_start, expected_end = get_valid_data_range_by_loops(y)
+            self.assertEqual(start_index, expected_start)
+            self.assertListEqual(list(y[start_index: end_index]), list(y[expected_start: expected_end]))
+            self.assertGreaterEqual(end_index, 0)
+
+    def test_records(self):
+        for distribution_type in DistributionType:
+            preprocessor = DatasetPreprocessor(distribution_type, self.target_y)
+            self.assertEqual(len(preprocessor), len(self.target_y))
+            self.assertTrue(np.array_equal(preprocessor.bin_numbers, np.arange(20) + 1))
+            if distribution_type == DistributionType.Weibull:
+                self.assertTrue(np.all(preprocessor.x_offsets == 0.0))
+            else:
+                self.assertTrue(np.array_equal(preprocessor.x_offsets, preprocessor.start_indexes))
+
+    def test_feed_data(self):
+        classes = np.logspace(0, 3, 20)
+        samples = [SampleData("Sample_{0}".format(i), classes, y) for i, y in enumerate(self.target_y[:10])
+                   if np.any(y > 0.0)]
+        preprocessor = DatasetPreprocessor.from_samples(DistributionType.GeneralWeibull, samples)
+        resolver, expected_resolver = Resolver(), Resolver()
+        for i, sample in enumerate(samples):
+            resolver.feed_data(sample, preprocessor, i)
+            expected_resolver.feed_data(sample)
+            self.assertEqual(resolver.start_index, expected_resolver.start_index)
+            self.assertEqual(resolver.end_index, expected_resolver.end_index)
+            self.assertEqual(resolver.x_offset, expected_resolver.x_offset)
+            self.assertTrue(np.array_equal(resolver.fitting_space_x, expected_resolver.fitting_space_x))
+
+
+if __name__ == "__main__":
+    unittest.main()
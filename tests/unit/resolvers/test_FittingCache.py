@@ -0,0 +1,129 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import QGrain.resolvers.FittingCache
+from QGrain.algorithms import DistributionType
+from QGrain.models.AlgorithmSettings import AlgorithmSettings
+from QGrain.models.FittingResult import StopReason
+from QGrain.models.SampleData import SampleData
+from QGrain.resolvers.FittingCache import *
+from QGrain.resolvers.HeadlessResolver import FittingTask, HeadlessResolver
+
+
+class TestFittingCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_directory = tempfile.TemporaryDirectory()
+        self.directory = self.temp_directory.name
+        self.classes = np.logspace(0, 3, 101)
+        bin_numbers = np.linspace(1, 101, 101)
+        self.samples = []
+        for i in range(3):
+            distribution = 0.5 * np.exp(-np.square(bin_numbers-30-i)/32) + 0.5 * np.exp(-np.square(bin_numbers-60)/50)
+            self.samples.append(SampleData("Sample_{0}".format(i), self.classes, distribution / np.sum(distribution)))
+
+    def tearDown(self):
+        self.temp_directory.cleanup()
+
+    def test_key(self):
+        settings = AlgorithmSettings()
+        key = FittingCache.get_key(self.classes, self.samples[0].distribution, DistributionType.Normal, 2, settings)
+        self.assertEqual(key, FittingCache.get_key(self.classes, self.samples[0].distribution.copy(),
+                                                   DistributionType.Normal, 2, AlgorithmSettings()))
+        # the history is not recorded in the cache
+        self.assertEqual(key, FittingCache.get_key(self.classes, self.samples[0].distribution,
+                                                   DistributionType.Normal, 2, AlgorithmSettings(history_capacity=0)))
+        different_keys = [
+            FittingCache.get_key(self.classes, self.samples[1].distribution, DistributionType.Normal, 2, settings),
+            FittingCache.get_key(self.classes, self.samples[0].distribution, DistributionType.Weibull, 2, settings),
+            FittingCache.get_key(self.classes, self.samples[0].distribution, DistributionType.Normal, 3, settings),
+            FittingCache.get_key(self.classes, self.samples[0].distribution, DistributionType.Normal, 2,
+                                 AlgorithmSettings(start_number=4)),
+            FittingCache.get_key(self.classes, self.samples[0].distribution, DistributionType.Normal, 2, settings, seed=1)]
+        self.assertEqual(len(set(different_keys + [key])), len(different_keys) + 1)
+
+    def test_hit(self):
+        resolver = HeadlessResolver()
+        resolver.cache = FittingCache(self.directory)
+        task = FittingTask(self.samples[0], DistributionType.Normal, 2)
+        flag, _, result = resolver.execute_task(task)
+        self.assertTrue(flag)
+        self.assertFalse(result.from_cache)
+        # a new cache object only has the files
+        for cache in (resolver.cache, FittingCache(self.directory)):
+            resolver.cache = cache
+            flag, _, cached_result = resolver.execute_task(task)
+            self.assertTrue(flag)
+            self.assertTrue(cached_result.from_cache)
+            self.assertNotEqual(cached_result.uuid, result.uuid)
+            self.assertTrue(np.array_equal(cached_result.fitted_params, result.fitted_params))
+            self.assertEqual(cached_result.mean_squared_error, result.mean_squared_error)
+            self.assertEqual(cached_result.stop_reason, result.stop_reason)
+            # the full result is only built on demand
+            self.assertIsInstance(cached_result, CachedFittingResult)
+            built_result = cached_result.get()
+            self.assertTrue(built_result.from_cache)
+            self.assertTrue(np.array_equal(built_result.fitted_params, result.fitted_params))
+            self.assertAlmostEqual(built_result.mean_squared_error, result.mean_squared_error)
+        # other settings
+        flag, _, result = resolver.execute_task(FittingTask(self.samples[0], DistributionType.Normal, 3))
+        self.assertFalse(result.from_cache)
+
+    def test_time_budget(self):
+        resolver = HeadlessResolver()
+        resolver.cache = FittingCache(self.directory)
+        task = FittingTask(self.samples[0], DistributionType.Normal, 2, AlgorithmSettings(time_budget=1e-9))
+        for _ in range(2):
+            flag, _, result = resolver.execute_task(task)
+            self.assertTrue(flag)
+            self.assertEqual(result.stop_reason, StopReason.TimeBudget)
+            self.assertFalse(result.from_cache)
+        self.assertEqual(resolver.cache.get_disk_usage(), 0)
+
+    def test_compact_record(self):
+        resolver = HeadlessResolver()
+        resolver.cache = FittingCache(self.directory)
+        flag, _, result = resolver.execute_task(FittingTask(self.samples[0], DistributionType.Normal, 2))
+        self.assertTrue(flag)
+        self.assertGreater(result.iteration_number, 1)
+        # the history is not stored
+        self.assertEqual(resolver.cache.get_disk_usage(), (len(result.fitted_params)+3) * 8)
+
+    def test_not_writable(self):
+        filename = os.path.join(self.directory, "file")
+        with open(filename, "w"):
+            pass
+        self.assertIsNone(FittingCache.try_create(os.path.join(filename, "cache")))
+        self.assertIsNotNone(FittingCache.try_create(os.path.join(self.directory, "cache")))
+
+    def test_default_directory(self):
+        # not in the package, which may be read-only and shared by users
+        package_directory = os.path.dirname(os.path.dirname(os.path.abspath(QGrain.resolvers.FittingCache.__file__)))
+        self.assertFalse(os.path.abspath(FittingCache.DEFAULT_DIRECTORY).startswith(package_directory + os.sep))
+        self.assertEqual(os.path.basename(FittingCache.DEFAULT_DIRECTORY), "QGrain")
+
+    def test_eviction(self):
+        # all records of the same configuration have the same size
+        settings = AlgorithmSettings()
+        resolver = HeadlessResolver()
+        resolver.cache = FittingCache(self.directory)
+        resolver.execute_task(FittingTask(self.samples[0], DistributionType.Normal, 2, settings))
+        result_size = resolver.cache.get_disk_usage()
+        # only two results can be kept
+        resolver.cache = FittingCache(self.directory, maximum_size=int(result_size*2.5), memory_size=0)
+        keys = []
+        for i, sample in enumerate(self.samples):
+            resolver.execute_task(FittingTask(sample, DistributionType.Normal, 2, settings))
+            keys.append(resolver.get_cache_key())
+            # make the order of modified time clear
+            os.utime(resolver.cache.get_filename(keys[-1]), (i+1, i+1))
+        resolver.execute_task(FittingTask(self.samples[0], DistributionType.Weibull, 2, settings))
+        self.assertLessEqual(resolver.cache.get_disk_usage(), resolver.cache.maximum_size)
+        self.assertIsNone(resolver.cache.get(keys[0]))
+        self.assertIsNotNone(resolver.cache.get(keys[2]))
+
+
+if __name__ == "__main__":
+    unittest.main()
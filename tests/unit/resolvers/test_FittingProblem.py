@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+
+from QGrain.algorithms import AlgorithmData, DistributionType
+from QGrain.resolvers.FittingProblem import *
+
+
+class TestFittingProblem(unittest.TestCase):
+    def setUp(self):
+        self.data = AlgorithmData(DistributionType.GeneralWeibull, 3)
+        self.x = np.linspace(1, 100, 100)
+        self.target_y = self.data.mixed_func(self.x, *self.data.defaults)
+        self.problem = FittingProblem(self.data, self.x, self.target_y)
+
+    def test_objective(self):
+        params = np.array(self.data.defaults) * 1.1
+        expected = np.sum(np.square(self.data.mixed_func(self.x, *params) - self.target_y)) * 100
+        self.assertAlmostEqual(self.problem.objective(params), expected, delta=expected*1e-10)
+
+    def test_jacobian(self):
+        params = np.array(self.data.defaults) * 1.1
+        expected = self.data.get_squared_sum_of_residual_errors_gradient(self.x, self.target_y, params) * 100
+        self.assertTrue(np.allclose(self.problem.jacobian(params), expected))
+
+    def test_bounds(self):
+        self.assertEqual(len(self.problem.lower_bounds), len(self.data.defaults))
+        self.assertEqual(len(self.problem.upper_bounds), len(self.data.defaults))
+        self.assertTrue(np.all(self.problem.lower_bounds <= self.problem.upper_bounds))
+
+    def test_counters(self):
+        for i in range(5):
+            self.problem.objective(self.data.defaults)
+        for i in range(3):
+            self.problem.jacobian(self.data.defaults)
+        self.assertEqual(self.problem.evaluation_number, 5)
+        self.assertEqual(self.problem.jacobian_evaluation_number, 3)
+        self.problem.reset()
+        self.assertEqual(self.problem.evaluation_number, 0)
+        self.assertEqual(self.problem.jacobian_evaluation_number, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
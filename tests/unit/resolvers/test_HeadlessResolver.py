@@ -0,0 +1,141 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from QGrain.algorithms import DistributionType, GlobalOptimizer, LocalMinimizer
+from QGrain.benchmarking import get_ordered_samples
+from QGrain.initializers import InitialGuessMethod
+from QGrain.models.AlgorithmSettings import AlgorithmSettings
+from QGrain.models.FittingResult import StopReason
+from QGrain.resolvers.FittingProblem import FittingProblem
+from QGrain.resolvers.HeadlessResolver import *
+
+
+class TestHeadlessResolver(unittest.TestCase):
+    def setUp(self):
+        self.resolver = HeadlessResolver()
+
+    def test_execute_task(self):
+        samples = get_ordered_samples(DistributionType.Normal, 2, 1)
+        task = FittingTask(samples[0], DistributionType.Normal, 2)
+        flag, returned_task, result = self.resolver.execute_task(task)
+        self.assertTrue(flag)
+        self.assertIs(returned_task, task)
+        self.assertLess(result.mean_squared_error, 1e-8)
+
+    def test_prepare_problem_once(self):
+        samples = get_ordered_samples(DistributionType.Normal, 2, 3)
+        settings = AlgorithmSettings(initial_guess_method=InitialGuessMethod.Peaks)
+        tasks = [FittingTask(sample, DistributionType.Normal, component_number, settings)
+                 for sample in samples for component_number in (2, 3)]
+        with mock.patch("QGrain.resolvers.Resolver.FittingProblem", wraps=FittingProblem) as problem_type:
+            for task in tasks:
+                self.resolver.execute_task(task)
+        # the setters and `change_settings` only mark the problem outdated
+        self.assertEqual(problem_type.call_count, len(tasks))
+        for call, task in zip(problem_type.call_args_list, tasks):
+            start, end = self.resolver.get_valid_data_range(task.sample.distribution)
+            self.assertTrue(np.array_equal(call.args[2], task.sample.distribution[start: end]))
+
+    def test_exception(self):
+        samples = get_ordered_samples(DistributionType.Normal, 2, 1)
+        task = FittingTask(samples[0], DistributionType.Normal, 2)
+        def raise_error(*args):
+            raise ValueError()
+        self.resolver.local_iteration_callback = raise_error
+        flag, _, exception = self.resolver.execute_task(task)
+        self.assertFalse(flag)
+        self.assertIsInstance(exception, ValueError)
+
+    def test_execute_segment(self):
+        for distribution_type in DistributionType:
+            samples = get_ordered_samples(distribution_type, 3, 6)
+            tasks = [FittingTask(sample, distribution_type, 3) for sample in samples]
+            outputs = self.resolver.execute_segment(tasks)
+            self.assertEqual(len(outputs), len(tasks))
+            for task, (flag, returned_task, result) in zip(tasks, outputs):
+                self.assertTrue(flag)
+                self.assertIs(returned_task, task)
+                self.assertEqual(result.name, task.sample.name)
+                self.assertLess(result.mean_squared_error, 1e-6)
+
+    def test_reparameterized_minimizer(self):
+        for distribution_type in DistributionType:
+            samples = get_ordered_samples(distribution_type, 3, 1)
+            for optimizer in (GlobalOptimizer.BasinHopping, GlobalOptimizer.MultiStart):
+                settings = AlgorithmSettings(global_optimizer=optimizer, local_minimizer=LocalMinimizer.LBFGSB)
+                flag, _, result = self.resolver.execute_task(FittingTask(samples[0], distribution_type, 3, settings))
+                self.assertTrue(flag)
+                self.assertLess(result.mean_squared_error, 1e-6)
+
+    def test_seed(self):
+        samples = get_ordered_samples(DistributionType.Weibull, 3, 2)
+        for optimizer in GlobalOptimizer:
+            settings = AlgorithmSettings(global_optimizer=optimizer)
+            outputs = [self.resolver.execute_task(FittingTask(sample, DistributionType.Weibull, 3, settings))
+                       for sample in (samples[0], samples[1], samples[0])]
+            self.assertTrue(np.array_equal(outputs[0][2].fitted_params, outputs[2][2].fitted_params))
+            seeds = set()
+            for seed in (None, 1, 2):
+                self.resolver.execute_task(FittingTask(samples[0], DistributionType.Weibull, 3, settings, seed=seed))
+                seeds.add(self.resolver.seed)
+            self.assertEqual(len(seeds), 3)
+
+    def test_history_capacity(self):
+        samples = get_ordered_samples(DistributionType.GeneralWeibull, 3, 1)
+        for capacity in (0, 4, 256):
+            task = FittingTask(samples[0], DistributionType.GeneralWeibull, 3, AlgorithmSettings(history_capacity=capacity))
+            flag, _, result = self.resolver.execute_task(task)
+            self.assertTrue(flag)
+            if capacity == 0:
+                # only the final params
+                self.assertIsNone(self.resolver.fitting_history)
+                self.assertEqual(result.iteration_number, 1)
+            else:
+                self.assertLessEqual(result.iteration_number, capacity)
+                self.assertGreater(result.iteration_number, 1)
+
+    def check_stop_reason(self, settings: AlgorithmSettings, expected_reason: StopReason):
+        samples = get_ordered_samples(DistributionType.GeneralWeibull, 3, 1)
+        task = FittingTask(samples[0], DistributionType.GeneralWeibull, 3, settings)
+        flag, _, result = self.resolver.execute_task(task)
+        self.assertTrue(flag)
+        self.assertEqual(result.stop_reason, expected_reason)
+        self.assertTrue(np.all(np.isfinite(result.fitted_params)))
+        return result
+
+    def test_completed(self):
+        self.check_stop_reason(AlgorithmSettings(), StopReason.Completed)
+
+    def test_time_budget(self):
+        self.check_stop_reason(AlgorithmSettings(time_budget=1e-3), StopReason.TimeBudget)
+
+    def test_target_objective(self):
+        result = self.check_stop_reason(AlgorithmSettings(target_objective=1e-3), StopReason.TargetObjective)
+        self.assertLessEqual(self.resolver.problem.best_objective, 1e-3)
+
+    def test_plateau(self):
+        self.check_stop_reason(AlgorithmSettings(global_optimization_success_iteration=100, plateau_iteration=1), StopReason.Plateau)
+
+    def test_warm_start_settings(self):
+        settings = HeadlessResolver.get_warm_start_settings(FittingTask(None).algorithm_settings)
+        self.assertLessEqual(settings.global_optimization_maximum_iteration, HeadlessResolver.WARM_START_MAXIMUM_ITERATION)
+        self.assertLessEqual(settings.global_optimization_success_iteration, HeadlessResolver.WARM_START_SUCCESS_ITERATION)
+        settings = HeadlessResolver.get_warm_start_settings(AlgorithmSettings(local_minimizer=LocalMinimizer.LBFGSB))
+        self.assertEqual(settings.local_minimizer, LocalMinimizer.LBFGSB)
+        # all other fields are kept
+        original = AlgorithmSettings(global_optimizer=GlobalOptimizer.DifferentialEvolution,
+                                     time_budget=10.0, history_capacity=0, start_number=16)
+        settings = HeadlessResolver.get_warm_start_settings(original)
+        reduced = {"global_optimization_maximum_iteration", "global_optimization_success_iteration",
+                   "start_number", "population_size", "maximum_generation"}
+        expected = {name: value for name, value in original.to_dict().items() if name not in reduced}
+        self.assertDictEqual({name: value for name, value in settings.to_dict().items() if name not in reduced}, expected)
+        self.assertEqual(settings.start_number, HeadlessResolver.WARM_START_START_NUMBER)
+        self.assertEqual(settings.population_size, HeadlessResolver.WARM_START_POPULATION_SIZE)
+        self.assertEqual(settings.maximum_generation, HeadlessResolver.WARM_START_MAXIMUM_GENERATION)
+
+
+if __name__ == "__main__":
+    unittest.main()
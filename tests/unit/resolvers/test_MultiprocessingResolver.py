@@ -0,0 +1,356 @@
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from multiprocessing.shared_memory import SharedMemory
+from unittest import mock
+
+import numpy as np
+
+from QGrain.algorithms import AlgorithmData, DistributionType
+from QGrain.models.AlgorithmSettings import AlgorithmSettings
+from QGrain.models.SampleData import SampleData
+from QGrain.models.WorkerSettings import WorkerSettings
+from QGrain.resolvers.HeadlessResolver import FittingTask
+from QGrain.resolvers.MultiprocessingResolver import *
+from QGrain.resolvers.TaskScheduler import SchedulingPolicy, TaskCostModel
+from QGrain.resolvers.MultiprocessingResolver import (DEFAULT_CONFIGURATIONS,
+                                                      HAS_THREADPOOLCTL,
+                                                      MAXIMUM_WARM_UP_CONFIGURATION_NUMBER,
+                                                      ProcessState, run_chunk)
+from QGrain.resolvers.ResultTable import ResultTable
+from QGrain.resolvers.TaskBatch import TaskBatch, split_batches
+
+ORIGINAL_ENVIRONMENT = dict(os.environ)
+
+def get_blas_thread_numbers():
+    from threadpoolctl import threadpool_info
+    return [info["num_threads"] for info in threadpool_info()]
+
+
+class TestReproducibility(unittest.TestCase):
+    def setUp(self):
+        data = AlgorithmData.get_algorithm_data(DistributionType.Normal, 2)
+        classes = np.logspace(0, 3, 101)
+        bin_numbers = np.linspace(1, 101, 101)
+        random_state = np.random.RandomState(42)
+        self.tasks = []
+        for i in range(16):
+            params = data.get_param_by_mean(np.array([30, 65]) + random_state.uniform(-5, 5, 2))
+            distribution = np.clip(data.mixed_func(bin_numbers, *params) + \
+                                   random_state.normal(0, 1e-3, len(bin_numbers)), 0.0, None)
+            # the valid ranges are different, so that the longest-first policy reorders the tasks
+            distribution[:random_state.randint(0, 20)] = 0.0
+            sample = SampleData("Sample_{0}".format(i), classes, distribution)
+            self.tasks.extend(FittingTask(sample, DistributionType.Normal, component_number)
+                              for component_number in (2, 3))
+
+    def fit_by_workers(self, worker_number: int, chunk_size: int, policy: SchedulingPolicy):
+        resolver = MultiProcessingResolver(WorkerSettings(worker_number=worker_number))
+        resolver.set_chunk_size(chunk_size)
+        resolver.set_scheduling_policy(policy)
+        resolver.on_task_generated(self.tasks)
+        try:
+            resolver.execute_tasks()
+        finally:
+            resolver.cleanup_all()
+        self.assertEqual(len(resolver.succeeded_results), len(self.tasks))
+        return [resolver.succeeded_results[task.uuid].fitted_params for task in self.tasks]
+
+    def test_worker_number(self):
+        # the random state of each process is different, but the seeds of tasks are the same
+        expected = self.fit_by_workers(1, len(self.tasks), SchedulingPolicy.InOrder)
+        for worker_number, chunk_size in ((1, 3), (4, 1), (4, 5), (16, 1)):
+            all_params = self.fit_by_workers(worker_number, chunk_size, SchedulingPolicy.LongestFirst)
+            for params, other_params in zip(expected, all_params):
+                self.assertTrue(np.array_equal(params, other_params))
+
+
+class TestMultiProcessingResolver(unittest.TestCase):
+    def setUp(self):
+        self.resolver = MultiProcessingResolver()
+        self.updates = []
+        self.resolver.task_state_updated.connect(lambda states, results: self.updates.append((states, results)))
+        x = np.logspace(0, 3, 101)
+        bin_numbers = np.linspace(1, 101, 101)
+        self.tasks = []
+        for i in range(12):
+            distribution = np.exp(-np.square(bin_numbers-40-i)/50)
+            self.tasks.append(FittingTask(SampleData("Sample_{0}".format(i), x, distribution/np.sum(distribution)),
+                                          DistributionType.Normal, 1))
+        self.resolver.on_task_generated(self.tasks)
+
+    def tearDown(self):
+        self.resolver.cleanup_all()
+
+    def test_only_changes(self):
+        for warm_start in (False, True):
+            self.updates.clear()
+            self.resolver.cleanup()
+            self.resolver.on_task_generated(self.tasks)
+            self.resolver.set_warm_start(warm_start)
+            self.resolver.execute_tasks()
+            # each task is emitted once
+            task_ids = [task_id for states, _ in self.updates for task_id in states.keys()]
+            self.assertEqual(len(task_ids), len(self.tasks))
+            self.assertSetEqual(set(task_ids), {task.uuid for task in self.tasks})
+            for states, results in self.updates:
+                for task_id, state in states.items():
+                    self.assertEqual(state, ProcessState.Succeeded)
+                    self.assertIn(task_id, results)
+
+    def test_chunks(self):
+        tasks = [FittingTask(task.sample, DistributionType.Normal, 2) for task in self.tasks]
+        self.resolver.on_task_generated(tasks)
+        for chunk_size in (1, 5, 100):
+            self.resolver.cleanup()
+            self.resolver.on_task_generated(self.tasks + tasks)
+            self.resolver.set_chunk_size(chunk_size)
+            self.resolver.execute_tasks()
+            self.assertEqual(len(self.resolver.succeeded_results), len(self.tasks) + len(tasks))
+            for task in self.tasks + tasks:
+                lazy_result = self.resolver.succeeded_results[task.uuid]
+                self.assertEqual(lazy_result.name, task.sample.name)
+                self.assertEqual(lazy_result.component_number, task.component_number)
+                result = lazy_result.get()
+                self.assertEqual(result.name, task.sample.name)
+                self.assertTrue(np.array_equal(result.fitted_params, lazy_result.fitted_params))
+
+    def test_histories(self):
+        # no history by default
+        self.assertFalse(self.resolver.record_history)
+        self.resolver.execute_tasks()
+        for task in self.tasks:
+            self.assertFalse(self.resolver.succeeded_results[task.uuid].get().has_history)
+        self.resolver.set_record_history(True)
+        tasks = [FittingTask(task.sample, task.distribution_type, task.component_number) for task in self.tasks]
+        capacity_tasks = [FittingTask(task.sample, task.distribution_type, task.component_number,
+                                      AlgorithmSettings(history_capacity=0)) for task in self.tasks]
+        self.resolver.on_task_generated(tasks + capacity_tasks)
+        self.resolver.execute_tasks()
+        for task in tasks:
+            self.assertTrue(self.resolver.succeeded_results[task.uuid].get().has_history)
+        for task in capacity_tasks:
+            self.assertFalse(self.resolver.succeeded_results[task.uuid].get().has_history)
+
+    def test_release_on_failure(self):
+        references = []
+        original_share = TaskBatch.share
+        def share(batch):
+            reference = original_share(batch)
+            references.append(reference)
+            return reference
+        with mock.patch.object(TaskBatch, "share", share), \
+                mock.patch.object(ResultTable, "write", side_effect=RuntimeError("Failed to write the records.")):
+            with self.assertRaises(RuntimeError):
+                self.resolver.execute_tasks()
+        self.assertGreater(len(references), 0)
+        # the shared memory blocks are unlinked anyway
+        for _, name, _, _, _ in references:
+            with self.assertRaises(FileNotFoundError):
+                SharedMemory(name=name)
+
+    def test_stale_pause(self):
+        self.resolver.pause_task()
+        self.resolver.execute_tasks()
+        self.assertEqual(len(self.resolver.succeeded_results), len(self.tasks))
+
+    def test_pause(self):
+        def pause(states, results):
+            self.resolver.task_state_updated.disconnect(pause)
+            self.resolver.pause_task()
+        self.resolver.task_state_updated.connect(pause)
+        self.resolver.execute_tasks()
+        finished_number = sum(len(states) for states, _ in self.updates)
+        self.assertGreater(finished_number, 0)
+        not_started_number = len([state for state in self.resolver.states.values() if state == ProcessState.NotStarted])
+        self.assertEqual(finished_number + not_started_number, len(self.tasks))
+        # the pending tasks were finished instead of being thrown away
+        self.assertEqual(self.resolver.lost_task_number, 0)
+        pool = self.resolver.pool
+        process_ids = {process.pid for process in pool._pool}
+        # run the rest by the same processes
+        self.resolver.execute_tasks()
+        self.assertIs(self.resolver.pool, pool)
+        self.assertSetEqual({process.pid for process in pool._pool}, process_ids)
+        self.assertEqual(sum(len(states) for states, _ in self.updates), len(self.tasks))
+        self.assertEqual(self.resolver.lost_task_number, 0)
+
+    def test_lost_by_terminate(self):
+        # the old way to pause, i.e. terminating the pool while some tasks are running
+        pool = self.resolver.get_pool()
+        # the tasks of one batch share the settings
+        settings = AlgorithmSettings()
+        batch, = split_batches([FittingTask(task.sample, task.distribution_type, task.component_number, settings)
+                                for task in self.tasks])
+        pool.apply_async(run_chunk, args=batch.get_chunk(np.arange(len(batch))) + (True, None, False))
+        while self.resolver.lost_task_number == 0:
+            time.sleep(0.01)
+        self.resolver.close_pool()
+        batch.release()
+        self.assertGreater(self.resolver.lost_task_number, 0)
+
+    def test_pause_segments(self):
+        # the warm-started segments are stopped between tasks
+        self.resolver.set_warm_start(True)
+        def pause(states, results):
+            self.resolver.task_state_updated.disconnect(pause)
+            self.resolver.pause_task()
+        self.resolver.task_state_updated.connect(pause)
+        self.resolver.execute_tasks()
+        self.assertEqual(self.resolver.lost_task_number, 0)
+        self.resolver.execute_tasks()
+        self.assertEqual(len(self.resolver.succeeded_results), len(self.tasks))
+        self.assertEqual(self.resolver.lost_task_number, 0)
+
+    def test_new_cache_directory(self):
+        self.resolver.execute_tasks()
+        pool = self.resolver.pool
+        with tempfile.TemporaryDirectory() as directory:
+            self.resolver.cleanup()
+            self.resolver.on_task_generated(self.tasks)
+            self.resolver.set_cache_directory(directory)
+            self.resolver.execute_tasks()
+            # the workers change the cache without restarting
+            self.assertIs(self.resolver.pool, pool)
+            self.assertEqual(len(os.listdir(directory)), len(self.tasks))
+            self.resolver.cleanup()
+            self.resolver.on_task_generated(self.tasks)
+            self.resolver.execute_tasks()
+            self.assertTrue(all(result.from_cache for result in self.resolver.succeeded_results.values()))
+            self.resolver.set_cache_directory(None)
+            self.resolver.cleanup_all()
+
+    def test_warm_up_configurations(self):
+        self.assertListEqual(self.resolver.get_warm_up_configurations(), [(DistributionType.Normal, 1)])
+        tasks = [FittingTask(self.tasks[0].sample, distribution_type, component_number)
+                 for distribution_type in DistributionType for component_number in range(1, 11)]
+        self.resolver.on_task_generated(tasks)
+        configurations = self.resolver.get_warm_up_configurations()
+        self.assertEqual(len(configurations), MAXIMUM_WARM_UP_CONFIGURATION_NUMBER)
+        self.assertListEqual(configurations, [(task.distribution_type, task.component_number)
+                                              for task in tasks[:MAXIMUM_WARM_UP_CONFIGURATION_NUMBER]])
+        # the pool is started before any task
+        self.resolver.cleanup()
+        self.assertListEqual(self.resolver.get_warm_up_configurations(), DEFAULT_CONFIGURATIONS)
+
+    def test_setup_all(self):
+        # the pool is started and warmed up before any task
+        self.resolver.setup_all()
+        pool = self.resolver.pool
+        self.assertIsNotNone(pool)
+        while self.resolver.ready_worker_number < len(pool._pool):
+            time.sleep(0.01)
+        self.resolver.execute_tasks()
+        self.assertIs(self.resolver.pool, pool)
+        self.assertEqual(len(self.resolver.succeeded_results), len(self.tasks))
+
+    def test_worker_settings(self):
+        self.resolver.set_worker_settings(WorkerSettings(worker_number=2, blas_thread_number=1))
+        self.resolver.execute_tasks()
+        pool = self.resolver.pool
+        self.assertEqual(len(pool._pool), 2)
+        if HAS_THREADPOOLCTL:
+            self.assertTrue(all(number == 1 for number in pool.apply(get_blas_thread_numbers)))
+        # the environment of the main process is not changed
+        self.assertEqual(os.environ.get("OMP_NUM_THREADS"), ORIGINAL_ENVIRONMENT.get("OMP_NUM_THREADS"))
+        # the same settings reuse the pool
+        self.resolver.set_worker_settings(WorkerSettings(worker_number=2, blas_thread_number=1))
+        self.resolver.cleanup()
+        self.resolver.on_task_generated(self.tasks)
+        self.resolver.execute_tasks()
+        self.assertIs(self.resolver.pool, pool)
+        # the new settings restart the pool
+        self.resolver.set_worker_settings(WorkerSettings(worker_number=1, blas_thread_number=2))
+        self.resolver.cleanup()
+        self.resolver.on_task_generated(self.tasks)
+        self.resolver.execute_tasks()
+        self.assertIsNot(self.resolver.pool, pool)
+        self.assertEqual(len(self.resolver.pool._pool), 1)
+        self.assertEqual(len(self.resolver.succeeded_results), len(self.tasks))
+
+    def test_scheduling_policy(self):
+        tasks = [FittingTask(task.sample, DistributionType.Normal, 2) for task in self.tasks]
+        for policy in SchedulingPolicy:
+            self.resolver.cleanup()
+            self.resolver.on_task_generated(self.tasks + tasks)
+            self.resolver.set_scheduling_policy(policy)
+            self.resolver.set_chunk_size(4)
+            self.resolver.execute_tasks()
+            self.assertEqual(len(self.resolver.succeeded_results), len(self.tasks) + len(tasks))
+        # the costs are learned from the runtimes
+        prior_rate = TaskCostModel.get_prior_rate(DistributionType.Normal, 2)
+        self.assertNotEqual(self.resolver.cost_model.get_rate(DistributionType.Normal, 2), prior_rate)
+
+    @unittest.skipUnless(hasattr(os, "sched_setaffinity"), "the CPU affinity is not supported")
+    def test_cpu_affinity(self):
+        cores = sorted(os.sched_getaffinity(0))
+        self.resolver.set_worker_settings(WorkerSettings(worker_number=2, cpu_affinity=True))
+        pool = self.resolver.get_pool()
+        affinities = [pool.apply(os.sched_getaffinity, (0,)) for _ in range(4)]
+        for affinity in affinities:
+            self.assertEqual(len(affinity), 1)
+            self.assertIn(affinity.pop(), cores)
+
+
+class TestSpawn(unittest.TestCase):
+    def test_execute_tasks(self):
+        # the start method of the application, see `QGrain.main`
+        start_method = multiprocessing.get_start_method()
+        multiprocessing.set_start_method("spawn", force=True)
+        try:
+            resolver = MultiProcessingResolver()
+            x = np.logspace(0, 3, 101)
+            bin_numbers = np.linspace(1, 101, 101)
+            tasks = [FittingTask(SampleData("Sample_{0}".format(i), x, np.exp(-np.square(bin_numbers-40-i)/50)),
+                                 DistributionType.Normal, 1) for i in range(4)]
+            resolver.on_task_generated(tasks)
+            resolver.set_chunk_size(2)
+            resolver.execute_tasks()
+            self.assertEqual(len(resolver.succeeded_results), len(tasks))
+            resolver.cleanup_all()
+        finally:
+            multiprocessing.set_start_method(start_method, force=True)
+
+
+RESOURCE_TRACKER_SCRIPT = """
+import multiprocessing, sys
+import numpy as np
+from QGrain.algorithms import DistributionType
+from QGrain.models.AlgorithmSettings import AlgorithmSettings
+from QGrain.models.SampleData import SampleData
+from QGrain.models.WorkerSettings import WorkerSettings
+from QGrain.resolvers.HeadlessResolver import FittingTask
+from QGrain.resolvers.MultiprocessingResolver import MultiProcessingResolver
+if __name__ == "__main__":
+    multiprocessing.set_start_method(sys.argv[1], force=True)
+    x = np.logspace(0, 3, 101)
+    bin_numbers = np.linspace(1, 101, 101)
+    # one batch (i.e. one shared memory block) per task
+    tasks = [FittingTask(SampleData("Sample_{0}".format(i), x, np.exp(-np.square(bin_numbers-40-i)/50)),
+                         DistributionType.Normal, 1, AlgorithmSettings(start_number=i+1)) for i in range(8)]
+    resolver = MultiProcessingResolver(WorkerSettings(worker_number=2))
+    resolver.on_task_generated(tasks)
+    resolver.execute_tasks()
+    assert len(resolver.succeeded_results) == len(tasks)
+    resolver.cleanup_all()
+"""
+
+class TestResourceTracker(unittest.TestCase):
+    def test_no_warnings(self):
+        # the trackers print the warnings after the workers and the main process exit
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+        environment = dict(os.environ, PYTHONPATH=root)
+        for start_method in multiprocessing.get_all_start_methods():
+            with self.subTest(start_method=start_method):
+                process = subprocess.run([sys.executable, "-c", RESOURCE_TRACKER_SCRIPT, start_method],
+                                         env=environment, capture_output=True, text=True, timeout=300)
+                self.assertEqual(process.returncode, 0, process.stderr)
+                self.assertNotIn("resource_tracker", process.stderr)
+                self.assertNotIn("KeyError", process.stderr)
+
+if __name__ == "__main__":
+    unittest.main()
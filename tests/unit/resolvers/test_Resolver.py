@@ -119,6 +119,23 @@ class TestResolver(unittest.TestCase):
         self.resolver.try_fit()
         self.assertTrue(exec_flag)
 
+    def test_prepared_problem(self):
+        self.assertIsNone(self.resolver.problem)
+        self.resolver.feed_data(SampleData("test_prepared_problem", self.x, self.y))
+        problem = self.resolver.problem
+        self.assertIsNotNone(problem)
+        start, end = self.resolver.start_index, self.resolver.end_index
+        self.assertTrue(np.all(np.equal(problem.target_y, self.y[start: end])))
+        self.resolver.try_fit()
+        # the problem is built once and reused by the optimizers
+        self.assertIs(self.resolver.problem, problem)
+        self.assertGreater(problem.evaluation_number, 0)
+        self.assertGreater(problem.jacobian_evaluation_number, 0)
+        # changing the component number will prepare a new problem
+        self.resolver.component_number = 2
+        self.assertIsNot(self.resolver.problem, problem)
+        self.assertEqual(self.resolver.problem.evaluation_number, 0)
+
     def test_change_settings(self):
         settings = dict(
                 global_optimization_maxiter=100,
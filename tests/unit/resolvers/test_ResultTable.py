@@ -0,0 +1,87 @@
+import pickle
+import unittest
+
+import numpy as np
+
+from QGrain.algorithms import AlgorithmData, DistributionType
+from QGrain.models.AlgorithmSettings import AlgorithmSettings
+from QGrain.models.SampleData import SampleData
+from QGrain.resolvers.HeadlessResolver import FittingTask, HeadlessResolver
+from QGrain.resolvers.ResultTable import *
+
+
+class TestResultTable(unittest.TestCase):
+    def setUp(self):
+        distribution_type, component_number = DistributionType.GeneralWeibull, 2
+        self.data = AlgorithmData.get_algorithm_data(distribution_type, component_number)
+        classes = np.logspace(0, 3, 101)
+        bin_numbers = np.linspace(1, 101, 101)
+        self.tasks = []
+        for i in range(4):
+            params = self.data.get_param_by_mean(np.array([30, 60]) + i)
+            self.tasks.append(FittingTask(SampleData("Sample_{0}".format(i), classes, self.data.mixed_func(bin_numbers, *params)),
+                                          distribution_type, component_number))
+        self.outputs = HeadlessResolver().execute_segment(self.tasks, warm_start=False)
+
+    def test_records(self):
+        records = get_records(range(len(self.tasks)), self.outputs, np.ones(len(self.tasks)), len(self.data.defaults))
+        self.assertEqual(records.dtype, get_record_dtype(len(self.data.defaults)))
+        # much smaller than the results
+        self.assertLess(len(pickle.dumps(records)) * 10, len(pickle.dumps([result for _, _, result in self.outputs])))
+        for record, (flag, _, result) in zip(records, self.outputs):
+            self.assertEqual(bool(record["succeeded"]), flag)
+            self.assertTrue(np.array_equal(record["fitted_params"], result.fitted_params))
+            self.assertEqual(record["mean_squared_error"], result.mean_squared_error)
+
+    def test_rebuild(self):
+        records = get_records(range(len(self.tasks)), self.outputs, np.ones(len(self.tasks)), len(self.data.defaults))
+        table = ResultTable(self.tasks)
+        self.assertTrue(np.all(table.records["index"] == -1))
+        # the records may be written in any order
+        table.write(records[2:])
+        table.write(records[:2])
+        for i, (_, _, expected) in enumerate(self.outputs):
+            lazy_result = table.get_lazy_result(i)
+            self.assertEqual(lazy_result.name, expected.name)
+            self.assertEqual(lazy_result.mean_squared_error, expected.mean_squared_error)
+            self.assertEqual(lazy_result.spent_time, 1.0)
+            result = lazy_result.get()
+            self.assertEqual(result.name, expected.name)
+            self.assertEqual(result.distribution_type, expected.distribution_type)
+            self.assertEqual(result.stop_reason, expected.stop_reason)
+            self.assertEqual(result.x_offset, expected.x_offset)
+            self.assertTrue(np.array_equal(result.fitted_params, expected.fitted_params))
+            self.assertTrue(np.allclose(result.fitted_y, expected.fitted_y))
+            self.assertAlmostEqual(result.mean_squared_error, expected.mean_squared_error)
+            for component, expected_component in zip(result.components, expected.components):
+                self.assertAlmostEqual(component.mean, expected_component.mean)
+                self.assertAlmostEqual(component.fraction, expected_component.fraction)
+
+    def test_histories(self):
+        records = get_records(range(len(self.tasks)), self.outputs, np.ones(len(self.tasks)), len(self.data.defaults))
+        histories = get_histories(range(len(self.tasks)), self.outputs)
+        self.assertSetEqual(set(histories.keys()), set(range(len(self.tasks))))
+        table = ResultTable(self.tasks)
+        table.write(records)
+        # the histories are optional
+        self.assertFalse(table.get_result(0).has_history)
+        table.write(records, histories)
+        for i, (_, _, expected) in enumerate(self.outputs):
+            result = table.get_result(i)
+            self.assertTrue(result.has_history)
+            self.assertTrue(np.array_equal(result.fitting_history, expected.fitting_history))
+        # not recorded
+        outputs = HeadlessResolver().execute_segment(
+            [FittingTask(task.sample, task.distribution_type, task.component_number,
+                         AlgorithmSettings(history_capacity=0)) for task in self.tasks], warm_start=False)
+        self.assertDictEqual(get_histories(range(len(self.tasks)), outputs), {})
+
+    def test_failed(self):
+        outputs = [(False, self.tasks[0], ValueError())]
+        records = get_records([0], outputs, [1.0], len(self.data.defaults))
+        self.assertFalse(records[0]["succeeded"])
+        self.assertTrue(np.all(np.isnan(records[0]["fitted_params"])))
+
+
+if __name__ == "__main__":
+    unittest.main()
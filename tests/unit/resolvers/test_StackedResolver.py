@@ -0,0 +1,82 @@
+import os
+import sys
+import unittest
+import warnings
+
+import numpy as np
+from scipy.stats import ConstantInputWarning, norm
+
+from QGrain.algorithms import AlgorithmData, DistributionType
+from QGrain.models.FittingResult import FittingResult
+from QGrain.models.SampleData import SampleData
+from QGrain.resolvers.StackedResolver import *
+
+
+class TestStackedResolver(unittest.TestCase):
+    def setUp(self):
+        self.classes = np.logspace(0, 5, 101) * 0.02
+        bin_numbers = np.arange(101) + 1
+        self.samples = []
+        for i in range(12):
+            y = 0.4 * norm.pdf(bin_numbers, 30+i, 4.0) + 0.6 * norm.pdf(bin_numbers, 60-i, 6.0)
+            self.samples.append(SampleData("Sample_{0}".format(i), self.classes, y / np.sum(y)))
+
+    def test_results(self):
+        resolver = StackedResolver(DistributionType.Normal, 2, block_size=5)
+        results = resolver.fit(self.samples)
+        self.assertEqual(len(results), len(self.samples))
+        for sample, (flag, result) in zip(self.samples, results):
+            self.assertIsInstance(result, FittingResult)
+            self.assertEqual(result.name, sample.name)
+            self.assertEqual(result.component_number, 2)
+            self.assertFalse(result.has_invalid_value)
+            self.assertLess(result.mean_squared_error, 1e-8)
+
+    def test_fitted_params(self):
+        resolver = StackedResolver(DistributionType.Normal, 2)
+        results = resolver.fit(self.samples)
+        for i, (flag, result) in enumerate(results):
+            self.assertTrue(flag)
+            fractions = [component.fraction for component in result.components]
+            self.assertTrue(np.allclose(fractions, [0.4, 0.6], atol=1e-3))
+
+    def test_initial_guesses(self):
+        resolver = StackedResolver(DistributionType.GeneralWeibull, 2)
+        data = AlgorithmData.get_algorithm_data(DistributionType.GeneralWeibull, 2)
+        # the means near the modes, which are inside the fitting space of all samples
+        initial_guesses = np.array([data.get_param_by_mean(np.array([20.0, 50.0]))]*len(self.samples))
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", RuntimeWarning)
+            results = resolver.fit(self.samples, initial_guesses=initial_guesses)
+        self.assertEqual(len(results), len(self.samples))
+
+    def test_empty_sample(self):
+        resolver = StackedResolver(DistributionType.Normal, 2)
+        samples = self.samples[:3] + [SampleData("Empty", self.classes, np.zeros(len(self.classes)))]
+        bin_numbers = np.arange(1, len(self.classes)+1, dtype=np.float64)
+        fitting_space_x = np.tile(bin_numbers, (len(samples), 1))
+        target_y = np.array([sample.distribution for sample in samples])
+        initial_guesses = resolver.get_initial_guesses(fitting_space_x, target_y, np.ones_like(target_y))
+        self.assertTrue(np.all(np.isfinite(initial_guesses)))
+        with warnings.catch_warnings():
+            # the correlation coefficients of the empty sample are undefined
+            warnings.simplefilter("ignore", ConstantInputWarning)
+            results = resolver.fit(samples)
+        for flag, result in results[:3]:
+            self.assertTrue(flag)
+            self.assertLess(result.mean_squared_error, 1e-8)
+
+    def test_singular_system(self):
+        hessian = np.array([np.eye(3)*2, np.zeros((3, 3)), np.eye(3)])
+        gradient = np.ones((3, 3))
+        steps, solved = StackedResolver.solve_steps(hessian, gradient)
+        self.assertListEqual(solved.tolist(), [True, False, True])
+        self.assertTrue(np.allclose(steps, [[0.5]*3, [0.0]*3, [1.0]*3]))
+
+    def test_empty(self):
+        resolver = StackedResolver()
+        self.assertListEqual(resolver.fit([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
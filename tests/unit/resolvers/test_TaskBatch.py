@@ -0,0 +1,93 @@
+import pickle
+import unittest
+
+import numpy as np
+
+from QGrain.algorithms import DistributionType
+from QGrain.models.AlgorithmSettings import AlgorithmSettings
+from QGrain.models.SampleData import SampleData
+from QGrain.resolvers.HeadlessResolver import FittingTask
+from QGrain.resolvers.TaskBatch import *
+
+
+class TestTaskBatch(unittest.TestCase):
+    def setUp(self):
+        self.classes = np.logspace(0, 3, 101)
+        self.settings = AlgorithmSettings()
+        self.samples = [SampleData("Sample_{0}".format(i), self.classes, np.random.random(101)) for i in range(10)]
+
+    def test_split_batches(self):
+        other_classes = self.classes.copy()
+        other_samples = [SampleData("Other_{0}".format(i), other_classes, np.random.random(101)) for i in range(3)]
+        tasks = [FittingTask(sample, DistributionType.Normal, component_number, self.settings)
+                 for component_number in (1, 2) for sample in self.samples + other_samples]
+        tasks.append(FittingTask(self.samples[0], DistributionType.Weibull, 1, self.settings))
+        tasks.append(FittingTask(self.samples[0], DistributionType.Normal, 1, AlgorithmSettings(start_number=4)))
+        batches = split_batches(tasks)
+        # the classes with the same values are in the same batch
+        self.assertEqual(len(batches), 4)
+        self.assertEqual(sum(len(batch) for batch in batches), len(tasks))
+        for batch in batches:
+            self.assertEqual(len({(task.distribution_type, task.component_number,
+                                   tuple(sorted(task.algorithm_settings.to_dict().items())))
+                                  for task in batch.tasks}), 1)
+            indexes = [tasks.index(task) for task in batch.tasks]
+            self.assertListEqual(indexes, sorted(indexes))
+
+    def test_default_settings(self):
+        # each task has its own default settings object
+        tasks = [FittingTask(sample, DistributionType.Normal, 2) for sample in self.samples]
+        self.assertEqual(len(split_batches(tasks)), 1)
+
+    def test_chunk(self):
+        tasks = [FittingTask(sample, DistributionType.Normal, 2, self.settings) for sample in self.samples]
+        tasks[3].seed = 42
+        batch, = split_batches(tasks)
+        try:
+            reference, indexes = batch.get_chunk(range(2, 5))
+            self.assertListEqual(list(indexes), [2, 3, 4])
+            payload = load_payload(reference)
+            self.assertIs(load_payload(reference), payload)
+            self.assertTrue(np.array_equal(payload.classes, self.classes))
+            self.assertEqual(payload.distributions.shape, (len(tasks), 101))
+            for index in indexes:
+                task = payload.get_task(index)
+                self.assertEqual(task.sample.name, tasks[index].sample.name)
+                self.assertTrue(np.array_equal(task.sample.distribution, tasks[index].sample.distribution))
+                # the task does not refer to the shared memory
+                self.assertFalse(np.shares_memory(task.sample.distribution, payload.distributions))
+                self.assertEqual(task.distribution_type, DistributionType.Normal)
+                self.assertEqual(task.component_number, 2)
+                self.assertEqual(task.seed, tasks[index].seed)
+        finally:
+            batch.release()
+
+    def test_chunk_size(self):
+        # the size of chunk is independent of the count of classes
+        sizes = []
+        for class_number in (101, 1001):
+            classes = np.logspace(0, 3, class_number)
+            tasks = [FittingTask(SampleData("Sample_{0}".format(i), classes, np.random.random(class_number)),
+                                 DistributionType.Normal, 2, self.settings) for i in range(100)]
+            batch, = split_batches(tasks)
+            sizes.append(len(pickle.dumps(batch.get_chunk(range(64)))))
+            batch.release()
+        # only the reference differs a little
+        self.assertAlmostEqual(sizes[0], sizes[1], delta=16)
+
+    def test_loaded_payload_number(self):
+        batches = []
+        try:
+            for i in range(6):
+                settings = AlgorithmSettings()
+                tasks = [FittingTask(sample, DistributionType.Normal, 2, settings) for sample in self.samples]
+                batch, = split_batches(tasks)
+                batches.append(batch)
+                payload = load_payload(batch.share())
+                self.assertEqual(payload.distributions[0, 0], self.samples[0].distribution[0])
+        finally:
+            for batch in batches:
+                batch.release()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+
+import numpy as np
+
+from QGrain.algorithms import DistributionType
+from QGrain.resolvers.TaskScheduler import *
+
+
+class TestTaskCostModel(unittest.TestCase):
+    def setUp(self):
+        self.model = TaskCostModel()
+
+    def test_prior(self):
+        for distribution_type in DistributionType:
+            rates = [self.model.get_rate(distribution_type, component_number) for component_number in range(1, 11)]
+            self.assertListEqual(rates, sorted(rates))
+        self.assertGreater(self.model.get_rate(DistributionType.GeneralWeibull, 3),
+                           self.model.get_rate(DistributionType.Normal, 3))
+        costs = self.model.estimate(DistributionType.Normal, 2, [10, 20])
+        self.assertAlmostEqual(costs[1], costs[0] * 2)
+
+    def test_observe(self):
+        self.model.observe(DistributionType.Normal, 2, [10, 30], [0.2, 0.6])
+        self.assertAlmostEqual(self.model.get_rate(DistributionType.Normal, 2), 0.02)
+        # the unobserved configurations are scaled to the observed ones
+        ratio = TaskCostModel.get_prior_rate(DistributionType.Normal, 3) / \
+            TaskCostModel.get_prior_rate(DistributionType.Normal, 2)
+        self.assertAlmostEqual(self.model.get_rate(DistributionType.Normal, 3), 0.02 * ratio)
+        # the observed costs override the prior
+        self.model.observe(DistributionType.Normal, 3, [10], [0.01])
+        self.assertAlmostEqual(self.model.get_rate(DistributionType.Normal, 3), 0.001)
+
+    def test_ignore_cached(self):
+        self.model.observe(DistributionType.Normal, 2, [10], [0.0])
+        self.model.observe(DistributionType.Normal, 2, [], [])
+        self.assertEqual(self.model.get_rate(DistributionType.Normal, 2),
+                         TaskCostModel.get_prior_rate(DistributionType.Normal, 2))
+
+
+class TestChunkScheduler(unittest.TestCase):
+    def setUp(self):
+        self.valid_lengths = np.array([50, 80, 60, 101, 70])
+
+    def pop_all(self, scheduler: ChunkScheduler):
+        chunks = []
+        while len(scheduler) > 0:
+            item, indexes = scheduler.pop()
+            chunks.append((item, indexes.tolist()))
+        return chunks
+
+    def add_batches(self, scheduler: ChunkScheduler):
+        for component_number in (1, 2, 3):
+            scheduler.add_batch(component_number, DistributionType.GeneralWeibull, component_number,
+                                self.valid_lengths, 2)
+
+    def test_in_order(self):
+        scheduler = ChunkScheduler(SchedulingPolicy.InOrder, TaskCostModel())
+        self.add_batches(scheduler)
+        self.assertEqual(len(scheduler), 9)
+        chunks = self.pop_all(scheduler)
+        self.assertListEqual(chunks, [(component_number, indexes)
+                                      for component_number in (1, 2, 3)
+                                      for indexes in ([0, 1], [2, 3], [4])])
+
+    def test_longest_first(self):
+        scheduler = ChunkScheduler(SchedulingPolicy.LongestFirst, TaskCostModel())
+        self.add_batches(scheduler)
+        chunks = self.pop_all(scheduler)
+        # the most components first, and the longest valid ranges first in each batch
+        self.assertListEqual(chunks[:2], [(3, [3, 1]), (3, [4, 2])])
+        for component_number in (1, 2, 3):
+            self.assertListEqual([indexes for item, indexes in chunks if item == component_number],
+                                 [[3, 1], [4, 2], [0]])
+        # the short chunk of the expensive batch is cheaper than the full chunk of the next one
+        self.assertEqual(chunks[2], (2, [3, 1]))
+        self.assertEqual(chunks[-1], (1, [0]))
+
+    def test_observed_costs(self):
+        cost_model = TaskCostModel()
+        # the batch with 1 component was observed to be much slower
+        cost_model.observe(DistributionType.GeneralWeibull, 1, [100], [100.0])
+        cost_model.observe(DistributionType.GeneralWeibull, 3, [100], [1.0])
+        scheduler = ChunkScheduler(SchedulingPolicy.LongestFirst, cost_model)
+        self.add_batches(scheduler)
+        item, _ = scheduler.pop()
+        self.assertEqual(item, 1)
+
+    def test_many_batches(self):
+        # the most expensive head chunk of all batches is selected, with the costs observed while popping
+        random_state = np.random.RandomState(42)
+        cost_model = TaskCostModel()
+        scheduler = ChunkScheduler(SchedulingPolicy.LongestFirst, cost_model)
+        batches = []
+        for i in range(200):
+            configuration = (DistributionType.Normal, random_state.randint(1, 4))
+            valid_lengths = random_state.randint(10, 101, size=random_state.randint(1, 10))
+            scheduler.add_batch(i, *configuration, valid_lengths, 3)
+            order = np.argsort(-valid_lengths, kind="stable")
+            batches.append((configuration, valid_lengths, [order[start: start+3] for start in range(0, len(order), 3)]))
+        while len(scheduler) > 0:
+            estimates = [np.sum(valid_lengths[chunks[0]]) * cost_model.get_rate(*configuration)
+                         if len(chunks) != 0 else -np.inf for configuration, valid_lengths, chunks in batches]
+            item, indexes = scheduler.pop()
+            self.assertAlmostEqual(estimates[item], max(estimates))
+            configuration, valid_lengths, chunks = batches[item]
+            self.assertListEqual(indexes.tolist(), chunks.pop(0).tolist())
+            cost_model.observe(*configuration, valid_lengths[indexes], random_state.uniform(size=len(indexes)))
+        self.assertTrue(all(len(chunks) == 0 for _, _, chunks in batches))
+
+    def test_keep_order(self):
+        scheduler = ChunkScheduler(SchedulingPolicy.LongestFirst, TaskCostModel())
+        scheduler.add_batch(None, DistributionType.Normal, 2, self.valid_lengths, 2, keep_order=True)
+        chunks = self.pop_all(scheduler)
+        self.assertListEqual([indexes for _, indexes in chunks], [[0, 1], [2, 3], [4]])
+
+
+if __name__ == "__main__":
+    unittest.main()
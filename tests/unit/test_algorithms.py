@@ -656,5 +656,158 @@ class TestAlgorithmData(unittest.TestCase):
         for data in [self.normal_data, self.weibull_data, self.gen_weibull_data]:
             data.get_param_by_mean(np.linspace(1, 10, data.component_number))
 
+
+# the batched evaluation must give the same values as `mixed_func`
+class TestEvaluateBatch(unittest.TestCase):
+    @staticmethod
+    def get_random_params(data: AlgorithmData, n: int):
+        random_state = np.random.RandomState(42)
+        component_number = data.component_number
+        param_count = data.param_count
+        params_matrix = np.empty((n, (param_count+1)*component_number-1))
+        params_matrix[:, :component_number*param_count] = random_state.uniform(0.5, 30, (n, component_number*param_count))
+        params_matrix[:, component_number*param_count:] = random_state.dirichlet(np.ones(component_number), n)[:, :-1]
+        return params_matrix
+
+    def check_equal(self, distribution_type: DistributionType):
+        x = np.linspace(-5, 100, 101)
+        for component_number in range(1, 6):
+            data = AlgorithmData(distribution_type, component_number)
+            params_matrix = self.get_random_params(data, 20)
+            # invalid params must give zeros like `mixed_func`
+            params_matrix[0, data.param_count-1] = -1.0
+            actual = data.evaluate_batch(x, params_matrix)
+            expected = np.array([data.mixed_func(x, *params) for params in params_matrix])
+            self.assertEqual(actual.shape, (20, len(x)))
+            self.assertTrue(np.allclose(actual, expected, rtol=1e-12, atol=0.0))
+
+    def test_normal(self):
+        self.check_equal(DistributionType.Normal)
+
+    def test_weibull(self):
+        self.check_equal(DistributionType.Weibull)
+
+    def test_gen_weibull(self):
+        self.check_equal(DistributionType.GeneralWeibull)
+
+    def test_x_for_each_group(self):
+        data = AlgorithmData(DistributionType.GeneralWeibull, 3)
+        params_matrix = self.get_random_params(data, 4)
+        x = np.array([np.linspace(1, 100, 101) - offset for offset in range(4)])
+        actual = data.evaluate_batch(x, params_matrix)
+        for i in range(4):
+            self.assertTrue(np.allclose(actual[i], data.mixed_func(x[i], *params_matrix[i]), rtol=1e-12, atol=0.0))
+
+    def test_components(self):
+        data = AlgorithmData(DistributionType.Weibull, 3)
+        params_matrix = self.get_random_params(data, 5)
+        x = np.linspace(1, 100, 101)
+        components = data.evaluate_components_batch(x, params_matrix)
+        self.assertEqual(components.shape, (5, 3, len(x)))
+        self.assertTrue(np.allclose(np.sum(components, axis=1), data.evaluate_batch(x, params_matrix)))
+
+
+# the generic mixed function must be equal to the function generated by lambda str
+class TestMixedFunction(unittest.TestCase):
+    @staticmethod
+    def get_func(lambda_str):
+        exec("func = "+lambda_str)
+        return locals()["func"]
+
+    def test_equal_to_lambda(self):
+        x = np.linspace(-5, 100, 101)
+        for distribution_type in [DistributionType.Normal,
+                                  DistributionType.Weibull,
+                                  DistributionType.GeneralWeibull]:
+            for component_number in range(1, 11):
+                data = AlgorithmData(distribution_type, component_number)
+                generated_func = self.get_func(get_lambda_str(distribution_type, component_number))
+                mixed_func = MixedFunction(distribution_type, component_number)
+                for params in TestEvaluateBatch.get_random_params(data, 5):
+                    self.assertTrue(np.allclose(mixed_func(x, *params), generated_func(x, *params), rtol=1e-12, atol=0.0))
+
+    def test_pickle(self):
+        import pickle
+        x = np.linspace(1, 100, 101)
+        for distribution_type in [DistributionType.Normal,
+                                  DistributionType.Weibull,
+                                  DistributionType.GeneralWeibull]:
+            data = AlgorithmData(distribution_type, 4)
+            loaded_func = pickle.loads(pickle.dumps(data.mixed_func))
+            self.assertEqual(loaded_func.distribution_type, distribution_type)
+            self.assertEqual(loaded_func.component_number, 4)
+            self.assertTrue(np.all(np.equal(loaded_func(x, *data.defaults), data.mixed_func(x, *data.defaults))))
+
+
+# the batched statistic values must be equal to the values of scalar functions
+class TestStatisticsBatch(unittest.TestCase):
+    def check_statistics(self, distribution_type: DistributionType):
+        random_state = np.random.RandomState(3)
+        data = AlgorithmData(distribution_type, 3)
+        component_params = random_state.uniform(0.3, 20, (20, 3, data.param_count))
+        # invalid params
+        component_params[0, 0, -1] = -1.0
+        statistics = data.get_statistics_batch(component_params)
+        for key, func in ((MEAN_KEY, data.mean), (MEDIAN_KEY, data.median),
+                          (MODE_KEY, data.mode), (VARIANCE_KEY, data.variance),
+                          (STANDARD_DEVIATION_KEY, data.standard_deviation),
+                          (SKEWNESS_KEY, data.skewness), (KURTOSIS_KEY, data.kurtosis)):
+            expected = np.array([[func(*params) for params in result_params] for result_params in component_params])
+            self.assertEqual(statistics[key].shape, (20, 3))
+            self.assertTrue(np.isnan(statistics[key][0, 0]))
+            self.assertTrue(np.allclose(statistics[key], expected, rtol=1e-10, equal_nan=True))
+
+    def test_normal(self):
+        self.check_statistics(DistributionType.Normal)
+
+    def test_weibull(self):
+        self.check_statistics(DistributionType.Weibull)
+
+    def test_gen_weibull(self):
+        self.check_statistics(DistributionType.GeneralWeibull)
+
+
+# the analytic gradients must be close to the finite-difference approximations
+class TestGradient(unittest.TestCase):
+    def check_gradient(self, distribution_type: DistributionType):
+        from scipy.optimize import approx_fprime
+        random_state = np.random.RandomState(7)
+        x = np.linspace(1, 100, 101)
+        for component_number in range(1, 5):
+            data = AlgorithmData(distribution_type, component_number)
+            params = np.array(TestEvaluateBatch.get_random_params(data, 1)[0])
+            target_y = data.mixed_func(x, *params) * random_state.uniform(0.8, 1.2, len(x))
+            if distribution_type == DistributionType.GeneralWeibull:
+                params[0:component_number*data.param_count:data.param_count] = np.linspace(0.1, 0.5, component_number)
+            objective = lambda args: np.sum(np.square(data.mixed_func(x, *args) - target_y))
+            actual = data.get_squared_sum_of_residual_errors_gradient(x, target_y, params)
+            expected = approx_fprime(params, objective, 1e-7)
+            self.assertTrue(np.allclose(actual, expected, rtol=1e-3, atol=np.max(np.abs(expected))*1e-4))
+
+    def test_normal(self):
+        self.check_gradient(DistributionType.Normal)
+
+    def test_weibull(self):
+        self.check_gradient(DistributionType.Weibull)
+
+    def test_gen_weibull(self):
+        self.check_gradient(DistributionType.GeneralWeibull)
+
+    def test_invalid_params(self):
+        data = AlgorithmData(DistributionType.Weibull, 2)
+        x = np.linspace(1, 100, 101)
+        _, jacobian = data.evaluate_jacobian_batch(x, np.array([[-1.0, 10.0, 2.0, 20.0, 0.5]]))
+        self.assertTrue(np.all(np.isfinite(jacobian)))
+        self.assertTrue(np.all(np.equal(jacobian[0, :2], 0.0)))
+
+    def test_constrain_jac(self):
+        for component_number in range(2, 6):
+            data = AlgorithmData(DistributionType.Normal, component_number)
+            constrain = data.constrains
+            jac = constrain["jac"](np.array(data.defaults))
+            self.assertEqual(len(jac), len(data.defaults))
+            self.assertTrue(np.all(np.equal(jac[1-component_number:], -1.0)))
+            self.assertTrue(np.all(np.equal(jac[:1-component_number], 0.0)))
+
 if __name__ == "__main__":
     unittest.main()
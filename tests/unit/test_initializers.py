@@ -0,0 +1,62 @@
+import unittest
+
+import numpy as np
+
+from QGrain.algorithms import AlgorithmData, DistributionType
+from QGrain.initializers import *
+from QGrain.models.AlgorithmSettings import AlgorithmSettings
+from QGrain.models.SampleData import SampleData
+from QGrain.resolvers.Resolver import Resolver
+
+
+class TestPeakInitialGuesses(unittest.TestCase):
+    def setUp(self):
+        self.x = np.linspace(1, 101, 101)
+
+    def test_find_peaks(self):
+        data = AlgorithmData.get_algorithm_data(DistributionType.Normal, 3)
+        mean_values = [[20, 50, 80], [30, 45, 70]]
+        target_y = np.array([data.mixed_func(self.x, *data.get_param_by_mean(values)) for values in mean_values])
+        indexes, heights = get_peak_indexes(target_y, 3)
+        self.assertEqual(indexes.shape, (2, 3))
+        self.assertEqual(heights.shape, (2, 3))
+        self.assertTrue(np.allclose(self.x[indexes], mean_values, atol=2.0))
+
+    def test_not_enough_peaks(self):
+        data = AlgorithmData.get_algorithm_data(DistributionType.Normal, 1)
+        target_y = data.mixed_func(self.x, *data.get_param_by_mean([50]))[np.newaxis, :]
+        indexes, _ = get_peak_indexes(target_y, 4)
+        self.assertEqual(indexes.shape, (1, 4))
+        self.assertTrue(np.all(np.diff(indexes, axis=1) >= 0))
+        # zero distribution will not raise any error
+        indexes, _ = get_peak_indexes(np.zeros((1, 101)), 3)
+        self.assertEqual(indexes.shape, (1, 3))
+
+    def test_initial_guesses(self):
+        for distribution_type in DistributionType:
+            for component_number in range(1, 5):
+                data = AlgorithmData.get_algorithm_data(distribution_type, component_number)
+                target_y = np.array([data.mixed_func(self.x, *data.get_param_by_mean(
+                    np.linspace(20, 80, component_number) + i)) for i in range(5)])
+                initial_guesses = get_peak_initial_guesses(data, self.x, target_y)
+                self.assertEqual(initial_guesses.shape, (5, len(data.defaults)))
+                self.assertTrue(np.all(np.isfinite(initial_guesses)))
+                if component_number > 1:
+                    fractions = initial_guesses[:, 1-component_number:]
+                    self.assertTrue(np.all(fractions > 0.0))
+                    self.assertTrue(np.all(np.sum(fractions, axis=1) < 1.0))
+
+    def test_resolver(self):
+        resolver = Resolver()
+        resolver.distribution_type = DistributionType.Normal
+        resolver.component_number = 2
+        data = resolver.algorithm_data
+        distribution = data.mixed_func(self.x, *data.get_param_by_mean([30, 70]))
+        resolver.feed_data(SampleData("Sample", self.x, distribution))
+        self.assertTupleEqual(tuple(resolver.initial_guess), tuple(data.defaults))
+        resolver.change_settings(AlgorithmSettings(initial_guess_method=InitialGuessMethod.Peaks))
+        self.assertFalse(np.allclose(resolver.initial_guess, data.defaults))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import sys
+import tracemalloc
+import unittest
+
+import numpy as np
+
+from QGrain.algorithms import AlgorithmData, DistributionType
+from QGrain.kernels import *
+
+
+# the in-place kernels must give the same values as `mixed_func`
+class TestKernelWorkspace(unittest.TestCase):
+    workspace_type = KernelWorkspace
+
+    def check_values(self, distribution_type: DistributionType):
+        random_state = np.random.RandomState(11)
+        for component_number in range(1, 6):
+            data = AlgorithmData(distribution_type, component_number)
+            param_count = data.param_count
+            for x in (np.linspace(1, 100, 100), np.linspace(-3, 100, 100)):
+                target_y = random_state.uniform(0.0, 0.01, len(x))
+                workspace = self.workspace_type(distribution_type, component_number, x, target_y)
+                for i in range(10):
+                    params = np.empty((param_count+1)*component_number-1)
+                    params[:component_number*param_count] = random_state.uniform(0.5, 30, component_number*param_count)
+                    params[component_number*param_count:] = random_state.dirichlet(np.ones(component_number))[:-1]
+                    # invalid params
+                    if i < param_count:
+                        params[i] = -1.0
+                    expected_values = data.mixed_func(x, *params)
+                    self.assertTrue(np.allclose(workspace.evaluate(params), expected_values, rtol=1e-12, atol=0.0))
+                    expected_error = np.sum(np.square(expected_values - target_y))
+                    self.assertAlmostEqual(workspace.get_squared_sum_of_residual_errors(params), expected_error, delta=expected_error*1e-10)
+
+    def test_normal(self):
+        self.check_values(DistributionType.Normal)
+
+    def test_weibull(self):
+        self.check_values(DistributionType.Weibull)
+
+    def test_gen_weibull(self):
+        self.check_values(DistributionType.GeneralWeibull)
+
+    def test_reuse_buffer(self):
+        data = AlgorithmData(DistributionType.Normal, 2)
+        x = np.linspace(1, 100, 100)
+        workspace = self.workspace_type(DistributionType.Normal, 2, x, np.zeros_like(x))
+        first = workspace.evaluate(data.defaults)
+        second = workspace.evaluate(data.defaults)
+        self.assertIs(first, second)
+
+    def test_no_allocation(self):
+        data = AlgorithmData(DistributionType.GeneralWeibull, 3)
+        # the large arrays, so that only the allocations of arrays are noticeable
+        x = np.linspace(1, 100, 100000)
+        workspace = self.workspace_type(DistributionType.GeneralWeibull, 3, x, np.zeros_like(x))
+        valid_params = np.array(data.defaults, dtype=np.float64)
+        invalid_params = valid_params.copy()
+        invalid_params[1] = -1.0
+        for params in (valid_params, invalid_params):
+            workspace.get_squared_sum_of_residual_errors(params)
+            tracemalloc.start()
+            for _ in range(100):
+                workspace.get_squared_sum_of_residual_errors(params)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            # an array of values has 800000 bytes, the buffers of ufuncs (with `where`) have constant sizes
+            self.assertLess(peak, x.nbytes / 4)
+
+
+@unittest.skipIf(not HAS_NUMBA, "Numba is not installed")
+class TestNumbaKernelWorkspace(TestKernelWorkspace):
+    workspace_type = NumbaKernelWorkspace
+
+
+class TestKernelBackend(unittest.TestCase):
+    def setUp(self):
+        self.environment_value = os.environ.pop(KERNEL_BACKEND_ENVIRONMENT_KEY, None)
+
+    def tearDown(self):
+        os.environ.pop(KERNEL_BACKEND_ENVIRONMENT_KEY, None)
+        if self.environment_value is not None:
+            os.environ[KERNEL_BACKEND_ENVIRONMENT_KEY] = self.environment_value
+
+    def test_default(self):
+        self.assertEqual(get_kernel_backend(), KernelBackend.NumPy)
+
+    def test_environment(self):
+        os.environ[KERNEL_BACKEND_ENVIRONMENT_KEY] = "Numba"
+        expected = KernelBackend.Numba if HAS_NUMBA else KernelBackend.NumPy
+        self.assertEqual(get_kernel_backend(), expected)
+        os.environ[KERNEL_BACKEND_ENVIRONMENT_KEY] = "unknown"
+        self.assertEqual(get_kernel_backend(), KernelBackend.NumPy)
+
+    def test_explicit_backend_first(self):
+        os.environ[KERNEL_BACKEND_ENVIRONMENT_KEY] = "numba"
+        self.assertEqual(get_kernel_backend(KernelBackend.NumPy), KernelBackend.NumPy)
+
+    def test_create_workspace(self):
+        x = np.linspace(1, 100, 100)
+        workspace = create_workspace(DistributionType.Normal, 2, x, np.zeros_like(x), KernelBackend.NumPy)
+        self.assertIsInstance(workspace, KernelWorkspace)
+        workspace = create_workspace(DistributionType.Normal, 2, x, np.zeros_like(x), KernelBackend.Numba)
+        self.assertIsInstance(workspace, NumbaKernelWorkspace if HAS_NUMBA else KernelWorkspace)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+
+import numpy as np
+
+from QGrain.algorithms import AlgorithmData, DistributionType
+from QGrain.models.AlgorithmSettings import AlgorithmSettings
+from QGrain.models.SampleData import SampleData
+from QGrain.optimizers import *
+from QGrain.resolvers.FittingProblem import FittingProblem
+from QGrain.resolvers.HeadlessResolver import FittingTask, HeadlessResolver
+
+
+class TestLatinHypercube(unittest.TestCase):
+    def test_strata(self):
+        random_state = np.random.RandomState(0)
+        lower, upper = np.array([0.0, 10.0]), np.array([1.0, 30.0])
+        points = latin_hypercube(50, lower, upper, random_state)
+        self.assertEqual(points.shape, (50, 2))
+        self.assertTrue(np.all(points >= lower) and np.all(points <= upper))
+        # each stratum has exactly one point
+        for i in range(2):
+            strata = np.floor((points[:, i] - lower[i]) / (upper[i] - lower[i]) * 50).astype(int)
+            self.assertListEqual(sorted(strata), list(range(50)))
+
+    def test_repair_fractions(self):
+        params_matrix = np.array([[1.0, 2.0, 0.8, 0.6, -0.1],
+                                  [1.0, 2.0, 0.2, 0.3, 0.1]])
+        repair_fractions(params_matrix, 4)
+        self.assertTrue(np.all(params_matrix[:, 2:] >= 0.0))
+        self.assertTrue(np.all(np.sum(params_matrix[:, 2:], axis=1) <= 1.0 + 1e-12))
+        self.assertTrue(np.allclose(params_matrix[1], [1.0, 2.0, 0.2, 0.3, 0.1]))
+
+
+class TestGlobalOptimizers(unittest.TestCase):
+    def setUp(self):
+        self.data = AlgorithmData.get_algorithm_data(DistributionType.Normal, 3)
+        self.x = np.linspace(1, 101, 101)
+        self.params = self.data.get_param_by_mean([20, 50, 80])
+        self.target_y = self.data.mixed_func(self.x, *self.params)
+        self.problem = FittingProblem(self.data, self.x, self.target_y)
+
+    def test_search_bounds(self):
+        for distribution_type in DistributionType:
+            data = AlgorithmData.get_algorithm_data(distribution_type, 3)
+            lower, upper = get_search_bounds(data, self.x)
+            self.assertEqual(len(lower), 3*data.param_count)
+            self.assertTrue(np.all(lower < upper))
+            self.assertTrue(np.all(np.isfinite(upper)))
+
+    def test_multi_start(self):
+        minimizer_kwargs = dict(method="SLSQP", jac=self.problem.jacobian,
+                                bounds=self.problem.bounds, constraints=self.problem.constrains,
+                                options={"maxiter": 500, "ftol": 1e-8})
+        result = multi_start(self.problem, self.data.defaults, 8, minimizer_kwargs,
+                             random_state=np.random.RandomState(0))
+        self.assertLess(result.fun, 1e-6)
+
+    def test_differential_evolution(self):
+        result = differential_evolution(self.problem, self.data.defaults, 32, 300,
+                                        random_state=np.random.RandomState(0))
+        self.assertTrue(result.lowest_optimization_result.success)
+        self.assertTrue(self.problem.is_feasible(result.x))
+        self.assertAlmostEqual(result.fun, self.problem.objective(result.x))
+
+    def test_callback(self):
+        generations = []
+        def callback(x, f, accept):
+            generations.append(f)
+            return len(generations) >= 3
+        result = differential_evolution(self.problem, self.data.defaults, 16, 300, callback=callback)
+        self.assertEqual(len(generations), 3)
+        self.assertEqual(result.nit, 3)
+
+    def test_resolver(self):
+        resolver = HeadlessResolver()
+        sample = SampleData("Sample", self.x, self.target_y)
+        for optimizer in GlobalOptimizer:
+            settings = AlgorithmSettings(global_optimizer=optimizer)
+            flag, _, result = resolver.execute_task(FittingTask(sample, DistributionType.Normal, 3, settings))
+            self.assertTrue(flag)
+            self.assertLess(result.mean_squared_error, 1e-8)
+
+
+if __name__ == "__main__":
+    unittest.main()
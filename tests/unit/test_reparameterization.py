@@ -0,0 +1,69 @@
+import unittest
+
+import numpy as np
+from scipy.optimize import minimize
+
+from QGrain.algorithms import AlgorithmData, DistributionType
+from QGrain.reparameterization import *
+from QGrain.resolvers.FittingProblem import FittingProblem
+
+
+class TestUnconstrainedParameterization(unittest.TestCase):
+    def setUp(self):
+        self.x = np.linspace(1, 101, 101)
+
+    def test_round_trip(self):
+        for distribution_type in DistributionType:
+            for component_number in range(1, 5):
+                data = AlgorithmData.get_algorithm_data(distribution_type, component_number)
+                parameterization = UnconstrainedParameterization(data)
+                params = np.array(data.get_param_by_mean(np.linspace(20, 80, component_number)))
+                if component_number > 1:
+                    params[1-component_number:] = np.linspace(1, 2, component_number)[:-1] / np.sum(np.linspace(1, 2, component_number))
+                internal = parameterization.to_internal(params)
+                self.assertTrue(np.allclose(parameterization.to_params(internal), params))
+
+    def test_always_feasible(self):
+        data = AlgorithmData.get_algorithm_data(DistributionType.GeneralWeibull, 4)
+        parameterization = UnconstrainedParameterization(data)
+        problem = FittingProblem(data, self.x, np.zeros_like(self.x))
+        random_state = np.random.RandomState(0)
+        for i in range(100):
+            internal = random_state.uniform(-100, 100, len(data.defaults))
+            self.assertTrue(problem.is_feasible(parameterization.to_params(internal)))
+
+    def test_gradient(self):
+        data = AlgorithmData.get_algorithm_data(DistributionType.Normal, 3)
+        params = data.get_param_by_mean([20, 50, 80])
+        problem = FittingProblem(data, self.x, data.mixed_func(self.x, *params))
+        parameterization = UnconstrainedParameterization(data)
+        internal = parameterization.to_internal(data.defaults)
+        raw = parameterization.to_params(internal)
+        gradient = parameterization.to_internal_gradient(problem.jacobian(raw), raw)
+        step = 1e-6
+        for i in range(len(internal)):
+            delta = np.zeros_like(internal)
+            delta[i] = step
+            numeric = (problem.objective(parameterization.to_params(internal+delta)) -
+                       problem.objective(parameterization.to_params(internal-delta))) / (2*step)
+            self.assertAlmostEqual(gradient[i], numeric, delta=1e-5*max(1.0, abs(numeric)))
+
+    def test_minimize(self):
+        data = AlgorithmData.get_algorithm_data(DistributionType.Normal, 3)
+        params = data.get_param_by_mean([20, 50, 80])
+        problem = FittingProblem(data, self.x, data.mixed_func(self.x, *params))
+        history = []
+        result = minimize(problem.objective, x0=data.get_param_by_mean([25, 45, 75]),
+                          method=minimize_reparameterized, jac=problem.jacobian,
+                          callback=history.append,
+                          options={"maxiter": 1000, "ftol": 1e-12,
+                                   "parameterization": UnconstrainedParameterization(data)})
+        self.assertTrue(result.success)
+        self.assertTrue(problem.is_feasible(result.x))
+        self.assertTrue(np.allclose(result.x, params, atol=1e-3))
+        # the callback receives the raw params
+        self.assertEqual(len(history[0]), len(data.defaults))
+
+
+if __name__ == "__main__":
+    unittest.main()